@@ -0,0 +1,12 @@
+"""Benchmarks sin conexión del pipeline de remates (no son tests).
+
+- generador: páginas sintéticas con la misma estructura que el listado del portal.
+- grabar: guarda páginas reales del portal en bench/fixtures/ para medir con ellas.
+- paridad: comprueba que los backends bs4 y lxml dan la misma salida (fixtures en bench/fixtures/paridad/).
+- correr: mide cada etapa por separado y escribe los resultados en JSON.
+- portal: copia local del portal (páginas del generador por HTTP) para correr la app sin conexión.
+- plazo: comprueba que el plazo de crawler.rastrear corta el rastreo contra una página que siempre falla.
+- carga: muchas sesiones a la vez contra `streamlit run main.py`; latencia, CPU y memoria.
+
+Se corren desde la raíz del repo, p. ej. `python -m bench.correr --tamaños 100 10000`.
+"""
@@ -0,0 +1,403 @@
+"""Prueba de carga: muchas sesiones de la app a la vez contra el portal simulado.
+
+    python -m bench.carga [--sesiones 20] [--acciones 15] [--pausa 0.5]
+                          [--remates 2000] [--latencia 0.2] [--salida carga.json]
+
+Levanta `streamlit run main.py` apuntando a bench.portal y le conecta clientes
+sin navegador: cada sesión habla el mismo protocolo que el navegador (websocket
+/_stcore/stream) y repite interacciones de un usuario: cambiar de ciudad, escribir
+una búsqueda de a poco, acotar el rango de fechas, marcar o desmarcar favoritos
+en la tabla y cambiar de pestaña. (AppTest no sirve para esto: no admite varias
+sesiones a la vez en un proceso.)
+
+Informa:
+- la apertura en frío (descarga y parseo del portal simulado);
+- el CPU del servidor por rerun de cada interacción, medido con una sola sesión;
+- con todas las sesiones a la vez, los percentiles de latencia de los reruns
+  (del pedido al fin del script), el CPU del servidor por sesión y los reruns/s;
+- la memoria residente del servidor sin sesiones, con el listado cargado y con
+  todas las sesiones abiertas, y el aumento medio por sesión.
+
+CPU y memoria se leen de /proc: en sistemas sin /proc quedan vacíos.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, timedelta
+
+import pyarrow as pa
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Dataframe_pb2 import Dataframe
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.asyncio.client import connect
+
+from bench.portal import PortalSimulado
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT = 300  # el primer rerun descarga y parsea todo el portal
+
+# Peso de cada interacción en la sesión simulada
+INTERACCIONES = {'favorito': 2, 'pestaña': 1, 'ciudad': 3, 'busqueda': 3, 'limpiar': 1, 'fechas': 2}
+BUSQUEDAS = ['casa', 'lote', 'departamento', 'galpon', 'zona norte', 'av principal']
+CALIBRACION = 5  # veces que se repite cada interacción con una sola sesión
+
+
+# ================= SERVIDOR =================
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Servidor:
+    """`streamlit run main.py` en un subproceso, con su CPU y memoria leídos de /proc."""
+
+    def __init__(self, entorno: dict, log: str):
+        self.puerto = puerto_libre()
+        self.log = open(log, 'wb')
+        self.url = f'http://127.0.0.1:{self.puerto}'
+        self.proceso = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', 'main.py', '--server.headless', 'true',
+             '--server.port', str(self.puerto), '--server.fileWatcherType', 'none',
+             '--browser.gatherUsageStats', 'false'],
+            cwd=RAIZ, env={**os.environ, **entorno}, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def esperar(self, timeout: float = 60):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                with open(self.log.name, encoding='utf-8', errors='replace') as f:
+                    raise RuntimeError(f'streamlit terminó:\n{f.read()}')
+            try:
+                with urllib.request.urlopen(f'{self.url}/_stcore/health', timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise TimeoutError(f'streamlit no respondió en {timeout} s')
+
+    def cpu_s(self):
+        """Segundos de CPU (usuario + sistema) del servidor."""
+        try:
+            with open(f'/proc/{self.proceso.pid}/stat') as f:
+                campos = f.read().rsplit(')', 1)[1].split()
+            return (int(campos[11]) + int(campos[12])) / os.sysconf('SC_CLK_TCK')
+        except OSError:
+            return None
+
+    def rss_mb(self):
+        try:
+            with open(f'/proc/{self.proceso.pid}/status') as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        return int(linea.split()[1]) / 1024
+        except OSError:
+            return None
+
+    def __enter__(self):
+        self.esperar()
+        return self
+
+    def __exit__(self, *exc):
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+        self.log.close()
+
+
+# ================= CLIENTE =================
+def estado(id_widget: str, **valor) -> WidgetState:
+    w = WidgetState(id=id_widget)
+    for campo, v in valor.items():
+        if campo.endswith('_array_value'):
+            getattr(w, campo).data.extend(v)
+        else:
+            setattr(w, campo, v)
+    return w
+
+
+class Sesion:
+    """Una pestaña del navegador: los widgets del último rerun y los valores que eligió el usuario."""
+
+    def __init__(self, url: str, semilla: int):
+        self.url = url.replace('http', 'ws', 1) + '/_stcore/stream'
+        self.rnd = random.Random(semilla)
+        self.query_string = ''
+        self.estados = {}  # id -> WidgetState que manda el navegador
+        self.widgets = {}  # tipo -> [proto] del último rerun
+        self.pestañas = []  # [id del contenedor, [etiquetas]]
+        self.reruns = []  # (interacción, segundos)
+        self.errores = []
+
+    async def __aenter__(self):
+        self.ws = await connect(self.url, subprotocols=['streamlit'], max_size=None, open_timeout=TIMEOUT)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, interaccion: str):
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query_string
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.widget_states.widgets.extend(self.estados.values())
+        self.widgets, self.pestañas, vistos = {}, [], set()
+
+        inicio = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), TIMEOUT))
+            tipo = fwd.WhichOneof('type')
+            if tipo == 'script_finished':
+                break
+            if tipo == 'page_info_changed':
+                self.query_string = fwd.page_info_changed.query_string
+            elif tipo == 'delta':
+                vistos.update(self._anotar(fwd.delta))
+        self.reruns.append((interaccion, time.perf_counter() - inicio))
+        # Como el navegador: los widgets que ya no están se olvidan
+        self.estados = {k: v for k, v in self.estados.items() if k in vistos}
+
+    def _anotar(self, delta):
+        if delta.WhichOneof('type') == 'add_block':
+            bloque = delta.add_block
+            if bloque.WhichOneof('type') == 'tab_container':
+                self.pestañas.append([bloque.tab_container.id, []])
+                return [bloque.tab_container.id]
+            if bloque.WhichOneof('type') == 'tab' and self.pestañas:
+                self.pestañas[-1][1].append(bloque.tab.label)
+            return []
+        if delta.WhichOneof('type') != 'new_element':
+            return []
+        elemento = delta.new_element
+        tipo = elemento.WhichOneof('type')
+        if tipo == 'exception':
+            self.errores.append(f'{elemento.exception.type}: {elemento.exception.message}')
+        proto = getattr(elemento, tipo)
+        if not getattr(proto, 'id', ''):
+            return []
+        if tipo == 'dataframe' and proto.editing_mode == Dataframe.EditingMode.READ_ONLY:
+            return [proto.id]
+        self.widgets.setdefault(tipo, []).append(proto)
+        return [proto.id]
+
+    # --- interacciones ---
+    async def ciudad(self):
+        selector = next(w for w in self.widgets['selectbox'] if w.label == 'Ciudad')
+        opcion = self.rnd.choice(selector.options)
+        self.estados[selector.id] = estado(selector.id, string_value=opcion)
+        await self.rerun('ciudad')
+
+    async def busqueda(self):
+        # Se escribe de a poco: cada prefijo que se confirma es un rerun
+        campo = self.widgets['text_input'][0]
+        palabra = self.rnd.choice(BUSQUEDAS)
+        for largo in sorted({3, len(palabra) // 2 + 2, len(palabra)}):
+            self.estados[campo.id] = estado(campo.id, string_value=palabra[:largo])
+            await self.rerun('busqueda')
+
+    async def limpiar(self):
+        campo = self.widgets['text_input'][0]
+        self.estados[campo.id] = estado(campo.id, string_value='')
+        await self.rerun('limpiar')
+
+    async def fechas(self):
+        if not self.widgets.get('date_input'):
+            return
+        campo = self.widgets['date_input'][0]
+        desde, hasta = (date.fromisoformat(d.replace('/', '-')) for d in (campo.min, campo.max))
+        inicio = desde + timedelta(days=self.rnd.randrange(max((hasta - desde).days, 1)))
+        fin = min(hasta, inicio + timedelta(days=self.rnd.randint(3, 30)))
+        self.estados[campo.id] = estado(campo.id, string_array_value=[inicio.isoformat(), fin.isoformat()])
+        await self.rerun('fechas')
+
+    async def favorito(self):
+        # Un clic en la casilla Favorito de una fila de la tabla visible
+        if not self.widgets.get('dataframe'):
+            return
+        tabla = self.widgets['dataframe'][0]
+        marcados = pa.ipc.open_stream(tabla.arrow_data.data).read_all().column('Favorito').to_pylist()
+        if not marcados:
+            return
+        fila = self.rnd.randrange(min(len(marcados), 50))
+        previo = json.loads(self.estados[tabla.id].string_value) if tabla.id in self.estados else {}
+        ediciones = previo.get('edited_rows', {})
+        ediciones[str(fila)] = {'Favorito': not marcados[fila]}
+        valor = {'edited_rows': ediciones, 'added_rows': [], 'deleted_rows': []}
+        self.estados[tabla.id] = estado(tabla.id, string_value=json.dumps(valor))
+        await self.rerun('favorito')
+
+    async def pestaña(self):
+        if not self.pestañas:
+            return
+        id_pestañas, etiquetas = self.pestañas[0]
+        self.estados[id_pestañas] = estado(id_pestañas, string_value=self.rnd.choice(etiquetas))
+        await self.rerun('pestaña')
+
+    async def recorrer(self, acciones: int, pausa: float):
+        nombres, pesos = zip(*INTERACCIONES.items())
+        for nombre in self.rnd.choices(nombres, pesos, k=acciones):
+            await asyncio.sleep(self.rnd.uniform(0, 2 * pausa))  # tiempo que el usuario mira la pantalla
+            await getattr(self, nombre)()
+
+
+# ================= MEDICIÓN =================
+def percentiles(valores: list) -> dict:
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+    cortes = statistics.quantiles(ordenados, n=100, method='inclusive') if len(ordenados) > 1 else ordenados * 99
+    return {
+        'n': len(ordenados),
+        'p50_ms': round(cortes[49] * 1000, 1),
+        'p90_ms': round(cortes[89] * 1000, 1),
+        'p95_ms': round(cortes[94] * 1000, 1),
+        'p99_ms': round(cortes[98] * 1000, 1),
+        'max_ms': round(ordenados[-1] * 1000, 1),
+    }
+
+
+def restar(a, b):
+    return None if a is None or b is None else a - b
+
+
+async def calibrar(servidor: Servidor) -> dict:
+    """Apertura en frío y CPU del servidor por rerun de cada interacción, con una sola sesión."""
+    async with Sesion(servidor.url, semilla=0) as sesion:
+        await sesion.rerun('apertura')
+        # El reloj de CPU de /proc avanza de a 10 ms: se divide el total entre los reruns hechos
+        cpu = {}
+        for nombre in INTERACCIONES:
+            antes, reruns = servidor.cpu_s(), len(sesion.reruns)
+            for _ in range(CALIBRACION):
+                await getattr(sesion, nombre)()
+            hechos = len(sesion.reruns) - reruns
+            if hechos and antes is not None:
+                cpu[nombre] = restar(servidor.cpu_s(), antes) / hechos
+        return {
+            'apertura_en_frio_ms': round(sesion.reruns[0][1] * 1000, 1),
+            'cpu_rerun_ms': {k: round(v * 1000, 1) for k, v in cpu.items()},
+            'errores': sesion.errores,
+        }
+
+
+async def cargar(servidor: Servidor, sesiones: int, acciones: int, pausa: float) -> dict:
+    """Todas las sesiones a la vez; la memoria se lee con las sesiones todavía abiertas."""
+    abiertas = [await Sesion(servidor.url, semilla=i).__aenter__() for i in range(1, sesiones + 1)]
+    try:
+        rss_sin_sesiones = servidor.rss_mb()
+        cpu_inicio, inicio = servidor.cpu_s(), time.perf_counter()
+
+        async def usuario(s):
+            await s.rerun('apertura')
+            await s.recorrer(acciones, pausa)
+        await asyncio.gather(*(usuario(s) for s in abiertas))
+        duracion, cpu = time.perf_counter() - inicio, restar(servidor.cpu_s(), cpu_inicio)
+        rss = servidor.rss_mb()
+    finally:
+        for s in abiertas:
+            await s.__aexit__()
+    return {'sesiones': abiertas, 'duracion': duracion, 'cpu': cpu, 'rss_antes': rss_sin_sesiones, 'rss': rss}
+
+
+def medir_carga(sesiones: int, acciones: int, pausa: float, remates: int, paginas: int, latencia: float) -> dict:
+    with tempfile.TemporaryDirectory() as carpeta, PortalSimulado(remates, paginas, latencia) as portal:
+        entorno = {'REMATES_URL': portal.url, 'REMATES_DB': os.path.join(carpeta, 'carga.db'), 'REMATES_API': ''}
+        with Servidor(entorno, os.path.join(carpeta, 'streamlit.log')) as servidor:
+            rss = {'sin_sesiones': servidor.rss_mb()}
+            calibracion = asyncio.run(calibrar(servidor))
+            pedidos = portal.pedidos
+            carga = asyncio.run(cargar(servidor, sesiones, acciones, pausa))
+            rss['listado_cargado'], rss['sesiones_abiertas'] = carga['rss_antes'], carga['rss']
+            pedidos = portal.pedidos - pedidos
+
+    reruns = [r for s in carga['sesiones'] for r in s.reruns]
+    por_interaccion = {}
+    for nombre, segundos in reruns:
+        por_interaccion.setdefault(nombre, []).append(segundos)
+    cpu = carga['cpu']
+    return {
+        'parametros': {'sesiones': sesiones, 'acciones': acciones, 'pausa_s': pausa, 'remates': remates,
+                       'paginas': paginas, 'latencia_portal_s': latencia},
+        'apertura_en_frio_ms': calibracion['apertura_en_frio_ms'],
+        'cpu_rerun_ms': calibracion['cpu_rerun_ms'],
+        'latencia': {'todas': percentiles([s for _, s in reruns]),
+                     **{k: percentiles(v) for k, v in sorted(por_interaccion.items())}},
+        'cpu_servidor_s': None if cpu is None else round(cpu, 2),
+        'cpu_por_sesion_ms': None if cpu is None else round(cpu / sesiones * 1000, 1),
+        'duracion_s': round(carga['duracion'], 2),
+        'reruns_por_s': round(len(reruns) / carga['duracion'], 2),
+        'rss_mb': {k: None if v is None else round(v, 1) for k, v in rss.items()},
+        'rss_por_sesion_mb': None if None in rss.values() else
+        round((rss['sesiones_abiertas'] - rss['listado_cargado']) / sesiones, 2),
+        'pedidos_al_portal_durante_la_carga': pedidos,
+        'errores': sorted({e for s in carga['sesiones'] for e in s.errores} | set(calibracion['errores'])),
+    }
+
+
+def formatear(r: dict) -> str:
+    def ms(v):
+        return '—' if v is None else f'{v:,.1f}'
+
+    p = r['parametros']
+    lineas = [
+        f"{p['sesiones']} sesiones × {p['acciones']} interacciones, {p['remates']:,} remates "
+        f"en {p['paginas']} páginas ({p['latencia_portal_s']} s por pedido)",
+        f"Apertura en frío (descarga + parseo): {r['apertura_en_frio_ms']:,.0f} ms",
+        'CPU del servidor por rerun, una sola sesión: '
+        + ', '.join(f'{k} {v:,.1f} ms' for k, v in r['cpu_rerun_ms'].items()),
+        '',
+        f"{'latencia rerun':16} {'n':>5} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}  ms",
+    ]
+    for nombre, pc in r['latencia'].items():
+        lineas.append(f"{nombre:16} {pc['n']:>5} " + ' '.join(
+            f"{pc[k]:>9,.1f}" for k in ('p50_ms', 'p90_ms', 'p95_ms', 'p99_ms', 'max_ms')))
+    rss = r['rss_mb']
+    lineas += [
+        '',
+        f"CPU del servidor: {ms(r['cpu_servidor_s'])} s en {r['duracion_s']} s, "
+        f"{ms(r['cpu_por_sesion_ms'])} ms por sesión ({r['reruns_por_s']} reruns/s)",
+        f"RSS del servidor: {ms(rss['sin_sesiones'])} MB sin sesiones, {ms(rss['listado_cargado'])} MB con el "
+        f"listado, {ms(rss['sesiones_abiertas'])} MB con las sesiones abiertas "
+        f"({ms(r['rss_por_sesion_mb'])} MB por sesión)",
+        f"Pedidos al portal durante la carga: {r['pedidos_al_portal_durante_la_carga']}",
+    ]
+    if r['errores']:
+        lineas += ['', 'Errores:', *(f'  {e}' for e in r['errores'])]
+    return '\n'.join(lineas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sesiones', type=int, default=20)
+    parser.add_argument('--acciones', type=int, default=15, help='interacciones por sesión')
+    parser.add_argument('--pausa', type=float, default=0.5, help='segundos medios entre interacciones')
+    parser.add_argument('--remates', type=int, default=2_000)
+    parser.add_argument('--paginas', type=int, default=10)
+    parser.add_argument('--latencia', type=float, default=0.2, help='segundos por pedido al portal simulado')
+    parser.add_argument('--salida', help='archivo JSON con los resultados')
+    args = parser.parse_args(argv)
+
+    resultado = medir_carga(args.sesiones, args.acciones, args.pausa, args.remates, args.paginas, args.latencia)
+    print(formatear(resultado))
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=1)
+    return 1 if resultado['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
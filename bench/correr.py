@@ -0,0 +1,230 @@
+"""Mide cada etapa del pipeline sobre listados sintéticos y fixtures grabados.
+
+    python -m bench.correr [--tamaños 100 1000 10000 100000] [--repeticiones 5]
+                           [--salida resultados.json] [--comparar base.json]
+
+Etapas: extracción (lxml y bs4), armado del DataFrame crudo, normalización (y por
+separado extraer_fecha, limpiar_valor, convertir_monto y ubicar, en frío y con
+la caché del nomenclátor), parseo completo en frío y con 1 % de cambios,
+urgencia, índices, filtrado, KPIs y vistas, búsqueda de texto, preparación de la
+tabla de marcar_favorito y evaluación de 500 búsquedas guardadas (alertas) sobre
+un delta del 1 %.
+
+La salida es JSON (una fila por etapa y tamaño). Con --comparar se lista la
+razón contra una corrida anterior y se sale con código 1 si alguna etapa se puso
+más lenta que la tolerancia.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from bench import generador
+from remates import alertas, consultas, fragmentos, lugares, parseo
+from remates.busqueda import IndiceTexto
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+MAX_BS4 = 10_000  # BeautifulSoup es lento: por encima de esto no se mide
+HOY = date(2025, 6, 2)  # fecha fija: mismas páginas y misma urgencia en cada corrida
+
+ALERTAS = 500
+
+FILTROS = [
+    consultas.Filtro(),
+    consultas.Filtro(ciudad='Sucre'),
+    consultas.Filtro(fecha_ini=date(2025, 6, 10), fecha_fin=date(2025, 7, 10)),
+    consultas.Filtro(valor_min=200_000, valor_max=1_500_000),
+    consultas.Filtro(ciudad='La Paz', texto='casa'),
+    consultas.Filtro(texto='lote 1'),
+]
+
+
+def medir(funcion, repeticiones: int, preparar=None) -> dict:
+    """Tiempos en ms de `funcion(preparar())`; lo que arma `preparar` no se mide.
+
+    Antes se hace una corrida sin medir (importaciones, regex compiladas, cachés de pandas).
+    """
+    funcion(preparar()) if preparar else funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento) if preparar else funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'repeticiones': repeticiones,
+        'mediana_ms': round(statistics.median(tiempos), 3),
+        'min_ms': round(min(tiempos), 3),
+        'max_ms': round(max(tiempos), 3),
+    }
+
+
+def con_cambios(html: str, fraccion: float = 0.01) -> str:
+    """El mismo listado con `fraccion` de los remates modificados (otra descripción)."""
+    trozos = fragmentos.dividir(html)
+    paso = max(1, round(1 / fraccion))
+    cambiados = [t.replace('Descripción:Tipo Inmueble ', 'Descripción:Tipo Inmueble (actualizado) ', 1)
+                 if i % paso == 0 else t for i, t in enumerate(trozos)]
+    inicio = html.find(trozos[0]) if trozos else len(html)
+    return html[:inicio] + ''.join(cambiados)
+
+
+def etapas(html: str, repeticiones: int):
+    """(etapa, resultado de medir) para un listado."""
+    parser = parseo.PARSER_POR_DEFECTO
+    campos = list(parseo.PARSERS[parser](html))
+    for nombre, extraer in parseo.PARSERS.items():
+        if nombre == 'bs4' and len(campos) > MAX_BS4:
+            continue
+        yield f'extraccion_{nombre}', medir(lambda: list(extraer(html)), repeticiones)
+
+    crear_crudo = lambda: pd.DataFrame(campos, columns=parseo.COLUMNAS_CRUDAS, dtype=object)  # noqa: E731
+    yield 'dataframe_crudo', medir(crear_crudo, repeticiones)
+    crudo = crear_crudo()
+    fecha, valor = crudo['fecha'].str.strip(), crudo['valor'].str.strip()
+    valor_txt = parseo.limpiar_valor(valor)
+    ubicacion = crudo['ubicacion'].str.strip()
+    yield 'normalizacion', medir(lambda: parseo.normalizar_remates(crudo), repeticiones)
+    yield 'normalizacion.extraer_fecha', medir(lambda: parseo.extraer_fecha(fecha), repeticiones)
+    yield 'normalizacion.limpiar_valor', medir(lambda: parseo.limpiar_valor(valor), repeticiones)
+    yield 'normalizacion.convertir_monto', medir(lambda: parseo.convertir_monto(valor_txt), repeticiones)
+    yield 'normalizacion.ubicar', medir(lambda _: parseo.ubicar(ubicacion), repeticiones,
+                                        preparar=lugares.resolver.cache_clear)
+    yield 'normalizacion.ubicar_cache', medir(lambda: parseo.ubicar(ubicacion), repeticiones)
+
+    yield 'parsear_frio', medir(lambda: parseo.parsear(html, parser, fragmentos.CacheLRU()), repeticiones)
+    cambiado = con_cambios(html)
+
+    def cache_caliente():
+        # Con más remates que el tamaño por defecto de la caché el LRU se vaciaría entero
+        cache = fragmentos.CacheLRU(max_items=max(50_000, 2 * len(campos)))
+        parseo.parsear(html, parser, cache)
+        return cache
+    yield 'parsear_delta_1pct', medir(lambda cache: parseo.parsear(cambiado, parser, cache), repeticiones,
+                                      preparar=cache_caliente)
+
+    base = parseo.parsear(html, parser)
+    ahora = pd.Timestamp(HOY)
+    yield 'urgencia', medir(lambda df: parseo.calcular_urgencia(df, ahora), repeticiones, preparar=base.copy)
+    df = parseo.calcular_urgencia(base.copy(), ahora)
+    yield 'indices', medir(lambda: consultas.MotorConsultas(df), repeticiones)
+    motor = consultas.MotorConsultas(df)
+    yield 'busqueda.indice', medir(lambda: IndiceTexto(df), max(1, repeticiones // 2))
+    indice = motor.texto  # se arma fuera de la medición del filtrado
+
+    def sin_memo():
+        indice._memo.clear()  # cada repetición resuelve los prefijos desde cero
+        return indice
+    yield 'busqueda.consulta', medir(lambda i: [i.buscar(q) for q in ('cas', 'lote 12', 'sucre')], repeticiones,
+                                     preparar=sin_memo)
+
+    ordenes = [motor.orden(f) for f in FILTROS]
+    yield 'filtrado', medir(lambda _: [motor.orden(f) for f in FILTROS], repeticiones, preparar=sin_memo)
+    yield 'kpis_y_vistas', medir(lambda: [motor._armar(o) for o in ordenes], repeticiones)
+
+    # marcar_favorito: la tabla se arma una vez por dataset y en cada rerun se toman las filas de la vista
+    yield 'tabla.dataset', medir(lambda: parseo.tabla_listado(df), repeticiones)
+    tabla = parseo.tabla_listado(df)
+    vista = motor._armar(ordenes[0]).vista
+    favoritos = set(df['Número de Proceso'].iloc[::50])
+
+    def tabla_rerun():
+        tomada = tabla.loc[vista.index]
+        tomada.insert(0, 'N°', range(1, len(tomada) + 1))
+        tomada.insert(1, 'Favorito', tomada['Número de Proceso'].isin(favoritos))
+        return tomada
+    yield 'tabla.rerun', medir(tabla_rerun, repeticiones)
+
+    # Alertas: las combinaciones de FILTROS con cada pestaña y con/sin urgentes, sobre el 1 % del listado
+    guardadas = [alertas.Alerta(i, 'bench', f'alerta {i}', FILTROS[i % len(FILTROS)], (None, 0, 20)[i % 3], i % 4 == 0,
+                                'file:/dev/null') for i in range(ALERTAS)]
+    delta = df.iloc[::100]
+    yield 'alertas.indice', medir(lambda: alertas.IndiceAlertas(guardadas), repeticiones)
+    indice_alertas = alertas.IndiceAlertas(guardadas)
+    yield 'alertas.delta_1pct', medir(lambda: indice_alertas.evaluar(delta), repeticiones)
+
+
+def entorno() -> dict:
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'lxml': '.'.join(map(str, parseo.lxml.etree.LXML_VERSION)) if parseo.lxml else None,
+        'parser': parseo.PARSER_POR_DEFECTO,
+        'sistema': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def listados(tamaños: list):
+    """(nombre, n, html) de cada listado a medir: sintéticos y, si hay, los fixtures grabados."""
+    for n in tamaños:
+        yield 'sintetico', n, generador.pagina(n, semilla=n, hoy=HOY)
+    rutas = sorted(glob.glob(os.path.join(FIXTURES, '*.html')))
+    if rutas:
+        paginas = []
+        for ruta in rutas:
+            with open(ruta, encoding='utf-8') as f:
+                paginas.append(f.read())
+        # Los fixtures se miden como un solo listado (el inventario completo)
+        html = ''.join(paginas)
+        yield 'fixtures', len(fragmentos.dividir(html)), html
+
+
+def comparar(resultados: list, base: list, tolerancia: float, minimo_ms: float = 1.0) -> bool:
+    """Imprime la razón contra `base`; True si ninguna etapa se puso más lenta que la tolerancia."""
+    previos = {(r['listado'], r['n'], r['etapa']): r['mediana_ms'] for r in base}
+    ok = True
+    for r in resultados:
+        previo = previos.get((r['listado'], r['n'], r['etapa']))
+        if previo is None:
+            continue
+        razon = r['mediana_ms'] / previo if previo else float('inf')
+        # Por debajo de `minimo_ms` el ruido domina: se informa pero no cuenta como regresión
+        regresion = razon > 1 + tolerancia and max(previo, r['mediana_ms']) >= minimo_ms
+        ok &= not regresion
+        print(f"{'REGRESIÓN' if regresion else '':9} {r['listado']:10} {r['n']:>7} {r['etapa']:32} "
+              f"{previo:10.2f} -> {r['mediana_ms']:10.2f} ms  x{razon:.2f}", file=sys.stderr)
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamaños', type=int, nargs='+', default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--salida', help='archivo JSON de resultados (por defecto, la salida estándar)')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento permitido (0.2 = 20 %%)')
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for listado, n, html in listados(args.tamaños):
+        for etapa, medida in etapas(html, args.repeticiones):
+            resultados.append({'listado': listado, 'n': n, 'etapa': etapa, **medida})
+            print(f"{listado:10} {n:>7} {etapa:32} {medida['mediana_ms']:10.2f} ms", file=sys.stderr)
+
+    salida = {'fecha': datetime.now().isoformat(timespec='seconds'), 'entorno': entorno(), 'resultados': resultados}
+    texto = json.dumps(salida, ensure_ascii=False, indent=1)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)['resultados']
+        return 0 if comparar(resultados, base, args.tolerancia) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Páginas sintéticas del listado de remates, con la estructura del portal.
+
+Cada remate es un <li class="clearfix"> con los mismos elementos y clases que
+lee parseo.CAMPOS_REMATE, y con la variedad que aparece en el portal: montos en
+Bs y en dólares, con y sin rebaja, meses con 'setiembre', fechas ilegibles,
+juzgados y ubicaciones con formatos distintos. Es determinista para una semilla
+y una fecha de referencia dadas.
+
+    python -m bench.generador 1000 > listado.html
+"""
+import random
+import sys
+from datetime import date, timedelta
+
+MESES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+         'septiembre', 'octubre', 'noviembre', 'diciembre']
+DEPARTAMENTOS = ['Sucre', 'La Paz', 'El Alto', 'Cochabamba', 'Santa Cruz', 'Oruro', 'Potosí',
+                 'Tarija', 'Trinidad', 'Cobija', 'Chuquisaca', 'Quillacollo', 'Montero']
+TIPOS = ['INMUEBLE'] * 6 + ['MUEBLE', 'VEHICULO', 'INMUEBLE RURAL']
+BIENES = ['CASA', 'DEPARTAMENTO', 'LOTE DE TERRENO', 'GALPÓN', 'OFICINA', 'TIENDA COMERCIAL']
+MATERIAS = ['Civil y Comercial', 'de Familia', 'Civil y Comercial Mixto', 'del Trabajo y Seguridad Social']
+
+
+def fecha_remate(rnd: random.Random, hoy: date) -> str:
+    if rnd.random() < 0.02:
+        return 'Fecha de Remate: a definir'  # no se puede leer: queda el texto original
+    d = hoy + timedelta(days=rnd.randint(-5, 60))
+    mes = 'setiembre' if d.month == 9 and rnd.random() < 0.5 else MESES[d.month - 1]
+    return f'Fecha de Remate: {d.day} de {mes} de {d.year} a horas {rnd.randint(8, 16)}:{rnd.choice(["00", "30"])}'
+
+
+def valor(rnd: random.Random) -> str:
+    if rnd.random() < 0.15:
+        monto = f'$us. {rnd.randint(5, 400)}.{rnd.randint(0, 999):03d},00'
+    else:
+        monto = f'{rnd.randint(10, 3_000)}.{rnd.randint(0, 999):03d},{rnd.choice(["00", "50"])} Bs.'
+    rebaja = rnd.choice(['', '', ' Rebaja: 20%', ' Rebaja:20%'])
+    return f'Valor Original: {monto} Empoce: {rnd.randint(1, 90)}.000 Bs.{rebaja}'
+
+
+def item(i: int, rnd: random.Random, hoy: date) -> str:
+    ciudad = rnd.choice(DEPARTAMENTOS)
+    ubicacion = rnd.choice([
+        f'Calle {rnd.randint(1, 300)} N° {i} - Zona {rnd.choice(["Central", "Norte", "Sur"])}, {ciudad}',
+        f'Av. Principal km {rnd.randint(1, 20)} - {ciudad}',
+        f'Urb. Los Pinos, Lote {i}, {ciudad}',
+    ])
+    return f'''<li class="clearfix">
+  <span class="chat-img pull-left"><img src="/img/martillo.png" alt="remate" class="img-circle" /></span>
+  <div class="chat-body clearfix">
+    <div class="header">
+      <strong class="primary-font">{rnd.choice(TIPOS)}</strong>
+      <small class="pull-right text-muted"><span class="glyphicon glyphicon-time"></span> {fecha_remate(rnd, hoy)}</small>
+    </div>
+    <p><i class="fa fa-server"> Descripción:Tipo Inmueble {rnd.choice(BIENES)} de {rnd.randint(80, 900)} m2, lote {i} N° Proceso: {rnd.randint(100, 9999)}/{rnd.randint(2015, 2025)}</i></p>
+    <p><i class="fa fa-money"> {valor(rnd)}</i></p>
+    <p><i class="fa fa-university"> Juzgado N° {rnd.randint(1, 12)} Juzgado Público {rnd.choice(MATERIAS)}</i></p>
+    <p><i class="fa fa-map-marker"> {ubicacion}</i></p>
+  </div>
+</li>'''
+
+
+def pagina(n: int, semilla: int = 1, hoy: date = None, paginas: int = 1) -> str:
+    """HTML de una página del listado con `n` remates (y enlaces a `paginas` páginas)."""
+    rnd = random.Random(semilla)
+    hoy = hoy or date.today()
+    enlaces = ''.join(f'<li><a href="/?page={p}">{p}</a></li>' for p in range(1, paginas + 1))
+    remates = '\n'.join(item(i, rnd, hoy) for i in range(n))
+    return (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Remates Judiciales</title></head>'
+        '<body><div class="panel-body"><ul class="chat">\n'
+        f'{remates}\n</ul><ul class="pagination">{enlaces}</ul></div></body></html>'
+    )
+
+
+if __name__ == '__main__':
+    sys.stdout.write(pagina(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
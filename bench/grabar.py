@@ -0,0 +1,33 @@
+"""Guarda las páginas del listado del portal como fixtures para los benchmarks.
+
+    python -m bench.grabar [--url URL] [--max-paginas N]
+
+Cada página queda en bench/fixtures/AAAA-MM-DD_NNN.html; bench.correr mide
+también sobre todos los .html de esa carpeta.
+"""
+import argparse
+import os
+from datetime import date
+
+from remates import crawler
+
+CARPETA = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=crawler.URL_PORTAL)
+    parser.add_argument('--max-paginas', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    os.makedirs(CARPETA, exist_ok=True)
+    paginas = crawler.rastrear(args.url, max_paginas=args.max_paginas)
+    for i, html in enumerate(paginas.values(), start=1):
+        ruta = os.path.join(CARPETA, f'{date.today().isoformat()}_{i:03d}.html')
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(ruta)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Comprueba que los backends de extracción (bs4 y lxml) dan la misma salida.
+
+    python -m bench.paridad [archivos.html ...]
+
+Por defecto usa los fixtures de bench/fixtures/paridad/ (casos.html, escrito a
+mano con casos borde, y sintetico.html, que es
+generador.pagina(300, semilla=2002, hoy=date(2025, 6, 2))) y, si hay, las
+páginas reales grabadas con bench.grabar. Para cada archivo compara los campos
+crudos de parseo.campos_bs4 y parseo.campos_lxml y el DataFrame normalizado de
+parseo.parsear con cada uno. Sale con código 1 si alguno difiere.
+"""
+import argparse
+import glob
+import os
+import sys
+
+from remates import fragmentos, parseo
+
+CARPETA = os.path.join(os.path.dirname(__file__), 'fixtures', 'paridad')
+GRABADAS = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def diferencias(html: str) -> list:
+    """Descripción de cada diferencia entre los dos backends (vacía si dan lo mismo)."""
+    bs4, lxml = list(parseo.campos_bs4(html)), list(parseo.campos_lxml(html))
+    if len(bs4) != len(lxml):
+        return [f"bs4 extrae {len(bs4)} remates y lxml {len(lxml)}"]
+    encontradas = [
+        f"remate {i + 1}, {columna}: bs4 {a!r} / lxml {b!r}"
+        for i, (fila_bs4, fila_lxml) in enumerate(zip(bs4, lxml))
+        for columna, a, b in zip(parseo.COLUMNAS_CRUDAS, fila_bs4, fila_lxml) if a != b
+    ]
+    if not encontradas:
+        df_bs4, df_lxml = parseo.parsear(html, 'bs4'), parseo.parsear(html, 'lxml')
+        if not df_bs4.equals(df_lxml) or not df_bs4.dtypes.equals(df_lxml.dtypes):
+            encontradas.append("los campos crudos coinciden pero el DataFrame normalizado no")
+    return encontradas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('archivos', nargs='*', help='páginas HTML (por defecto, los fixtures)')
+    args = parser.parse_args(argv)
+    if 'lxml' not in parseo.PARSERS:
+        parser.error("lxml no está instalado: no hay con qué comparar")
+
+    rutas = args.archivos or (sorted(glob.glob(os.path.join(CARPETA, '*.html')))
+                              + sorted(glob.glob(os.path.join(GRABADAS, '*.html'))))
+    ok = True
+    for ruta in rutas:
+        with open(ruta, encoding='utf-8') as f:
+            html = f.read()
+        encontradas = diferencias(html)
+        ok &= not encontradas
+        print(f"{'DIFIERE' if encontradas else 'ok':8} {ruta} ({len(fragmentos.dividir(html))} remates)")
+        for diferencia in encontradas[:20]:
+            print(f"         {diferencia}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Comprueba que el plazo de crawler.rastrear corta el rastreo en vez de devolverlo a medias.
+
+    python -m bench.plazo
+
+Contra bench.portal con una página que siempre responde 503 (y se reintenta con
+espera): con un plazo corto, rastrear tiene que lanzar PlazoVencido; sin plazo,
+devolver el Listado sin esa página y marcado como incompleto. Sale con código 1
+si algo de eso no pasa.
+"""
+import sys
+import time
+
+from bench.portal import PortalSimulado
+from remates import crawler
+
+PLAZO = 2.5  # menos que la espera de los reintentos (1 + 2 + 4 s): no alcanza para agotarlos
+
+
+def main(argv=None) -> int:
+    ok = True
+    with PortalSimulado(remates=40, paginas=3, latencia=0, fallas={2: 503}) as portal:
+        inicio = time.perf_counter()
+        try:
+            listado = crawler.rastrear(portal.url, plazo=PLAZO)
+        except crawler.PlazoVencido as e:
+            print(f"ok       con plazo: PlazoVencido a los {time.perf_counter() - inicio:.1f} s ({e})")
+        else:
+            ok = False
+            print(f"FALLA    con plazo: devolvió {len(listado)} páginas (completo={listado.completo})")
+
+        listado = crawler.rastrear(portal.url)
+        sin_pagina = not listado.completo and not any('page=2' in url for url in listado)
+        ok &= sin_pagina
+        print(f"{'ok' if sin_pagina else 'FALLA':8} sin plazo: {len(listado)} páginas, "
+              f"faltan {listado.faltantes}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
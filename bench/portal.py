@@ -0,0 +1,92 @@
+"""Copia local del portal de remates para los benchmarks de carga.
+
+Sirve por HTTP páginas de bench.generador con enlaces de paginación (?page=N),
+como el listado de thor.organojudicial.gob.bo, con una latencia configurable.
+
+    python -m bench.portal [--remates 2000] [--paginas 10] [--latencia 0.2] [--puerto 8780]
+"""
+import argparse
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from bench import generador
+
+
+class PortalSimulado:
+    """Servidor en un hilo; `url` apunta a la primera página. Se usa como context manager."""
+
+    def __init__(self, remates: int = 2_000, paginas: int = 10, latencia: float = 0.2,
+                 host: str = '127.0.0.1', puerto: int = 0, hoy: date = None, fallas: dict = None):
+        por_pagina = -(-remates // paginas)
+        hoy = hoy or date.today()
+        self.latencia = latencia
+        self.fallas = fallas or {}  # número de página -> código HTTP con el que siempre falla
+        self.pedidos = 0
+        # Las páginas se arman una vez: lo que se mide es la app, no el generador
+        self.paginas = {
+            p: generador.pagina(min(por_pagina, remates - (p - 1) * por_pagina), semilla=p, hoy=hoy,
+                                paginas=paginas).encode('utf-8')
+            for p in range(1, paginas + 1)
+        }
+        self.servidor = ThreadingHTTPServer((host, puerto), self._manejador())
+        self.servidor.daemon_threads = True
+        self.url = f'http://{host}:{self.servidor.server_port}/'
+
+    def _manejador(self):
+        portal = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                portal.pedidos += 1
+                pagina = parse_qs(urlsplit(self.path).query).get('page', ['1'])[0]
+                numero = int(pagina) if pagina.isdigit() else 0
+                cuerpo = portal.paginas.get(numero)
+                time.sleep(portal.latencia)
+                if numero in portal.fallas:
+                    self.send_error(portal.fallas[numero])
+                    return
+                if cuerpo is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        return Manejador
+
+    def __enter__(self):
+        threading.Thread(target=self.servidor.serve_forever, name='portal-simulado', daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--remates', type=int, default=2_000)
+    parser.add_argument('--paginas', type=int, default=10)
+    parser.add_argument('--latencia', type=float, default=0.2, help='segundos por pedido')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8780)
+    args = parser.parse_args(argv)
+
+    with PortalSimulado(args.remates, args.paginas, args.latencia, args.host, args.puerto) as portal:
+        print(f'Portal simulado en {portal.url} (REMATES_URL={portal.url})')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,21 @@
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import streamlit as st
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-from datetime import datetime
-import re
-import locale
+import numpy as np
+import os
+import time
+from datetime import date
+import logging
+import sqlite3
 import base64  # Para mostrar el logo centrado
+import uuid
+from functools import partial
+
+from remates import (alertas, almacen, api, consultas, crawler, exportacion, favoritos, fragmentos, historial, metricas,
+                     parseo, refresco)
+from remates.parseo import COLUMNAS_INTERNAS, calcular_urgencia, icono_urgencia
+
+log = logging.getLogger(__name__)
 
 # ================= CONFIG APP =================
 st.set_page_config(
@@ -122,162 +130,200 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ----- CONFIGURACIÓN LOCALIDAD -----
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except Exception:
-    pass
+# ================= DIAGNÓSTICO =================
+# Tiempos por etapa de este rerun: con ?diag=1 se ven en la barra lateral,
+# REMATES_METRICAS=log los escribe en el log y REMATES_METRICAS_PUERTO los expone
+# en /metrics (Prometheus). Si no se pidió nada de eso, no se mide.
+PUERTO_METRICAS = os.environ.get('REMATES_METRICAS_PUERTO')
+panel_diagnostico = st.query_params.get('diag') == '1'
+medicion = metricas.Medicion() if panel_diagnostico or metricas.LOG_JSON or PUERTO_METRICAS else metricas.NULA
+
+@st.cache_resource
+def endpoint_metricas(puerto: int):
+    """Un solo servidor de /metrics por proceso."""
+    return metricas.servir_en_segundo_plano(puerto)
+
+if PUERTO_METRICAS:
+    endpoint_metricas(int(PUERTO_METRICAS))
 
 # ================= SCRAPING =================
-url = "https://thor.organojudicial.gob.bo/"
+# REMATES_URL permite apuntar a una copia local del portal (pruebas, mirrors)
+url = os.environ.get('REMATES_URL') or crawler.URL_PORTAL
+# REMATES_API: leer el listado ya procesado de `python -m remates servir` en vez del portal
+url_api = os.environ.get('REMATES_API')
+
+RUTA_DB = os.environ.get('REMATES_DB') or 'remates.db'
+
+@st.cache_resource
+def almacen_remates() -> almacen.Almacen:
+    """Copia local del listado (SQLite); REMATES_DB cambia la ruta del archivo."""
+    return almacen.Almacen(RUTA_DB)
+
+@st.cache_resource
+def alertas_guardadas() -> alertas.Alertas:
+    """Búsquedas guardadas (alertas), en la misma base que la copia local."""
+    return alertas.Alertas(RUTA_DB)
+
+@st.cache_resource
+def historial_remates() -> historial.Historial:
+    """Resúmenes diarios que actualiza cada guardado de la copia local."""
+    return historial.Historial(RUTA_DB)
+
+@st.cache_resource
+def cache_fragmentos() -> fragmentos.CacheLRU:
+    """Registros normalizados por huella de fragmento <li>, compartidos por todo el proceso."""
+    return fragmentos.CacheLRU(max_items=50_000)
+
+def guardar_copia(almacen_local: almacen.Almacen, guardadas: alertas.Alertas, cache: fragmentos.CacheLRU,
+                  paginas: dict, huella: str):
+    """Guarda cada contenido nuevo en la copia local y evalúa las alertas sobre el delta.
+
+    La llama el refresco una vez por cambio de huella, en su hilo de procesamiento (nunca
+    en el de una sesión, tampoco en frío) y fuera de las cachés de Streamlit: un contenido
+    que vuelve (A -> B -> A) también se guarda. Si el rastreo
+    quedó incompleto no se dan de baja los remates que faltan. El primer guardado en una
+    base vacía (o reconstruida) es la línea de base: todo sale como nuevo y no se avisa.
+    """
+    inicio = time.perf_counter()
+    if url_api:
+        df = api.leer_inventario(next(iter(paginas.values())))
+    else:
+        df = parseo.unir([parseo.parsear(html, cache=cache) for html in paginas.values()])
+    momento = time.time()
+    try:
+        base_vacia = almacen_local.ultimo_momento() is None
+        # La API entrega un dict simple, sin datos del rastreo del servidor: se toma como completo
+        almacen_local.guardar(df, momento, completo=getattr(paginas, 'completo', True))
+    except sqlite3.Error as e:
+        log.warning("No se pudo guardar la copia local: %s", e)
+        return
+    log.info("Copia local de %s actualizada (%d remates) en %.2f s", huella[:8], len(df), time.perf_counter() - inicio)
+    if base_vacia:
+        log.info("Primer guardado de la copia local: no se evalúan las alertas sobre la línea de base")
+        return
+    alertas.procesar_en_segundo_plano(almacen_local, guardadas, momento)
 
-@st.cache_data(ttl=600)  # cache 10 min (evita pedir a cada rerun)
-def descargar_html(url: str) -> str:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
-        "Accept-Language": "es-BO,es;q=0.9,en;q=0.8",
-    }
-    s = requests.Session()
-    retries = Retry(
-        total=4,
-        backoff_factor=1,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=("GET",),
-    )
-    s.mount("https://", HTTPAdapter(max_retries=retries))
-    r = s.get(url, headers=headers, timeout=(15, 60))  # (connect, read)
-    r.raise_for_status()
-    return r.text
+@st.cache_resource
+def refresco_portal(url: str, url_api: str = None) -> refresco.Refresco:
+    """Un solo refresco por proceso: todas las sesiones leen la misma descarga.
+
+    Se revalida cada 10 min en segundo plano (cada minuto contra la API, que responde
+    304 si no hubo cambios); mientras tanto se sirven los datos previos. Si el portal
+    no responde, se vuelve a probar en segundo plano con espera creciente.
+    """
+    al_cambiar = partial(guardar_copia, almacen_remates(), alertas_guardadas(), cache_fragmentos())
+    if url_api:
+        return refresco.Refresco(url_api.rstrip('/') + '/inventario', ttl=60, descargar=api.descargar_inventario,
+                                 al_cambiar=al_cambiar)
+    return refresco.Refresco(url, ttl=600, al_cambiar=al_cambiar)
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def copia_guardada(momento: float):
+    """(DataFrame, momento) de la copia local; se vuelve a leer solo si hubo un guardado nuevo."""
+    return almacen_remates().ultimo_snapshot()
+
+def ultima_copia():
+    momento = almacen_remates().ultimo_momento()
+    return None if momento is None else copia_guardada(momento)
+
+portal = refresco_portal(url, url_api)
+# En frío (o con el portal caído desde el arranque), si hay una copia guardada se muestra
+# esa mientras llega la primera descarga
+snapshot = ultima_copia() if portal.paginas is None else None
 
 try:
-    html_content = descargar_html(url)
+    with medicion.etapa('portal') as m:
+        bytes_previos = metricas.REGISTRO.contador('descarga_bytes')
+        estado_portal = portal.obtener(bloquear=snapshot is None)
+        # Solo hay bytes si este rerun esperó la descarga (en frío)
+        m['bytes'] = int(metricas.REGISTRO.contador('descarga_bytes') - bytes_previos)
 except requests.exceptions.RequestException as e:
-    st.error(
-        "⚠️ No se pudo conectar con 'thor.organojudicial.gob.bo' desde Streamlit Cloud. "
-        "Puede ser lentitud del sitio o bloqueo por IP/GeoIP."
-    )
+    if url_api:
+        st.error(f"⚠️ No se pudo conectar con la API de remates ({url_api}).")
+    else:
+        st.error(
+            "⚠️ No se pudo conectar con 'thor.organojudicial.gob.bo' desde Streamlit Cloud. "
+            "Puede ser lentitud del sitio o bloqueo por IP/GeoIP."
+        )
+    espera = portal.circuito.espera()
+    if espera:
+        st.caption(f"Se vuelve a intentar automáticamente en {max(1, round(espera / 60))} min.")
     if st.button("🔄 Reintentar conexión"):
-        descargar_html.clear()
         st.rerun()
     st.stop()
 
-soup = BeautifulSoup(html_content, 'html.parser')
-remates = soup.find_all('li', class_='clearfix')
-
-tipos_inmuebles = []
-valores = []
-fechas_publicacion = []
-juzgados = []
-ubicaciones = []
-numeros_proceso = []
-rebaja = []
-iconos = []
-descripciones = []
-
-patron = r"(\d{1,2}) de (\w+) de (\d{4})"
-
-def extraer_fecha(fecha_str: str):
-    match = re.search(patron, fecha_str)
-    if match:
-        dia, mes, anio = match.groups()
-        try:
-            fecha_formateada = datetime.strptime(
-                f"{dia} {mes} {anio}",
-                "%d %B %Y"
-            ).strftime("%d/%m/%Y")
-            return fecha_formateada
-        except Exception:
-            return None
-    return None
-
-def limpiar_descripcion(descripcion: str):
-    return descripcion.replace('Descripción:Tipo Inmueble ', '')
-
-def limpiar_valor(valor: str):
-    valor_limpio = valor.replace('Valor Original: ', '').split('Empoce:')[0].strip()
-    return valor_limpio
-
-def limpiar_juzgado(juzgado: str):
-    juzgado_limpio = juzgado.replace('Juzgado N° ', '').replace('Juzgado Público', '').strip()
-    return juzgado_limpio
-
-def extraer_ciudad(ubicacion: str):
-    """Toma la última parte de la ubicación como ciudad (después de '-' o ',')."""
-    if not isinstance(ubicacion, str):
-        return None
-    parte = ubicacion.split('-')[-1]
-    parte = parte.split(',')[-1]
-    return parte.strip()
-
-for remate in remates:
-    tipo_inmueble = remate.find('strong', class_='primary-font').text.strip()
-    valor = remate.find('i', class_='fa-money').text.strip()
-    fecha_publicacion = remate.find('small', class_='pull-right').text.strip()
-    juzgado = remate.find('i', class_='fa-university').text.strip()
-    ubicacion = remate.find('i', class_='fa-map-marker').text.strip()
-    numero_proceso = remate.find('i', class_='fa-server').text.split('N° Proceso: ')[-1].strip()
-
-    descripcion = remate.find('i', class_='fa-server')
-    descripcion_texto = descripcion.text.strip() if descripcion else "Descripción no disponible"
-    descripcion_limpia = limpiar_descripcion(descripcion_texto)
-
-    rebaja_value = '0%'
-    if 'Rebaja' in valor:
-        rebaja_value = valor.split('Rebaja: ')[-1].split('%')[0] + '%'
-
-    fecha_str = extraer_fecha(fecha_publicacion)
-
-    # Cálculo de días para el color
-    try:
-        fecha_remate = datetime.strptime(fecha_str, "%d/%m/%Y")
-        diff = fecha_remate - datetime.now()
-        days_left = diff.days
-        if days_left <= 2:
-            iconos.append('🟥')
-        elif 3 <= days_left <= 7:
-            iconos.append('🟨')
-        elif 8 <= days_left <= 14:
-            iconos.append('🟩')
-        elif days_left > 14:
-            iconos.append('🟦')
-        else:
-            iconos.append('🟥')
-    except Exception:
-        iconos.append('🟦')
-
-    valor_limpio = limpiar_valor(valor)
-    juzgado_limpio = limpiar_juzgado(juzgado)
-
-    tipos_inmuebles.append(tipo_inmueble)
-    valores.append(valor_limpio)
-    fechas_publicacion.append(fecha_publicacion)
-    juzgados.append(juzgado_limpio)
-    ubicaciones.append(ubicacion)
-    numeros_proceso.append(numero_proceso)
-    rebaja.append(rebaja_value)
-    descripciones.append(descripcion_limpia)
+# El resultado se comparte entre sesiones y reruns: Streamlit usa un hash del
+# HTML como clave, así que solo se vuelve a parsear cuando cambia la página.
+@st.cache_data(max_entries=256, show_spinner=False)
+def parse_remates(html: str, parser: str = parseo.PARSER_POR_DEFECTO, _medicion=metricas.NULA) -> pd.DataFrame:
+    """Convierte el HTML del listado en el DataFrame base de remates.
 
-# --------- FAVORITOS en Session State ---------
+    Solo se extraen y normalizan los fragmentos <li> que no están en cache_fragmentos().
+    """
+    _medicion.fallo('parse_remates')
+    return parseo.parsear(html, parser, cache_fragmentos(), _medicion)
+
+# Clave = huella del contenido: si el portal no cambió entre refrescos no se parsea nada
+@st.cache_data(max_entries=4, show_spinner=False)
+def cargar_inventario(huella: str, _paginas: dict, _medicion=metricas.NULA) -> pd.DataFrame:
+    """Une los remates de todas las páginas descargadas en un solo DataFrame."""
+    _medicion.fallo('cargar_inventario')
+    if url_api:
+        with _medicion.etapa('inventario.api') as m:
+            df = api.leer_inventario(next(iter(_paginas.values())))
+            m['filas'] = len(df)
+    else:
+        def parsear_pagina(html):
+            with _medicion.etapa('parse_remates', cache='parse_remates'):
+                return parse_remates(html, _medicion=_medicion)
+        df = parseo.unir([parsear_pagina(html) for html in _paginas.values()])
+    return df
+
+# --------- FAVORITOS (persistentes, por navegador) ---------
+@st.cache_resource
+def favoritos_guardados() -> favoritos.Favoritos:
+    return favoritos.Favoritos(RUTA_DB)
+
+def usuario_actual() -> str:
+    """Token del navegador. Viaja en la URL (?u=...): volviendo con el mismo enlace
+    se recuperan los favoritos."""
+    token = st.query_params.get('u')
+    if not token:
+        token = st.query_params['u'] = uuid.uuid4().hex
+    return token
+
+# Set de Números de Proceso marcados, cargado una vez por sesión
 if 'favoritos' not in st.session_state:
-    st.session_state['favoritos'] = []
+    st.session_state['usuario'] = usuario_actual()
+    try:
+        st.session_state['favoritos'] = favoritos_guardados().listar(st.session_state['usuario'])
+    except sqlite3.Error as e:
+        log.warning("No se pudieron leer los favoritos: %s", e)
+        st.session_state['favoritos'] = set()
 
 # ================= DATAFRAME BASE =================
-data = {
-    '': iconos,
-    'Tipo de Inmueble': tipos_inmuebles,
-    'Descripción': descripciones,
-    'Valor Original del Inmueble': valores,
-    'Fecha de Remate del Inmueble': fechas_publicacion,
-    'Juzgado': juzgados,
-    'Ubicación': ubicaciones,
-    'Número de Proceso': numeros_proceso,
-    'Rebaja': rebaja
-}
-
-df = pd.DataFrame(data)
-df['FechaFormateada'] = df['Fecha de Remate del Inmueble'].apply(extraer_fecha)
-df['FechaDate'] = pd.to_datetime(df['FechaFormateada'], format="%d/%m/%Y", errors="coerce")
-df['Ciudad'] = df['Ubicación'].apply(extraer_ciudad)
+# Índices y urgencia se arman una vez por dataset y por día (la urgencia depende de la
+# fecha) y se comparten entre sesiones: el DataFrame del motor es de solo lectura.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def motor_consultas(clave_datos: str, hoy: date, _cargar, _medicion=metricas.NULA) -> consultas.MotorConsultas:
+    _medicion.fallo('motor_consultas')
+    inventario = _cargar()
+    with _medicion.etapa('indices') as m:
+        m['filas'] = len(inventario)
+        return consultas.MotorConsultas(calcular_urgencia(inventario))
+
+def cargar_desde_portal():
+    with medicion.etapa('inventario.carga', cache='cargar_inventario'):
+        return cargar_inventario(estado_portal.huella, estado_portal.paginas, medicion)
+
+with medicion.etapa('inventario', cache='motor_consultas'):
+    if estado_portal.paginas is not None:
+        clave_datos = estado_portal.huella
+        motor = motor_consultas(clave_datos, date.today(), cargar_desde_portal, medicion)
+    else:
+        clave_datos = f"copia-{snapshot[1]}"
+        motor = motor_consultas(clave_datos, date.today(), lambda: snapshot[0], medicion)
+df = motor.df
 
 # ================= SIDEBAR: LEYENDA + FILTROS =================
 st.sidebar.markdown("### Leyenda de colores")
@@ -304,24 +350,37 @@ st.sidebar.markdown(
 st.sidebar.markdown("---")
 st.sidebar.markdown("### Filtros")
 
-# Filtro por ciudad (una sola)
-ciudades_unicas = sorted(df['Ciudad'].dropna().unique())
-opciones_ciudad = ["Todas las ciudades"] + ciudades_unicas
+# Filtro por departamento y ciudad (una sola), según el nomenclátor de remates.lugares
+opciones_departamento = ["Todos los departamentos"] + motor.departamentos
+
+default_departamento = "Chuquisaca"
+if default_departamento in opciones_departamento:
+    default_index = opciones_departamento.index(default_departamento)
+else:
+    default_index = 0  # fallback: "Todos los departamentos"
+
+departamento_sel = st.sidebar.selectbox(
+    "Departamento",
+    opciones_departamento,
+    index=default_index
+)
 
-default_ciudad = "Chuquisaca"
-if default_ciudad in opciones_ciudad:
-    default_index = opciones_ciudad.index(default_ciudad)
+# Solo las ciudades (municipios) del departamento elegido
+if departamento_sel == "Todos los departamentos":
+    opciones_ciudad = ["Todas las ciudades"] + motor.ciudades
 else:
-    default_index = 0  # fallback: "Todas las ciudades"
+    opciones_ciudad = ["Todas las ciudades"] + motor.ciudades_por_departamento.get(departamento_sel, [])
 
 ciudad_sel = st.sidebar.selectbox(
     "Ciudad",
     opciones_ciudad,
-    index=default_index
 )
 
 # Filtro texto
-texto_busqueda = st.sidebar.text_input("Buscar (descripción o N° proceso)")
+texto_busqueda = st.sidebar.text_input(
+    "Buscar (descripción o N° proceso)",
+    help="Sin distinguir mayúsculas ni acentos. Deben aparecer todas las palabras (o palabras que empiecen así).",
+)
 
 # Filtro rango fechas
 min_fecha = df['FechaDate'].min()
@@ -340,21 +399,69 @@ if pd.notnull(min_fecha) and pd.notnull(max_fecha):
     else:
         fecha_ini, fecha_fin = min_fecha.date(), max_fecha.date()
 
-# Aplicar filtros básicos (tipo inmueble y ciudad)
-df_filtered = df[df['Tipo de Inmueble'].str.contains('INMUEBLE', case=False)]
-
-if ciudad_sel != "Todas las ciudades":
-    df_filtered = df_filtered[df_filtered['Ciudad'] == ciudad_sel]
-
-if texto_busqueda:
-    mask_desc = df_filtered['Descripción'].str.contains(texto_busqueda, case=False, na=False)
-    mask_proc = df_filtered['Número de Proceso'].str.contains(texto_busqueda, case=False, na=False)
-    df_filtered = df_filtered[mask_desc | mask_proc]
-
-if fecha_ini and fecha_fin:
-    mask_fecha = (df_filtered['FechaDate'] >= pd.to_datetime(fecha_ini)) & \
-                 (df_filtered['FechaDate'] <= pd.to_datetime(fecha_fin))
-    df_filtered = df_filtered[mask_fecha]
+# Filtro rango de valor (en Bs; los montos en dólares se convierten)
+valor_min, valor_max = None, None
+rango_valor = motor.rango_valor()
+if rango_valor is not None and rango_valor[0] < rango_valor[1]:
+    minimo, maximo = int(rango_valor[0]), int(np.ceil(rango_valor[1]))
+    sel_min, sel_max = st.sidebar.slider("💰 Valor original (Bs)", minimo, maximo, (minimo, maximo))
+    # Con el rango completo no se filtra: así no se pierden los remates sin valor
+    if (sel_min, sel_max) != (minimo, maximo):
+        valor_min, valor_max = sel_min, sel_max
+
+# Aplicar filtros (tipo inmueble, lugar, texto, fechas y valor) en una sola consulta
+filtro_actual = consultas.Filtro(
+    departamento=None if departamento_sel == "Todos los departamentos" else departamento_sel,
+    ciudad=None if ciudad_sel == "Todas las ciudades" else ciudad_sel,
+    texto=texto_busqueda or None,
+    fecha_ini=fecha_ini if fecha_ini and fecha_fin else None,
+    fecha_fin=fecha_fin if fecha_ini and fecha_fin else None,
+    valor_min=valor_min,
+    valor_max=valor_max,
+)
+with medicion.etapa('filtrado') as m:
+    resultado = motor.filtrar(filtro_actual)
+    m['filas'] = resultado.total
+df_filtered = resultado.vista
+
+# --------- ALERTAS (búsquedas guardadas) ---------
+def panel_alertas(filtro: consultas.Filtro):
+    """Guardar los filtros actuales como alerta y listar/borrar las del usuario."""
+    usuario = st.session_state['usuario']
+    # El rango de fechas por defecto es el del listado de hoy: guardado así dejaría
+    # afuera a los remates que se publiquen más adelante
+    if pd.notnull(min_fecha) and (filtro.fecha_ini, filtro.fecha_fin) == (min_fecha.date(), max_fecha.date()):
+        filtro = filtro._replace(fecha_ini=None, fecha_fin=None)
+    with st.sidebar.expander("🔔 Alertas de nuevos remates"):
+        st.caption("Guarda los filtros actuales: cuando lleguen remates nuevos o modificados que los "
+                   "cumplan, se avisa al destino.")
+        nombre = st.text_input("Nombre de la alerta", value=filtro.ciudad or filtro.departamento or "Todas las ciudades")
+        rebaja = st.selectbox("Rebaja", ["Cualquiera", "0%", "20%"])
+        urgentes = st.checkbox("Solo urgentes (rojo o amarillo)")
+        destino = st.text_input("Destino", placeholder=" · ".join(alertas.ejemplos_destino()))
+        if st.button("Guardar alerta"):
+            try:
+                alertas_guardadas().agregar(usuario, nombre, filtro, destino,
+                                            rebaja=None if rebaja == "Cualquiera" else int(rebaja[:-1]),
+                                            urgentes=urgentes)
+            except ValueError as e:
+                st.error(str(e))
+            except sqlite3.Error as e:
+                log.warning("No se pudo guardar la alerta: %s", e)
+                st.error("No se pudo guardar la alerta.")
+        try:
+            propias = alertas_guardadas().listar(usuario)
+        except sqlite3.Error as e:
+            log.warning("No se pudieron leer las alertas: %s", e)
+            propias = []
+        for alerta in propias:
+            col_texto, col_borrar = st.columns([5, 1])
+            col_texto.markdown(f"**{alerta.nombre}** · {alertas.describir(alerta)}  \n→ `{alerta.destino}`")
+            if col_borrar.button("🗑️", key=f"borrar_alerta_{alerta.id}", help="Borrar alerta"):
+                alertas_guardadas().borrar(alerta.id, usuario)
+                st.rerun()
+
+panel_alertas(filtro_actual)
 
 # ================= CABECERA: LOGO + TÍTULO =================
 def header_con_logo_y_titulo():
@@ -397,13 +504,38 @@ def header_con_logo_y_titulo():
 
 header_con_logo_y_titulo()
 
+# ================= ESTADO DE LOS DATOS =================
+def mostrar_estado_datos(estado, snapshot=None):
+    """Antigüedad de los datos y estado del refresco en segundo plano."""
+    if estado.paginas is None:
+        guardado = time.strftime('%d/%m/%Y %H:%M', time.localtime(snapshot[1]))
+        partes = [f"🗄️ Mostrando la copia guardada del {guardado}"]
+    else:
+        minutos = int((time.time() - estado.actualizado) // 60)
+        partes = [f"🕒 Datos del portal de hace {minutos} min" if minutos else "🕒 Datos del portal recién actualizados"]
+    if estado.refrescando:
+        partes.append("🔄 actualizando en segundo plano…")
+    if estado.error:
+        # Se sigue mostrando la última descarga buena (o la copia guardada): que se note
+        cuando = snapshot[1] if estado.paginas is None else estado.actualizado
+        origen = "copia guardada" if estado.paginas is None else "última descarga buena"
+        aviso = (f"⚠️ El portal no responde: se muestran los datos del "
+                 f"{time.strftime('%d/%m/%Y %H:%M', time.localtime(cuando))} ({origen}).")
+        if estado.proximo_intento:
+            minutos = max(1, round((estado.proximo_intento - time.time()) / 60))
+            aviso += f" Próximo intento automático en {minutos} min."
+        st.warning(aviso)
+    st.caption(" · ".join(partes))
+
+mostrar_estado_datos(estado_portal, snapshot)
+
 # ================= KPIs =================
 col_k1, col_k2, col_k3, col_k4 = st.columns(4)
 
-total = len(df_filtered)
-total_0 = len(df_filtered[df_filtered["Rebaja"] == "0%"])
-total_20 = len(df_filtered[df_filtered["Rebaja"] == "20%"])
-total_urgentes = len(df_filtered[df_filtered[''].isin(['🟥', '🟨'])])
+total = resultado.total
+total_0 = resultado.total_0
+total_20 = resultado.total_20
+total_urgentes = resultado.total_urgentes
 
 with col_k1:
     st.markdown('<div class="kpi-card-total">', unsafe_allow_html=True)
@@ -428,42 +560,84 @@ with col_k4:
 st.markdown("---")
 
 # ================= FUNCIÓN VISTA DETALLADA =================
-def mostrar_detalle(df_detalle: pd.DataFrame, titulo: str):
-    """Muestra una lista de expanders con enumeración 1,2,3..."""
+REMATES_POR_PAGINA = 20
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def fichas_detalle(clave_datos: str, hoy: date, _df: pd.DataFrame) -> pd.DataFrame:
+    """Título y cuerpo (markdown) del expander de cada remate, armados una vez por dataset."""
+    fecha_txt = parseo.fecha_corta(_df)
+
+    def campo(etiqueta, serie, si_falta):
+        return f"**{etiqueta}:** " + serie.astype(object).fillna(si_falta).astype(str)
+
+    cuerpo = campo('N° en listado', pd.Series(_df.index + 1, index=_df.index), '')
+    for parte in (
+        campo('Descripción', _df['Descripción'], 'Sin descripción'),
+        campo('Valor original', _df['Valor Original del Inmueble'], 'No registrado'),
+        campo('Rebaja', _df['Rebaja'], 'No especificada') + '%',
+        campo('Fecha de remate', fecha_txt, ''),
+        campo('Número de Proceso', _df['Número de Proceso'], 'No registrado'),
+        campo('Juzgado', _df['Juzgado'], 'No registrado'),
+        campo('Ciudad', _df['Ciudad'], 'Sin ciudad'),
+        campo('Provincia', _df['Provincia'], 'Sin provincia'),
+        campo('Departamento', _df['Departamento'], 'Sin departamento'),
+        campo('Ubicación completa', _df['Ubicación'], 'Sin ubicación'),
+    ):
+        cuerpo = cuerpo + '\n\n' + parte
+    titulo = icono_urgencia(_df['DiasRestantes']) + ' ' + fecha_txt.astype(str) + ' | ' + _df['Tipo de Inmueble'].astype(str)
+    return pd.DataFrame({'titulo': titulo, 'cuerpo': cuerpo})
+
+def mostrar_detalle(df_detalle: pd.DataFrame, titulo: str, clave: str):
+    """Muestra una lista de expanders con enumeración 1,2,3..., de a una página por vez.
+
+    La página actual queda en session_state bajo `pagina_<clave>`.
+    """
     st.markdown(f"### {titulo}")
     if df_detalle.empty:
         st.info("No hay remates para mostrar en detalle.")
         return
-    df_detalle = df_detalle.sort_values('FechaDate')
-    for i, (idx, row) in enumerate(df_detalle.iterrows(), start=1):
-        fecha_txt = row.get('FechaFormateada') or row.get('Fecha de Remate del Inmueble', '')
-        titulo_exp = (
-            f"{i}. {row.get('', '')} {fecha_txt} | {row.get('Tipo de Inmueble', '')}"
+    orden = df_detalle.sort_values('FechaDate').index
+    total_paginas = -(-len(orden) // REMATES_POR_PAGINA)
+
+    pagina = 1
+    if total_paginas > 1:
+        key = f"pagina_{clave}"
+        # Si cambiaron los filtros puede haber menos páginas que antes
+        if st.session_state.get(key, 1) > total_paginas:
+            st.session_state[key] = total_paginas
+        pagina = st.number_input(
+            f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, step=1, key=key,
         )
-        with st.expander(titulo_exp):
-            st.write(f"**N° en listado:** {idx + 1}")
-            st.write(f"**Descripción:** {row.get('Descripción', 'Sin descripción')}")
-            st.write(f"**Valor original:** {row.get('Valor Original del Inmueble', 'No registrado')}")
-            st.write(f"**Rebaja:** {row.get('Rebaja', 'No especificada')}")
-            st.write(f"**Fecha de remate:** {fecha_txt}")
-            st.write(f"**Número de Proceso:** {row.get('Número de Proceso', 'No registrado')}")
-            st.write(f"**Juzgado:** {row.get('Juzgado', 'No registrado')}")
-            st.write(f"**Ciudad:** {row.get('Ciudad', 'Sin ciudad')}")
-            st.write(f"**Ubicación completa:** {row.get('Ubicación', 'Sin ubicación')}")
+    inicio = (pagina - 1) * REMATES_POR_PAGINA
+    fin = min(inicio + REMATES_POR_PAGINA, len(orden))
+    st.caption(f"Remates {inicio + 1}–{fin} de {len(orden)}")
+
+    with medicion.etapa('detalle') as m:
+        fichas = fichas_detalle(clave_datos, date.today(), df).loc[orden[inicio:fin]]
+        for i, (titulo_exp, cuerpo) in enumerate(zip(fichas['titulo'], fichas['cuerpo']), start=inicio + 1):
+            with st.expander(f"{i}. {titulo_exp}"):
+                st.markdown(cuerpo)
+        m['filas'] = len(fichas)
 
 # ================= REMATES MÁS URGENTES =================
 st.markdown("### Remates más urgentes (Rojo y Amarillo) 🟥🟨")
-urgentes = df_filtered[df_filtered[''].isin(['🟥', '🟨'])].copy()
-urgentes = urgentes.sort_values('FechaDate').head(30)
+urgentes = resultado.vista_urgentes.sort_values('FechaDate').head(30)
 
 if urgentes.empty:
     st.info("No hay remates urgentes (rojo o amarillo) con los filtros actuales.")
 else:
-    mostrar_detalle(urgentes, "Detalle de remates más urgentes")
+    mostrar_detalle(urgentes, "Detalle de remates más urgentes", 'urgentes')
 
 st.markdown("---")
 
 # ================= FUNCIÓN PARA TABLAS CON FAVORITOS =================
+@st.cache_resource(max_entries=4, show_spinner=False)
+def tabla_listado(clave_datos: str, hoy: date, _df: pd.DataFrame, _medicion=metricas.NULA) -> pd.DataFrame:
+    """Tabla de las pestañas, armada una vez por dataset: columnas en orden de
+    pantalla, ícono de color junto a la fecha y sin columnas internas."""
+    _medicion.fallo('tabla_listado')
+    return parseo.tabla_listado(_df)
+
 def marcar_favorito(df_visible: pd.DataFrame, tabla_key: str):
     """
     Muestra una tabla con:
@@ -472,104 +646,201 @@ def marcar_favorito(df_visible: pd.DataFrame, tabla_key: str):
     - Número de Proceso a la derecha de Fecha de Remate del Inmueble
     - Solo la columna Favorito es editable.
     """
-    df_visible = df_visible.copy()
-
-    # N° = índice + 1 (posición en el listado filtrado)
-    df_visible.insert(0, "N°", range(1, len(df_visible) + 1))
-
-    # Estado de favoritos desde session_state
-    favoritos = st.session_state.get('favoritos', [])
-    df_visible['Favorito'] = df_visible.index.isin(favoritos)
-
-    # Mover Favorito a la segunda columna
-    cols = df_visible.columns.tolist()
-    cols.remove('Favorito')
-    cols.insert(1, 'Favorito')
-    df_visible = df_visible[cols]
-
-    # Mover Número de Proceso justo después de Fecha de Remate del Inmueble
-    if 'Número de Proceso' in df_visible.columns and 'Fecha de Remate del Inmueble' in df_visible.columns:
-        cols = df_visible.columns.tolist()
-        cols.remove('Número de Proceso')
-        idx_fecha = cols.index('Fecha de Remate del Inmueble')
-        cols.insert(idx_fecha + 1, 'Número de Proceso')
-        df_visible = df_visible[cols]
-
-    # Combinar ícono de color con fecha para mostrar
-    display_df = df_visible.assign(
-        **{
-            'Fecha de Remate del Inmueble': df_visible[''].fillna('') + ' ' + df_visible['Fecha de Remate del Inmueble']
-        }
-    ).drop(columns=['', 'FechaDate', 'FechaFormateada', 'Ciudad'], errors='ignore')
+    with medicion.etapa('tabla.armado', cache='tabla_listado') as m:
+        # Las filas de la vista, tomadas de la tabla ya armada (un solo take)
+        display_df = tabla_listado(clave_datos, date.today(), df, medicion).loc[df_visible.index]
 
-    disabled_cols = [c for c in display_df.columns if c != 'Favorito']
+        # N° = índice + 1 (posición en el listado filtrado)
+        display_df.insert(0, "N°", range(1, len(display_df) + 1))
 
-    edited = st.data_editor(
-        display_df,
-        key=tabla_key,
-        column_config={
-            "Favorito": st.column_config.CheckboxColumn(
-                "Favorito",
-                help="Marcar como favorito"
-            )
-        },
-        width="stretch",
-        hide_index=True,
-        disabled=disabled_cols,
-    )
+        # Estado de favoritos desde session_state
+        actuales = st.session_state['favoritos']
+        display_df.insert(1, 'Favorito', display_df['Número de Proceso'].isin(actuales))
+        m['filas'] = len(display_df)
 
-    # Actualizar favoritos en session_state según la vista editada
-    favoritos_en_tabla = edited[edited['Favorito']].index.tolist()
-    fav_set = set(st.session_state['favoritos'])
-    fav_set.update(favoritos_en_tabla)
+    disabled_cols = [c for c in display_df.columns if c != 'Favorito']
 
-    for idx in df_visible.index:
-        if idx not in favoritos_en_tabla and idx in fav_set:
-            fav_set.remove(idx)
+    with medicion.etapa('tabla.data_editor') as m:
+        edited = st.data_editor(
+            display_df,
+            key=tabla_key,
+            column_config={
+                "Favorito": st.column_config.CheckboxColumn(
+                    "Favorito",
+                    help="Marcar como favorito"
+                ),
+                "Rebaja": st.column_config.NumberColumn("Rebaja", format="%d%%"),
+            },
+            width="stretch",
+            hide_index=True,
+            disabled=disabled_cols,
+        )
+        m['filas'] = len(display_df)
 
-    st.session_state['favoritos'] = list(fav_set)
+    # Actualizar favoritos según lo marcado en la tabla (diferencia de sets)
+    marcados = set(edited.loc[edited['Favorito'], 'Número de Proceso'].dropna())
+    agregar, quitar = favoritos.diferencia(actuales, set(display_df['Número de Proceso'].dropna()), marcados)
+    if agregar or quitar:
+        st.session_state['favoritos'] = (actuales | agregar) - quitar
+        try:
+            favoritos_guardados().aplicar(st.session_state['usuario'], agregar, quitar)
+        except sqlite3.Error as e:
+            log.warning("No se pudieron guardar los favoritos: %s", e)
     return edited
 
+# ================= FUNCIÓN PARA EXPORTAR =================
+def botones_exportacion(vista: pd.DataFrame, nombre: str, clave: str):
+    """Un botón por formato con las mismas columnas que la tabla. El archivo se arma
+    por bloques al hacer clic, en otro hilo: no hace esperar al rerun."""
+    marcados = set(st.session_state['favoritos'])
+    st.caption(f"Exportar estos {len(vista):,} remates:")
+    for columna, (formato, f) in zip(st.columns(len(exportacion.FORMATOS)), exportacion.FORMATOS.items()):
+        columna.download_button(
+            f"⬇️ {f.etiqueta}",
+            data=lambda formato=formato: exportacion.a_bytes(vista, formato, marcados),
+            file_name=f"{nombre}_{date.today().isoformat()}.{f.extension}",
+            mime=f.tipo,
+            key=f"exportar_{clave}_{formato}",
+            on_click="ignore",
+            width="stretch",
+        )
+
 # ================= LISTADO DE REMATES =================
 st.subheader("Listado de remates")
 modo_detalle = st.checkbox("🔍 Activar vista detallada (expanders por remate)")
 
-tab0, tab20, tabAll = st.tabs(["0% de Rebaja", "20% de Rebaja", "Todos los remates"])
+# Con on_change="rerun" solo se ejecuta la pestaña visible (tab.open)
+tab0, tab20, tabAll, tabHist = st.tabs(
+    ["0% de Rebaja", "20% de Rebaja", "Todos los remates", "📈 Historial"], key="pestaña_listado", on_change="rerun",
+)
 
 # ----- TAB 0% -----
 with tab0:
-    st.write("Remates sin rebaja registrada.")
-    df_0_base = df_filtered[df_filtered['Rebaja'] == '0%']
-    # Para la tabla, puedes omitir la columna de valor original si quieres:
-    df_0_tabla = df_0_base  # si no quieres mostrar valor, puedes hacer .drop(...)
-    if df_0_tabla.empty:
-        st.info("No hay remates con 0% de rebaja con los filtros actuales.")
-    else:
-        marcar_favorito(df_0_tabla, 'tabla0')
-        if modo_detalle:
-            mostrar_detalle(df_0_base, "Vista detallada de remates con 0% de rebaja")
+    if tab0.open:
+        st.write("Remates sin rebaja registrada.")
+        df_0_base = resultado.vista_0
+        # Para la tabla, puedes omitir la columna de valor original si quieres:
+        df_0_tabla = df_0_base  # si no quieres mostrar valor, puedes hacer .drop(...)
+        if df_0_tabla.empty:
+            st.info("No hay remates con 0% de rebaja con los filtros actuales.")
+        else:
+            marcar_favorito(df_0_tabla, 'tabla0')
+            botones_exportacion(df_0_tabla, 'remates_0', 'tab0')
+            if modo_detalle:
+                mostrar_detalle(df_0_base, "Vista detallada de remates con 0% de rebaja", 'tab0')
 
 # ----- TAB 20% -----
 with tab20:
-    st.write("Remates con rebaja del 20%.")
-    df_20_base = df_filtered[df_filtered['Rebaja'] == '20%']
-    df_20_tabla = df_20_base
-    if df_20_tabla.empty:
-        st.info("No hay remates con 20% de rebaja con los filtros actuales.")
-    else:
-        marcar_favorito(df_20_tabla, 'tabla20')
-        if modo_detalle:
-            mostrar_detalle(df_20_base, "Vista detallada de remates con 20% de rebaja")
+    if tab20.open:
+        st.write("Remates con rebaja del 20%.")
+        df_20_base = resultado.vista_20
+        df_20_tabla = df_20_base
+        if df_20_tabla.empty:
+            st.info("No hay remates con 20% de rebaja con los filtros actuales.")
+        else:
+            marcar_favorito(df_20_tabla, 'tabla20')
+            botones_exportacion(df_20_tabla, 'remates_20', 'tab20')
+            if modo_detalle:
+                mostrar_detalle(df_20_base, "Vista detallada de remates con 20% de rebaja", 'tab20')
 
 # ----- TAB TODOS -----
 with tabAll:
-    st.write("Todos los remates que cumplen los filtros seleccionados.")
-    if df_filtered.empty:
-        st.info("No hay remates con los filtros actuales.")
-    else:
-        marcar_favorito(df_filtered, 'tablaAll')
-        if modo_detalle:
-            mostrar_detalle(df_filtered, "Vista detallada de todos los remates filtrados")
+    if tabAll.open:
+        st.write("Todos los remates que cumplen los filtros seleccionados.")
+        if df_filtered.empty:
+            st.info("No hay remates con los filtros actuales.")
+        else:
+            marcar_favorito(df_filtered, 'tablaAll')
+            botones_exportacion(df_filtered, 'remates', 'tabAll')
+            if modo_detalle:
+                mostrar_detalle(df_filtered, "Vista detallada de todos los remates filtrados", 'tabAll')
+
+# ----- TAB HISTORIAL -----
+# Solo lee los resúmenes diarios (tablas chicas); se vuelven a leer cuando cambian los datos
+@st.cache_data(max_entries=16, show_spinner=False)
+def datos_historial(clave_datos: str, desde: str, ciudad: str = None):
+    h = historial_remates()
+    return h.resumen(desde, ciudad), h.medianas_juzgado(desde), h.cambios_de_rebaja(limite=500)
+
+PERIODOS_HISTORIAL = {"Últimos 30 días": 30, "Últimos 90 días": 90, "Último año": 365, "Todo": None}
+
+def mostrar_historial(ciudad: str = None):
+    """Evolución del listado desde los resúmenes diarios (la ciudad es la de la barra lateral)."""
+    periodo = st.selectbox("Período", list(PERIODOS_HISTORIAL), index=1)
+    dias = PERIODOS_HISTORIAL[periodo]
+    desde = date.fromordinal(date.today().toordinal() - dias).isoformat() if dias else ''
+    try:
+        with medicion.etapa('historial') as m:
+            resumen, medianas, cambios = datos_historial(clave_datos, desde, ciudad)
+            m['filas'] = len(resumen)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        log.warning("No se pudo leer el historial: %s", e)
+        st.warning("No se pudo leer el historial.")
+        return
+    if resumen.empty:
+        st.info("Todavía no hay historial: se acumula con cada actualización del listado.")
+        return
+
+    por_dia = resumen.groupby('dia')[['nuevos', 'retirados', 'rebajados', 'dias_publicados']].sum()
+    col_n, col_r, col_p, col_d = st.columns(4)
+    col_n.metric("Nuevos", f"{por_dia['nuevos'].sum():,}")
+    col_r.metric("Retirados del portal", f"{por_dia['retirados'].sum():,}")
+    col_p.metric("Pasaron de 0% a 20%", f"{por_dia['rebajados'].sum():,}")
+    retirados = por_dia['retirados'].sum()
+    col_d.metric("Días publicados (promedio)", f"{por_dia['dias_publicados'].sum() / retirados:.1f}" if retirados else "–")
+
+    st.markdown("**Remates vigentes por día**")
+    vigentes = resumen.pivot_table(index='dia', columns='rebaja', values='vigentes', aggfunc='sum')
+    st.line_chart(vigentes.rename(columns=lambda r: f"{r}% de rebaja"))
+
+    st.markdown("**Nuevos, retirados y rebajados por día**")
+    st.bar_chart(por_dia[['nuevos', 'retirados', 'rebajados']].rename(columns={
+        'nuevos': "Nuevos", 'retirados': "Retirados", 'rebajados': "Pasaron a 20%"}), stack=False)
+
+    col_perm, col_valor = st.columns(2)
+    with col_perm:
+        # Con una ciudad elegida se abre por tipo de inmueble
+        por = 'tipo' if ciudad else 'ciudad'
+        st.markdown(f"**Días publicados hasta salir del portal, por {'tipo' if ciudad else 'ciudad'}**")
+        permanencia = historial.permanencia(resumen, por)
+        if permanencia.empty:
+            st.caption("Todavía no salió ningún remate del portal en el período.")
+        else:
+            st.bar_chart(permanencia['dias_promedio'].rename("Días"), horizontal=True)
+    with col_valor:
+        st.markdown("**Valor promedio de los vigentes (Bs)**")
+        st.line_chart(historial.valor_promedio(resumen).rename(columns=lambda r: f"{r}% de rebaja"))
+
+    if not medianas.empty:
+        st.markdown("**Valor mediano por juzgado (Bs, por mes)**")
+        principales = medianas.groupby('juzgado')['remates'].sum().nlargest(8).index
+        st.line_chart(medianas[medianas['juzgado'].isin(principales)]
+                      .pivot_table(index='periodo', columns='juzgado', values='mediana'))
+        st.caption("Los 8 juzgados con más remates-día, de todas las ciudades. La mediana se estima "
+                   "desde un histograma diario (±6 %).")
+
+    if ciudad is not None:
+        cambios = cambios[cambios['ciudad'] == ciudad]
+    if not cambios.empty:
+        st.markdown("**Últimos cambios de rebaja**")
+        st.dataframe(
+            cambios.rename(columns={
+                'momento': "Detectado", 'antes': "Antes", 'despues': "Después", 'proceso': "Número de Proceso",
+                'juzgado': "Juzgado", 'ciudad': "Ciudad", 'tipo': "Tipo de Inmueble", 'descripcion': "Descripción",
+                'valor_texto': "Valor Original del Inmueble",
+            }),
+            hide_index=True,
+            width="stretch",
+            column_config={
+                "Detectado": st.column_config.DatetimeColumn("Detectado", format="DD/MM/YYYY HH:mm"),
+                "Antes": st.column_config.NumberColumn("Antes", format="%d%%"),
+                "Después": st.column_config.NumberColumn("Después", format="%d%%"),
+            },
+        )
+
+with tabHist:
+    if tabHist.open:
+        mostrar_historial(filtro_actual.ciudad)
 
 # ================= SECCIÓN FAVORITOS =================
 st.markdown("---")
@@ -577,12 +848,15 @@ favoritos_actualizados = st.session_state['favoritos']
 
 if favoritos_actualizados:
     st.subheader("Remates fijados / favoritos")
-    # Tomamos solo los favoritos desde el df filtrado actual
-    favoritos_view = df_filtered.loc[df_filtered.index.intersection(favoritos_actualizados)].copy()
+    # Favoritos resueltos por Número de Proceso y limitados al df filtrado actual
+    favoritos_view = df.iloc[motor.posiciones_de(favoritos_actualizados)]
+    favoritos_view = favoritos_view.loc[favoritos_view.index.intersection(df_filtered.index)].copy()
     if not favoritos_view.empty:
+        favoritos_base = favoritos_view.sort_index()  # para exportar: las filas, antes de armar la vista
+        favoritos_view.insert(0, '', icono_urgencia(favoritos_view['DiasRestantes']))
         # Quitamos columnas internas que no deben verse
         favoritos_view = favoritos_view.drop(
-            columns=['FechaDate', 'FechaFormateada', 'Ciudad'],
+            columns=COLUMNAS_INTERNAS,
             errors='ignore'
         )
         # Orden opcional: por índice original, para que sea estable
@@ -600,12 +874,47 @@ if favoritos_actualizados:
             favoritos_view = favoritos_view[cols]
 
         # Mostramos la tabla SIN índice gris
-        st.dataframe(
-            favoritos_view,
-            width="stretch",
-            hide_index=True
-        )
+        with medicion.etapa('tabla.favoritos') as m:
+            st.dataframe(
+                favoritos_view,
+                width="stretch",
+                hide_index=True,
+                column_config={
+                    "Rebaja": st.column_config.NumberColumn("Rebaja", format="%d%%"),
+                },
+            )
+            m['filas'] = len(favoritos_view)
+        botones_exportacion(favoritos_base, 'favoritos', 'favoritos')
     else:
         st.info("Los favoritos actuales no coinciden con los filtros seleccionados.")
 else:
     st.info("No tienes favoritos seleccionados todavía.")
+
+# ================= PANEL DE DIAGNÓSTICO =================
+def mostrar_diagnostico(medicion: metricas.Medicion, descarga: dict = None):
+    """Etapas de este rerun en la barra lateral (?diag=1). Se arma al final: no se mide a sí mismo."""
+    with st.sidebar.expander("🩺 Diagnóstico del rerun", expanded=True):
+        st.caption(f"Script: {medicion.total() * 1000:,.0f} ms (sin contar el envío al navegador)")
+        st.dataframe(
+            pd.DataFrame(medicion.resumen()).convert_dtypes(),
+            hide_index=True,
+            column_config={"ms": st.column_config.NumberColumn("ms", format="%.1f")},
+        )
+        for nombre, (aciertos, fallos) in medicion.caches.items():
+            st.caption(f"Caché {nombre}: {aciertos:,} aciertos, {fallos:,} fallos")
+        fragmentos_proceso = cache_fragmentos().estadisticas()
+        st.caption(
+            f"Fragmentos en caché (proceso): {fragmentos_proceso['tamaño']:,} · "
+            f"{fragmentos_proceso['aciertos']:,} aciertos, {fragmentos_proceso['fallos']:,} fallos"
+        )
+        if descarga:
+            minutos = int((time.time() - descarga['cuando']) // 60)
+            st.caption(
+                f"Última descarga (hace {minutos} min): {descarga['paginas']} páginas, "
+                f"{descarga['bytes'] / 1024:,.0f} KB en {descarga['segundos']:.1f} s"
+                + ("" if descarga['cambio'] else ", sin cambios")
+            )
+
+metricas.publicar(medicion)
+if panel_diagnostico:
+    mostrar_diagnostico(medicion, portal.ultima_descarga)
@@ -0,0 +1 @@
+"""Núcleo de scraping de Remates Judiciales Bolivia (sin dependencia de Streamlit)."""
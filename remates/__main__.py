@@ -0,0 +1,3 @@
+from remates.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,425 @@
+"""Alertas: búsquedas guardadas que avisan cuando llegan remates que las cumplen.
+
+Una alerta guarda los mismos filtros que la barra lateral (departamento, ciudad,
+texto, rango de fechas y de valor) más la pestaña de rebaja y si solo interesan los urgentes.
+En cada refresco se evalúan todas juntas sobre el delta (remates nuevos o
+modificados, ver Almacen.cambios), no sobre el listado completo.
+
+Las alertas se indexan al revés que los remates: por lugar, rebaja y término
+de búsqueda, cada valor apunta a un bitmap (un int) de las alertas que lo piden.
+Para cada remate del delta las candidatas salen de unos pocos AND/OR de bitmaps
+y solo a ellas se les revisan los rangos y los términos.
+
+Los avisos se entregan según el esquema del destino (DESTINOS): un webhook
+(http/https), un correo (mailto:, con REMATES_SMTP) o un archivo JSON por línea
+(file:). Se guardan en SQLite, en la misma base que la copia local del listado.
+
+Las alertas de la app (públicas: las crea cualquiera que la abra) solo pueden avisar
+a webhooks https de hosts públicos, por correo si el operador lo habilita
+(REMATES_ALERTAS_CORREO=1) y a archivos dentro de REMATES_ALERTAS_DIR, si está
+definido. El destino se vuelve a validar en cada entrega. Las de la línea de
+comandos no tienen esas restricciones.
+"""
+import ipaddress
+import json
+import logging
+import os
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing
+from datetime import date
+from email.message import EmailMessage
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from remates import consultas, metricas, parseo
+from remates.busqueda import terminos
+
+log = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS alertas (
+    id INTEGER PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    departamento TEXT,
+    ciudad TEXT,
+    texto TEXT,
+    fecha_ini TEXT,
+    fecha_fin TEXT,
+    valor_min REAL,
+    valor_max REAL,
+    rebaja INTEGER,
+    urgentes INTEGER NOT NULL,
+    destino TEXT NOT NULL,
+    creada REAL NOT NULL,
+    publica INTEGER NOT NULL DEFAULT 1
+);
+"""
+
+# publica: creada desde la app, con los destinos restringidos
+Alerta = namedtuple('Alerta', ['id', 'usuario', 'nombre', 'filtro', 'rebaja', 'urgentes', 'destino', 'publica'],
+                    defaults=[True])
+
+# Columnas de cada remate en el aviso
+COLUMNAS_AVISO = parseo.COLUMNAS_TABLA + ['Ciudad', 'Departamento', 'Cambio']
+TIMEOUT_ENVIO = 15
+
+
+# ================= ALMACENAMIENTO =================
+class Alertas:
+    """Acceso a la tabla de alertas. Abre una conexión por operación (seguro entre hilos)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+            columnas = {c[1] for c in con.execute("PRAGMA table_info(alertas)")}
+            # Bases creadas antes del filtro por departamento
+            if 'departamento' not in columnas:
+                con.execute("ALTER TABLE alertas ADD COLUMN departamento TEXT")
+            # Y antes de restringir los destinos: las alertas existentes quedan como públicas
+            if 'publica' not in columnas:
+                con.execute("ALTER TABLE alertas ADD COLUMN publica INTEGER NOT NULL DEFAULT 1")
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def listar(self, usuario: str = None) -> list:
+        """Alertas del usuario (o todas), en el orden en que se crearon."""
+        consulta = ("SELECT id, usuario, nombre, departamento, ciudad, texto, fecha_ini, fecha_fin, valor_min, "
+                    "valor_max, rebaja, urgentes, destino, publica FROM alertas")
+        with closing(self._conectar()) as con:
+            if usuario is None:
+                filas = con.execute(consulta + " ORDER BY id").fetchall()
+            else:
+                filas = con.execute(consulta + " WHERE usuario = ? ORDER BY id", (usuario,)).fetchall()
+        return [
+            Alerta(id_, usuario_, nombre, consultas.Filtro(
+                ciudad=ciudad, texto=texto,
+                fecha_ini=date.fromisoformat(fecha_ini) if fecha_ini else None,
+                fecha_fin=date.fromisoformat(fecha_fin) if fecha_fin else None,
+                valor_min=valor_min, valor_max=valor_max, departamento=departamento,
+            ), rebaja, bool(urgentes), destino, bool(publica))
+            for id_, usuario_, nombre, departamento, ciudad, texto, fecha_ini, fecha_fin, valor_min, valor_max,
+            rebaja, urgentes, destino, publica in filas
+        ]
+
+    def agregar(self, usuario: str, nombre: str, filtro: consultas.Filtro, destino: str,
+                rebaja: int = None, urgentes: bool = False, publica: bool = True) -> int:
+        """Guarda una alerta y devuelve su id. ValueError si el destino no es válido
+        (con publica=True, el de la app, solo se aceptan los destinos restringidos)."""
+        validar_destino(destino, publica)
+        with closing(self._conectar()) as con, con:
+            cursor = con.execute(
+                "INSERT INTO alertas (usuario, nombre, departamento, ciudad, texto, fecha_ini, fecha_fin, valor_min, "
+                "valor_max, rebaja, urgentes, destino, creada, publica) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (usuario, nombre, filtro.departamento, filtro.ciudad, filtro.texto,
+                 filtro.fecha_ini.isoformat() if filtro.fecha_ini else None,
+                 filtro.fecha_fin.isoformat() if filtro.fecha_fin else None,
+                 filtro.valor_min, filtro.valor_max, rebaja, int(urgentes), destino, time.time(), int(publica)),
+            )
+            return cursor.lastrowid
+
+    def borrar(self, id_alerta: int, usuario: str = None) -> bool:
+        """Borra la alerta (solo si es de `usuario`, cuando se indica). True si existía."""
+        with closing(self._conectar()) as con, con:
+            if usuario is None:
+                cursor = con.execute("DELETE FROM alertas WHERE id = ?", (id_alerta,))
+            else:
+                cursor = con.execute("DELETE FROM alertas WHERE id = ? AND usuario = ?", (id_alerta, usuario))
+            return cursor.rowcount > 0
+
+
+def describir(alerta: Alerta) -> str:
+    """Los filtros de la alerta en una línea, para listarla."""
+    f = alerta.filtro
+    partes = [', '.join(lugar for lugar in (f.ciudad, f.departamento) if lugar) or 'todas las ciudades']
+    if f.texto:
+        partes.append(f'"{f.texto}"')
+    if f.fecha_ini or f.fecha_fin:
+        partes.append(f"{f.fecha_ini or '…'} a {f.fecha_fin or '…'}")
+    if f.valor_min is not None and f.valor_max is not None:
+        partes.append(f"Bs {f.valor_min:,.0f} a {f.valor_max:,.0f}")
+    elif f.valor_min is not None:
+        partes.append(f"desde Bs {f.valor_min:,.0f}")
+    elif f.valor_max is not None:
+        partes.append(f"hasta Bs {f.valor_max:,.0f}")
+    if alerta.rebaja is not None:
+        partes.append(f"rebaja {alerta.rebaja}%")
+    if alerta.urgentes:
+        partes.append("solo urgentes")
+    return " · ".join(partes)
+
+
+# ================= EVALUACIÓN =================
+def _bits(posiciones) -> int:
+    mascara = 0
+    for i in posiciones:
+        mascara |= 1 << i
+    return mascara
+
+
+def _prefijos(palabras) -> set:
+    """Todos los prefijos de las palabras: un término de búsqueda coincide si está acá."""
+    return {p[:i] for p in palabras for i in range(1, len(p) + 1)}
+
+
+class IndiceAlertas:
+    """Alertas indexadas por departamento, ciudad, rebaja y término: cada valor -> bitmap de alertas (int)."""
+
+    def __init__(self, alertas: list):
+        self.alertas = list(alertas)
+        por_departamento, por_ciudad, por_rebaja, por_termino = {}, {}, {}, {}
+        self.terminos = []  # por alerta: términos de búsqueda (todos tienen que coincidir)
+        for i, alerta in enumerate(self.alertas):
+            f = alerta.filtro
+            por_departamento.setdefault(f.departamento, []).append(i)
+            por_ciudad.setdefault(f.ciudad, []).append(i)
+            por_rebaja.setdefault(alerta.rebaja, []).append(i)
+            # Como IndiceTexto.buscar: una consulta sin términos (p. ej. solo signos) no filtra
+            propios = tuple(dict.fromkeys(terminos(f.texto))) if f.texto else ()
+            self.terminos.append(propios)
+            for termino in propios:
+                por_termino.setdefault(termino, []).append(i)
+        # None = sin filtro: esas alertas son candidatas para cualquier valor
+        self.por_departamento = {d: _bits(p) for d, p in por_departamento.items()}
+        self.por_ciudad = {c: _bits(p) for c, p in por_ciudad.items()}
+        self.por_rebaja = {r: _bits(p) for r, p in por_rebaja.items()}
+        self.por_termino = {t: _bits(p) for t, p in por_termino.items()}
+        self.sin_departamento = self.por_departamento.pop(None, 0)
+        self.sin_ciudad = self.por_ciudad.pop(None, 0)
+        self.sin_rebaja = self.por_rebaja.pop(None, 0)
+        self.con_texto = _bits(i for i, t in enumerate(self.terminos) if t)
+        self.solo_urgentes = _bits(i for i, a in enumerate(self.alertas) if a.urgentes)
+        # Rangos de fecha y valor como arreglos (un elemento por alerta): se evalúan
+        # para todas las alertas a la vez con numpy; ±inf = sin límite
+        filtros = [a.filtro for a in self.alertas]
+        self.con_fecha = np.array([f.fecha_ini is not None or f.fecha_fin is not None for f in filtros])
+        self.dia_desde = np.array([-np.inf if f.fecha_ini is None else consultas._dia(f.fecha_ini) for f in filtros])
+        self.dia_hasta = np.array([np.inf if f.fecha_fin is None else consultas._dia(f.fecha_fin) for f in filtros])
+        self.con_valor = np.array([f.valor_min is not None or f.valor_max is not None for f in filtros])
+        self.valor_desde = np.array([-np.inf if f.valor_min is None else f.valor_min for f in filtros], dtype=float)
+        self.valor_hasta = np.array([np.inf if f.valor_max is None else f.valor_max for f in filtros], dtype=float)
+        self.con_rangos = self.con_fecha.any() or self.con_valor.any()
+
+    def evaluar(self, df: pd.DataFrame) -> dict:
+        """{posición de la alerta: posiciones de los remates de `df` que la cumplen}.
+
+        `df` necesita DiasRestantes (parseo.calcular_urgencia). Mismo criterio que
+        MotorConsultas.orden más la pestaña de rebaja y el filtro de urgentes.
+        """
+        if not self.alertas or df.empty:
+            return {}
+        es_inmueble = df['Tipo de Inmueble'].str.contains('INMUEBLE', case=False).to_numpy(dtype=bool)
+        urgente = parseo.es_urgente(df['DiasRestantes'])
+        dias = consultas._dias(df['FechaDate'].to_numpy(dtype='datetime64[ns]'))
+        valor_bs = (df['Valor'] * np.where(df['Moneda'] == 'USD', consultas.TIPO_CAMBIO_USD, 1.0)).to_numpy(dtype=float)
+        departamentos = df['Departamento'].astype(object).tolist()
+        ciudades = df['Ciudad'].astype(object).tolist()
+        rebajas = df['Rebaja'].tolist()
+        textos = df['Descripción'].astype(object).fillna('') + ' ' + df['Número de Proceso'].astype(object).fillna('')
+
+        coincidencias = {}
+        for pos in np.flatnonzero(es_inmueble):
+            candidatas = self.por_departamento.get(departamentos[pos], 0) | self.sin_departamento
+            candidatas &= self.por_ciudad.get(ciudades[pos], 0) | self.sin_ciudad
+            candidatas &= self.por_rebaja.get(rebajas[pos], 0) | self.sin_rebaja
+            if not urgente[pos]:
+                candidatas &= ~self.solo_urgentes
+            if candidatas & self.con_texto:
+                # Alertas con algún término que no aparece en el remate: descartadas de una vez
+                presentes = _prefijos(terminos(textos.iat[pos]))
+                faltan = 0
+                for termino, alertas in self.por_termino.items():
+                    if alertas & candidatas and termino not in presentes:
+                        faltan |= alertas
+                candidatas &= ~faltan
+            if candidatas and self.con_rangos:
+                candidatas &= ~self._fuera_de_rango(dias[pos], valor_bs[pos])
+            while candidatas:
+                bit = candidatas & -candidatas
+                candidatas ^= bit
+                coincidencias.setdefault(bit.bit_length() - 1, []).append(pos)
+        return coincidencias
+
+    def _fuera_de_rango(self, dia: float, valor: float) -> int:
+        """Bitmap de las alertas cuyo rango de fecha o de valor deja afuera al remate."""
+        # Como IndiceOrdenado.rango: sin fecha o sin valor (NaN) no se cumple ningún rango
+        dentro = ~self.con_fecha | ((self.dia_desde <= dia) & (dia <= self.dia_hasta))
+        dentro &= ~self.con_valor | ((self.valor_desde <= valor) & (valor <= self.valor_hasta))
+        return int.from_bytes(np.packbits(~dentro, bitorder='little').tobytes(), 'little')
+
+
+# ================= DESTINOS =================
+def enviar_webhook(destino: str, aviso: dict):
+    import requests  # solo hace falta si hay webhooks
+
+    # Sin seguir redirecciones: un host público podría redirigir a uno interno
+    requests.post(destino, json=aviso, timeout=TIMEOUT_ENVIO, allow_redirects=False).raise_for_status()
+
+
+def enviar_correo(destino: str, aviso: dict):
+    """REMATES_SMTP=host[:puerto] (STARTTLS si hay REMATES_SMTP_USUARIO y REMATES_SMTP_CLAVE)."""
+    servidor = os.environ.get('REMATES_SMTP')
+    if not servidor:
+        raise OSError("falta REMATES_SMTP para enviar correos")
+    host, _, puerto = servidor.partition(':')
+    mensaje = EmailMessage()
+    mensaje['Subject'] = f"Remates: {len(aviso['remates'])} nuevos para «{aviso['alerta']}»"
+    mensaje['From'] = os.environ.get('REMATES_SMTP_DE', 'remates@localhost')
+    mensaje['To'] = urlsplit(destino).path
+    mensaje.set_content(texto_aviso(aviso))
+    with smtplib.SMTP(host, int(puerto or 25), timeout=TIMEOUT_ENVIO) as smtp:
+        usuario = os.environ.get('REMATES_SMTP_USUARIO')
+        if usuario:
+            smtp.starttls()
+            smtp.login(usuario, os.environ.get('REMATES_SMTP_CLAVE', ''))
+        smtp.send_message(mensaje)
+
+
+def ruta_archivo(destino: str) -> str:
+    """Ruta de un destino file:; las relativas son dentro de REMATES_ALERTAS_DIR (si está)."""
+    return os.path.join(os.environ.get('REMATES_ALERTAS_DIR') or '', unquote(urlsplit(destino).path))
+
+
+def escribir_archivo(destino: str, aviso: dict):
+    with open(ruta_archivo(destino), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(aviso, ensure_ascii=False) + '\n')
+
+
+# Esquema del destino -> función(destino, aviso)
+DESTINOS = {
+    'http': enviar_webhook,
+    'https': enviar_webhook,
+    'mailto': enviar_correo,
+    'file': escribir_archivo,
+}
+
+
+def ejemplos_destino(publica: bool = True) -> list:
+    """Los destinos que se aceptan, como ejemplos para mostrar."""
+    if not publica:
+        return ['https://…', 'mailto:correo@…', 'file:/ruta/avisos.jsonl']
+    ejemplos = ['https://…']
+    if os.environ.get('REMATES_ALERTAS_CORREO') == '1':
+        ejemplos.append('mailto:correo@…')
+    if os.environ.get('REMATES_ALERTAS_DIR'):
+        ejemplos.append('file:avisos.jsonl')
+    return ejemplos
+
+
+def validar_destino(destino: str, publica: bool = True):
+    """ValueError si el destino no tiene un esquema de DESTINOS o le falta la dirección.
+
+    Con publica=True solo se aceptan webhooks https a hosts públicos, un solo correo
+    si REMATES_ALERTAS_CORREO=1 y archivos dentro de REMATES_ALERTAS_DIR.
+    """
+    partes = urlsplit(destino or '')
+    if partes.scheme not in DESTINOS or not (partes.netloc or partes.path) or any(c in destino for c in '\r\n'):
+        raise ValueError(f"destino no válido: {destino!r} (use {' · '.join(ejemplos_destino(publica))})")
+    if partes.scheme == 'mailto' and ('@' not in partes.path or any(c in partes.path for c in ',;')):
+        raise ValueError(f"destino no válido: {destino!r} (un solo correo: mailto:correo@…)")
+    if not publica:
+        return
+    if partes.scheme == 'http':
+        raise ValueError("los webhooks tienen que ser https://")
+    if partes.scheme == 'https':
+        validar_host_publico(partes.hostname)
+    elif partes.scheme == 'mailto' and os.environ.get('REMATES_ALERTAS_CORREO') != '1':
+        raise ValueError("los avisos por correo no están habilitados en este servidor")
+    elif partes.scheme == 'file':
+        directorio = os.environ.get('REMATES_ALERTAS_DIR')
+        if not directorio:
+            raise ValueError("los avisos a archivos no están habilitados en este servidor")
+        directorio = os.path.realpath(directorio)
+        if os.path.commonpath([directorio, os.path.realpath(ruta_archivo(destino))]) != directorio:
+            raise ValueError(f"los avisos a archivos tienen que quedar dentro de {directorio}")
+
+
+def validar_host_publico(host: str):
+    """ValueError si el host no resuelve o alguna de sus direcciones no es pública
+    (loopback, red privada, link-local...): los webhooks no pueden apuntar a la red interna."""
+    if not host:
+        raise ValueError("al webhook le falta el host")
+    try:
+        direcciones = {info[4][0] for info in socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, TypeError) as e:
+        raise ValueError(f"no se pudo resolver el host del webhook {host!r}: {e}") from None
+    for direccion in direcciones:
+        if not ipaddress.ip_address(direccion.split('%')[0]).is_global:
+            raise ValueError(f"el webhook apunta a una dirección no pública ({host} -> {direccion})")
+
+
+def texto_aviso(aviso: dict) -> str:
+    lineas = [f"Alerta «{aviso['alerta']}»: {len(aviso['remates'])} remates nuevos o modificados.", ""]
+    for r in aviso['remates']:
+        lineas.append(f"- [{r['Cambio']}] {r['Tipo de Inmueble']} · {r['Ciudad']} · {r['Fecha de Remate del Inmueble']}")
+        lineas.append(f"  {r['Descripción']}")
+        lineas.append(f"  {r['Valor Original del Inmueble']} · Rebaja {r['Rebaja']}% · N° {r['Número de Proceso']}")
+    return "\n".join(lineas) + "\n"
+
+
+def armar_aviso(alerta: Alerta, remates: pd.DataFrame, momento: float) -> dict:
+    return {
+        'alerta': alerta.nombre,
+        'id': alerta.id,
+        'momento': momento,
+        'remates': json.loads(remates[COLUMNAS_AVISO].to_json(orient='records', force_ascii=False)),
+    }
+
+
+def entregar(alerta: Alerta, aviso: dict) -> bool:
+    """Envía el aviso a su destino; los errores se registran y no cortan los demás envíos."""
+    esquema = urlsplit(alerta.destino).scheme
+    try:
+        # Otra vez al entregar: el host puede resolver distinto que cuando se guardó la alerta
+        validar_destino(alerta.destino, alerta.publica)
+        DESTINOS[esquema](alerta.destino, aviso)
+    except (OSError, KeyError, ValueError) as e:  # OSError incluye requests y smtplib
+        log.warning("No se pudo entregar la alerta %s a %s: %s", alerta.id, alerta.destino, e)
+        metricas.REGISTRO.contar('alertas_fallidas', destino=esquema)
+        return False
+    metricas.REGISTRO.contar('alertas_enviadas', destino=esquema)
+    return True
+
+
+# ================= PROCESAMIENTO =================
+def procesar(guardadas: Alertas, cambios: pd.DataFrame, momento: float = None) -> dict:
+    """Evalúa todas las alertas sobre el delta y entrega un aviso por alerta con coincidencias.
+
+    `cambios` es el DataFrame de Almacen.cambios (con la columna Cambio). Devuelve
+    {id de alerta: cantidad de remates avisados}.
+    """
+    momento = momento or time.time()
+    inicio = time.perf_counter()
+    indice = IndiceAlertas(guardadas.listar())
+    coincidencias = indice.evaluar(parseo.calcular_urgencia(cambios))
+    log.info("%d alertas evaluadas sobre %d remates cambiados en %.1f ms: %d con avisos",
+             len(indice.alertas), len(cambios), (time.perf_counter() - inicio) * 1000, len(coincidencias))
+    enviados = {}
+    for i, posiciones in coincidencias.items():
+        alerta = indice.alertas[i]
+        if entregar(alerta, armar_aviso(alerta, cambios.iloc[posiciones], momento)):
+            enviados[alerta.id] = len(posiciones)
+    return enviados
+
+
+def procesar_en_segundo_plano(almacen, guardadas: Alertas, momento: float) -> threading.Thread:
+    """procesar() sobre los cambios del refresco de `momento`, sin hacer esperar al llamador."""
+    def correr():
+        try:
+            procesar(guardadas, almacen.cambios(momento), momento)
+        except sqlite3.Error as e:
+            log.warning("No se pudieron evaluar las alertas: %s", e)
+
+    hilo = threading.Thread(target=correr, name='alertas-remates', daemon=True)
+    hilo.start()
+    return hilo
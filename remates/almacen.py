@@ -0,0 +1,203 @@
+"""Copia local (SQLite) del listado, persistente entre reinicios.
+
+Cada remate se identifica por Número de Proceso + Juzgado (+ ocurrencia, porque
+un mismo proceso puede rematar varios inmuebles). En cada refresco solo se
+escriben los remates nuevos o modificados, detectados por una huella de su
+contenido; los que desaparecen del portal se marcan como eliminados en lugar
+de borrarse, así queda el historial (solo si el rastreo fue completo: de una
+página que no se pudo bajar no se sabe nada). Si uno de esos vuelve igual que
+estaba, solo se restaura: no cuenta como modificado ni entra en el delta de las
+alertas (vuelve a avisar solo si vuelve cambiado). Cada refresco también actualiza los
+resúmenes diarios de remates.historial.
+"""
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from remates import historial, parseo
+
+# Columna del DataFrame -> columna de la tabla
+COLUMNAS = {
+    'Tipo de Inmueble': 'tipo',
+    'Descripción': 'descripcion',
+    'Valor Original del Inmueble': 'valor_texto',
+    'Fecha de Remate del Inmueble': 'fecha_texto',
+    'Juzgado': 'juzgado',
+    'Ubicación': 'ubicacion',
+    'Número de Proceso': 'proceso',
+    'Rebaja': 'rebaja',
+    'FechaDate': 'fecha',
+    'Ciudad': 'ciudad',
+    'Valor': 'valor',
+    'Moneda': 'moneda',
+}
+CLAVE = ['proceso', 'juzgado', 'ocurrencia']
+
+# Lo que se ve del remate: si cambia, cambia la huella
+COLUMNAS_HUELLA = [
+    'Tipo de Inmueble', 'Descripción', 'Valor Original del Inmueble', 'Fecha de Remate del Inmueble',
+    'Juzgado', 'Ubicación', 'Número de Proceso', 'Rebaja',
+]
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS remates (
+    {', '.join(f'{c} {"INTEGER" if c == "rebaja" else "REAL" if c == "valor" else "TEXT"}' for c in COLUMNAS.values())},
+    ocurrencia INTEGER NOT NULL,
+    huella TEXT NOT NULL,
+    visto_primero REAL NOT NULL,
+    modificado REAL NOT NULL,
+    eliminado REAL,
+    PRIMARY KEY (proceso, juzgado, ocurrencia)
+);
+CREATE INDEX IF NOT EXISTS remates_modificado ON remates (modificado);
+CREATE TABLE IF NOT EXISTS refrescos (
+    id INTEGER PRIMARY KEY,
+    momento REAL NOT NULL,
+    total INTEGER NOT NULL,
+    nuevos INTEGER NOT NULL,
+    modificados INTEGER NOT NULL,
+    eliminados INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refrescos_momento ON refrescos (momento);
+"""
+
+
+def huellas(df: pd.DataFrame) -> pd.Series:
+    """Hash del contenido visible de cada remate (vectorizado)."""
+    return pd.util.hash_pandas_object(df[COLUMNAS_HUELLA].astype(str), index=False).map('{:016x}'.format)
+
+
+def a_filas(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame de remates -> columnas de la tabla (incluye ocurrencia y huella)."""
+    filas = df[list(COLUMNAS)].rename(columns=COLUMNAS)
+    filas['juzgado'] = filas['juzgado'].astype(str)
+    filas['ciudad'] = filas['ciudad'].astype(object)
+    filas['moneda'] = filas['moneda'].astype(object)
+    filas['fecha'] = filas['fecha'].dt.strftime('%Y-%m-%d')
+    filas['rebaja'] = filas['rebaja'].astype(int)
+    filas['ocurrencia'] = filas.groupby(['proceso', 'juzgado']).cumcount()
+    filas['huella'] = huellas(df).to_numpy()
+    return filas.astype(object).where(filas.notna(), None)
+
+
+def desde_filas(filas: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de la tabla -> DataFrame con el mismo esquema y dtypes que parseo.parsear."""
+    df = filas.rename(columns={v: k for k, v in COLUMNAS.items()})[list(COLUMNAS)].drop(columns='Ciudad')
+    # El lugar se vuelve a resolver (caché de por medio): la ciudad guardada puede venir de
+    # una versión anterior del nomenclátor, y departamento y provincia no se guardan
+    df = df.join(parseo.ubicar(df['Ubicación']))[parseo.COLUMNAS_NORMALIZADAS]
+    df['FechaDate'] = pd.to_datetime(df['FechaDate'], format='%Y-%m-%d', errors='coerce')
+    df['Valor'] = pd.to_numeric(df['Valor'])
+    return parseo.tipar_remates(df)
+
+
+class Almacen:
+    """Acceso a la base SQLite. Abre una conexión por operación (seguro entre hilos)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+            con.executescript(historial.ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def guardar(self, df: pd.DataFrame, momento: float = None, completo: bool = True) -> dict:
+        """Upsert de un refresco. Devuelve los conteos de nuevos/modificados/eliminados/reaparecidos.
+
+        Con completo=False (faltaron páginas del listado) no se marca nada como eliminado.
+        """
+        momento = momento or time.time()
+        filas = a_filas(df)
+        columnas = list(filas.columns)
+
+        with closing(self._conectar()) as con, con:
+            # clave -> (huella, eliminado, rebaja, ciudad, tipo, visto_primero)
+            previos = {
+                fila[:len(CLAVE)]: fila[len(CLAVE):]
+                for fila in con.execute(
+                    f"SELECT {', '.join(CLAVE)}, huella, eliminado, rebaja, ciudad, tipo, visto_primero FROM remates"
+                )
+            }
+            nuevos, modificados, reaparecidos, rebajas, actuales = [], [], [], [], set()
+            for fila in filas.itertuples(index=False, name=None):
+                registro = dict(zip(columnas, fila), momento=momento)
+                clave = tuple(registro[c] for c in CLAVE)
+                actuales.add(clave)
+                previo = previos.get(clave)
+                if previo is None:
+                    nuevos.append(registro)
+                elif previo[0] == registro['huella'] and previo[1] is not None:
+                    reaparecidos.append(clave)
+                elif previo[0] != registro['huella']:
+                    modificados.append(registro)
+                    if previo[2] != registro['rebaja']:
+                        rebajas.append((registro, previo[2], registro['rebaja']))
+
+            con.executemany(
+                f"INSERT INTO remates ({', '.join(columnas)}, visto_primero, modificado) "
+                f"VALUES ({', '.join(':' + c for c in columnas)}, :momento, :momento)",
+                nuevos,
+            )
+            con.executemany(
+                f"UPDATE remates SET {', '.join(f'{c} = :{c}' for c in columnas if c not in CLAVE)}, "
+                f"modificado = :momento, eliminado = NULL "
+                f"WHERE {' AND '.join(f'{c} = :{c}' for c in CLAVE)}",
+                modificados,
+            )
+            con.executemany(
+                f"UPDATE remates SET eliminado = NULL WHERE {' AND '.join(f'{c} = ?' for c in CLAVE)}",
+                reaparecidos,
+            )
+            eliminados = [k for k, previo in previos.items() if previo[1] is None and k not in actuales] \
+                if completo else []
+            con.executemany(
+                f"UPDATE remates SET eliminado = ? WHERE {' AND '.join(f'{c} = ?' for c in CLAVE)}",
+                [(momento, *k) for k in eliminados],
+            )
+            conteos = {'nuevos': len(nuevos), 'modificados': len(modificados), 'eliminados': len(eliminados),
+                       'reaparecidos': len(reaparecidos)}
+            con.execute(
+                "INSERT INTO refrescos (momento, total, nuevos, modificados, eliminados) "
+                "VALUES (:momento, :total, :nuevos, :modificados, :eliminados)",
+                dict(conteos, momento=momento, total=len(filas)),
+            )
+            retirados = [(ciudad, rebaja, tipo, visto_primero)
+                         for _, _, rebaja, ciudad, tipo, visto_primero in map(previos.get, eliminados)]
+            historial.actualizar(con, momento, filas, nuevos, rebajas, retirados)
+        return conteos
+
+    def ultimo_momento(self):
+        """Momento del último refresco guardado (None si no hay ninguno); una consulta al índice."""
+        with closing(self._conectar()) as con:
+            return con.execute("SELECT MAX(momento) FROM refrescos").fetchone()[0]
+
+    def ultimo_snapshot(self):
+        """(DataFrame de remates vigentes, momento del último refresco), o None si está vacío."""
+        with closing(self._conectar()) as con:
+            ultimo = con.execute("SELECT MAX(momento) FROM refrescos").fetchone()[0]
+            if ultimo is None:
+                return None
+            filas = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS.values())} FROM remates WHERE eliminado IS NULL ORDER BY rowid",
+                con,
+            )
+        return desde_filas(filas), ultimo
+
+    def cambios(self, momento: float) -> pd.DataFrame:
+        """Remates nuevos o modificados en el refresco de `momento` (el delta), con la
+        columna Cambio ('nuevo' o 'modificado')."""
+        with closing(self._conectar()) as con:
+            filas = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS.values())}, visto_primero FROM remates "
+                f"WHERE modificado = ? AND eliminado IS NULL ORDER BY rowid",
+                con, params=(momento,),
+            )
+        df = desde_filas(filas)
+        df['Cambio'] = np.where(filas['visto_primero'] == momento, 'nuevo', 'modificado')
+        return df
@@ -0,0 +1,251 @@
+"""API JSON local, de solo lectura, sobre el listado compartido.
+
+`python -m remates servir` descarga el portal una vez (con el mismo refresco en
+segundo plano que la app) y expone:
+
+- /remates: los remates filtrados con los mismos parámetros que la barra lateral
+  (departamento, ciudad, texto, desde, hasta, valor_min, valor_max) más rebaja,
+  urgentes, pagina y por_pagina.
+- /inventario: el listado completo normalizado; es lo que lee la app cuando se
+  configura REMATES_API, así N tableros cuestan una sola descarga del portal.
+- /exportar: lo mismo que /remates, sin paginar, como archivo (formato=csv, xlsx
+  o parquet) con las columnas de la tabla de la app. Se envía por partes
+  (chunked) a medida que se escribe, sin armar el archivo en memoria.
+- /metrics: tiempos por etapa de cada pedido y contadores de descarga y de
+  cachés, en formato de texto de Prometheus (ver remates.metricas).
+
+Las respuestas llevan ETag (derivado de la huella del contenido, del día y de
+la consulta): un If-None-Match que coincide se responde con 304 sin armar nada.
+Si el cliente acepta gzip, los cuerpos grandes van comprimidos.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import requests
+
+from remates import consultas, crawler, exportacion, fragmentos, metricas, parseo, refresco
+from remates.cli import COLUMNAS_EXPORTACION, filtrar
+
+log = logging.getLogger(__name__)
+
+POR_PAGINA = 50
+MAX_POR_PAGINA = 1000
+MIN_GZIP = 1024  # bytes: por debajo no vale la pena comprimir
+
+
+def a_registros(df: pd.DataFrame, columnas: list) -> str:
+    """JSON (lista de objetos) de esas columnas, con las fechas como AAAA-MM-DD."""
+    df = df[columnas].assign(FechaDate=df['FechaDate'].dt.strftime('%Y-%m-%d'))
+    return df.to_json(orient='records', force_ascii=False)
+
+
+def leer_inventario(texto: str) -> pd.DataFrame:
+    """Cuerpo de /inventario -> DataFrame con el mismo esquema y dtypes que parseo.parsear."""
+    df = pd.DataFrame(json.loads(texto)['remates'], columns=parseo.COLUMNAS_NORMALIZADAS)
+    df['FechaDate'] = pd.to_datetime(df['FechaDate'], format='%Y-%m-%d', errors='coerce')
+    return parseo.tipar_remates(df)
+
+
+def descargar_inventario(url: str, sesion: requests.Session = None, validadores: dict = None,
+                         plazo: float = None) -> dict:
+    """Reemplazo de crawler.rastrear para refresco.Refresco cuando se lee de esta API."""
+    plazo = crawler.Plazo(plazo) if plazo is not None else None
+    return {url: crawler.descargar(sesion or crawler.crear_sesion(), url, validadores=validadores, plazo=plazo)}
+
+
+class Inventario:
+    """Listado y motor de consultas del último estado del refresco; se rearma solo si
+    cambió la huella del contenido o el día (la urgencia depende de la fecha)."""
+
+    def __init__(self, refresco_portal: refresco.Refresco, parser: str = parseo.PARSER_POR_DEFECTO):
+        self.refresco = refresco_portal
+        self.parser = parser
+        self.cache = fragmentos.CacheLRU()
+        self._lock = threading.Lock()
+        self._clave = None
+        self.df = None
+        self.motor = None
+        self._json = None
+
+    def actual(self, medicion=metricas.NULA):
+        """(clave del contenido, motor de consultas). La primera carga bloquea y puede
+        propagar la excepción de requests."""
+        estado = self.refresco.obtener()
+        clave = f"{estado.huella}-{date.today().isoformat()}"
+        with self._lock:
+            if clave != self._clave:
+                medicion.fallo('inventario')
+                self.df = parseo.unir([parseo.parsear(html, self.parser, self.cache, medicion)
+                                       for html in estado.paginas.values()])
+                with medicion.etapa('indices') as m:
+                    self.motor = consultas.MotorConsultas(parseo.calcular_urgencia(self.df.copy()))
+                    m['filas'] = len(self.df)
+                self._json = None
+                self._clave = clave
+            return self._clave, self.motor
+
+    def json_inventario(self):
+        """(clave, JSON del listado completo), serializado una vez por contenido."""
+        with self._lock:
+            if self._json is None:
+                self._json = a_registros(self.df, parseo.COLUMNAS_NORMALIZADAS)
+            return self._clave, self._json
+
+
+def leer_consulta(parametros: dict):
+    """Parámetros de /remates -> (Filtro, rebaja, urgentes, pagina, por_pagina). ValueError si son inválidos."""
+    def uno(nombre, tipo=str):
+        valores = parametros.get(nombre)
+        return tipo(valores[-1]) if valores and valores[-1] != '' else None
+
+    filtro = consultas.Filtro(
+        departamento=uno('departamento'), ciudad=uno('ciudad'), texto=uno('texto'),
+        fecha_ini=uno('desde', date.fromisoformat), fecha_fin=uno('hasta', date.fromisoformat),
+        valor_min=uno('valor_min', float), valor_max=uno('valor_max', float),
+    )
+    rebaja = uno('rebaja', int)
+    if rebaja not in (None, 0, 20):
+        raise ValueError("rebaja debe ser 0 o 20")
+    urgentes = (uno('urgentes') or '').lower() in ('1', 'true', 'si', 'sí')
+    pagina = uno('pagina', int) or 1
+    por_pagina = uno('por_pagina', int) or POR_PAGINA
+    if pagina < 1 or not 1 <= por_pagina <= MAX_POR_PAGINA:
+        raise ValueError(f"pagina debe ser >= 1 y por_pagina entre 1 y {MAX_POR_PAGINA}")
+    return filtro, rebaja, urgentes, pagina, por_pagina
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: siempre se envía Content-Length
+    server_version = 'remates-api'
+    medicion = metricas.NULA  # cada pedido medido arma la suya en do_GET
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        if partes.path == '/metrics':
+            return self._responder(200, metricas.REGISTRO.prometheus(), tipo=metricas.TIPO_PROMETHEUS)
+        self.medicion = metricas.Medicion('api')
+        self.medicion.anotar(ruta=partes.path)
+        try:
+            self._atender(partes)
+        finally:
+            metricas.publicar(self.medicion)
+
+    def _atender(self, partes):
+        if partes.path not in ('/remates', '/inventario', '/exportar'):
+            return self._responder(404, {'error': 'no encontrado'})
+        parametros = parse_qs(partes.query)
+        formato = parametros.get('formato', ['csv'])[-1]
+        if partes.path == '/exportar' and formato not in exportacion.FORMATOS:
+            return self._responder(400, {'error': f"formato debe ser uno de {', '.join(exportacion.FORMATOS)}"})
+        try:
+            consulta = leer_consulta(parametros) if partes.path != '/inventario' else None
+        except ValueError as e:
+            return self._responder(400, {'error': str(e)})
+        try:
+            with self.medicion.etapa('inventario', cache='inventario'):
+                clave, motor = self.server.inventario.actual(self.medicion)
+        except requests.exceptions.RequestException as e:
+            log.warning("Portal no disponible: %s", e)
+            # Retry-After: cuando el refresco vuelve a intentar (lo que diga el circuito)
+            espera = max(1, round(self.server.inventario.refresco.circuito.espera()))
+            return self._responder(503, {'error': 'portal no disponible'}, {'Retry-After': str(espera)})
+
+        consulta_canonica = json.dumps(sorted(parametros.items())) if consulta else ''
+        etag = '"' + hashlib.sha1(f"{clave}|{partes.path}|{consulta_canonica}".encode()).hexdigest() + '"'
+        if etag in self.headers.get('If-None-Match', ''):
+            return self._responder(304, None, {'ETag': etag})
+
+        if partes.path == '/exportar':
+            filtro, rebaja, urgentes, _, _ = consulta
+            with self.medicion.etapa('filtrado') as m:
+                vista = filtrar(motor, filtro, rebaja, urgentes)
+                m['filas'] = len(vista)
+            return self._exportar(vista, formato, {'ETag': etag, 'Cache-Control': 'no-cache'})
+        if consulta is None:
+            with self.medicion.etapa('serializacion') as m:
+                clave, registros = self.server.inventario.json_inventario()
+                cuerpo = f'{{"clave": {json.dumps(clave)}, "remates": {registros}}}'
+                m['filas'] = len(motor.df)
+        else:
+            filtro, rebaja, urgentes, pagina, por_pagina = consulta
+            with self.medicion.etapa('filtrado') as m:
+                vista = filtrar(motor, filtro, rebaja, urgentes)
+                m['filas'] = len(vista)
+            inicio = (pagina - 1) * por_pagina
+            with self.medicion.etapa('serializacion') as m:
+                cuerpo = json.dumps({
+                    'total': len(vista), 'pagina': pagina, 'por_pagina': por_pagina,
+                    'paginas': -(-len(vista) // por_pagina),
+                })[:-1] + ', "remates": ' + a_registros(vista.iloc[inicio:inicio + por_pagina], COLUMNAS_EXPORTACION) + '}'
+                m['filas'] = len(vista.iloc[inicio:inicio + por_pagina])
+        self._responder(200, cuerpo, {'ETag': etag, 'Cache-Control': 'no-cache'})
+
+    def _responder(self, codigo: int, cuerpo, cabeceras: dict = None, tipo: str = 'application/json; charset=utf-8'):
+        if cuerpo is not None and not isinstance(cuerpo, str):
+            cuerpo = json.dumps(cuerpo, ensure_ascii=False)
+        datos = cuerpo.encode('utf-8') if cuerpo is not None else b''
+        self.medicion.anotar(codigo=codigo)
+        self.send_response(codigo)
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header('Vary', 'Accept-Encoding')
+        if datos:
+            self.send_header('Content-Type', tipo)
+            if len(datos) >= MIN_GZIP and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                with self.medicion.etapa('gzip') as m:
+                    m['bytes'] = len(datos)
+                    datos = gzip.compress(datos, compresslevel=6)
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _exportar(self, vista: pd.DataFrame, formato: str, cabeceras: dict):
+        """Archivo de exportación con Transfer-Encoding: chunked, un trozo por cada write()."""
+        f = exportacion.FORMATOS[formato]
+        self.medicion.anotar(codigo=200)
+        self.send_response(200)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header('Content-Type', f.tipo)
+        self.send_header('Content-Disposition', f'attachment; filename="remates.{f.extension}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def enviar(datos: bytes):
+            self.wfile.write(b'%X\r\n%s\r\n' % (len(datos), datos))
+
+        salida = exportacion.SalidaPorPartes(enviar)
+        try:
+            with self.medicion.etapa('exportacion') as m:
+                exportacion.escribir(vista, formato, salida)
+                m['filas'], m['bytes'] = len(vista), salida.tell()
+        except Exception:
+            # Sin el trozo final el cliente ve la respuesta cortada, no un archivo incompleto
+            self.close_connection = True
+            raise
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, formato, *args):
+        log.info("%s %s", self.address_string(), formato % args)
+
+
+def servir(host: str = '127.0.0.1', puerto: int = 8000, url: str = crawler.URL_PORTAL, ttl: float = 600,
+           parser: str = parseo.PARSER_POR_DEFECTO):
+    """Levanta la API y atiende hasta Ctrl+C."""
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    servidor.inventario = Inventario(refresco.Refresco(url, ttl=ttl), parser)
+    log.info("API de remates en http://%s:%d/remates", host, servidor.server_port)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
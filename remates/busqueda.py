@@ -0,0 +1,112 @@
+"""Índice invertido para el buscador de la barra lateral.
+
+Normaliza mayúsculas y acentos ("construccion" encuentra "construcción"), exige
+que estén todos los términos (AND), acepta prefijos ("const" encuentra
+"construcción") y ordena los resultados por relevancia (tf-idf simple, con más
+peso para coincidencias exactas y en el Número de Proceso). No usa expresiones
+regulares sobre el texto del usuario, así que los caracteres especiales no rompen nada.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+PALABRA = re.compile(r'\w+')
+SEPARADOR = '\x1f'  # no es \w ni cambia al plegar
+
+# Peso de cada campo indexado
+CAMPOS = {'Descripción': 1.0, 'Número de Proceso': 2.0}
+PESO_PREFIJO = 0.25  # una coincidencia por prefijo vale menos que una exacta
+
+
+MARCAS = re.compile('[\u0300-\u036f]')  # acentos sueltos que deja la descomposición NFKD
+
+
+def plegar(texto: str) -> str:
+    """Minúsculas y sin acentos: 'Construcción' -> 'construccion'."""
+    return MARCAS.sub('', unicodedata.normalize('NFKD', texto)).casefold()
+
+
+def terminos(texto: str) -> list:
+    return PALABRA.findall(plegar(texto))
+
+
+class IndiceTexto:
+    """Índice invertido: por término, las filas donde aparece y su peso (tf por campo x idf)."""
+
+    def __init__(self, df: pd.DataFrame, max_memo: int = 512):
+        self.n = len(df)
+        ocurrencias = []
+        for campo, peso in CAMPOS.items():
+            # Se pliega toda la columna de una vez (unida por un separador) y luego se vuelve a cortar
+            textos = (t if isinstance(t, str) else '' for t in df[campo].tolist())
+            plegados = plegar(SEPARADOR.join(textos)).split(SEPARADOR) if self.n else []
+            por_fila = [PALABRA.findall(t) for t in plegados]
+            ocurrencias.append(pd.DataFrame({
+                'termino': list(chain.from_iterable(por_fila)),
+                'pos': np.repeat(np.arange(self.n), [len(t) for t in por_fila]),
+                'peso': peso,
+            }))
+        # tf ponderado por campo, agrupado por (término, fila) y ordenado por término
+        tf = pd.concat(ocurrencias).groupby(['termino', 'pos'], sort=True)['peso'].sum()
+
+        # Postings de todo el vocabulario, concatenados en orden alfabético: los términos
+        # con un mismo prefijo quedan contiguos y se resuelven con un solo corte.
+        indice = tf.index.remove_unused_levels()
+        self.vocabulario = indice.levels[0].tolist()
+        tamaños = np.bincount(indice.codes[0], minlength=len(self.vocabulario))
+        self.inicios = np.concatenate([[0], np.cumsum(tamaños)]).astype(np.int64)
+        self.posiciones = tf.index.get_level_values('pos').to_numpy(dtype=np.int64)
+        idf = np.log1p(self.n / tamaños)
+        self.pesos = tf.to_numpy(dtype=float) * np.repeat(idf, tamaños)
+
+        self._memo = OrderedDict()
+        self._max_memo = max_memo
+        self._lock = threading.Lock()
+
+    def _por_prefijo(self, prefijo: str):
+        """(máscara de filas, puntaje por fila) de todos los términos que empiezan con `prefijo`."""
+        with self._lock:
+            previo = self._memo.get(prefijo)
+            if previo is not None:
+                self._memo.move_to_end(prefijo)
+                return previo
+
+        # Rango de términos [i, j) que empiezan con el prefijo (el vocabulario está ordenado)
+        i = bisect.bisect_left(self.vocabulario, prefijo)
+        j = bisect.bisect_left(self.vocabulario, prefijo + '\U0010ffff', lo=i)
+        a, b = self.inicios[i], self.inicios[j]
+        posiciones = self.posiciones[a:b]
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[posiciones] = True
+        puntaje = np.bincount(posiciones, weights=self.pesos[a:b] * PESO_PREFIJO, minlength=self.n)
+        if i < j and self.vocabulario[i] == prefijo:
+            # Coincidencia exacta: completa su peso al 100 %
+            a_exacta, b_exacta = self.inicios[i], self.inicios[i + 1]
+            puntaje += np.bincount(self.posiciones[a_exacta:b_exacta],
+                                   weights=self.pesos[a_exacta:b_exacta] * (1 - PESO_PREFIJO), minlength=self.n)
+
+        with self._lock:
+            self._memo[prefijo] = (mascara, puntaje)
+            while len(self._memo) > self._max_memo:
+                self._memo.popitem(last=False)
+        return mascara, puntaje
+
+    def buscar(self, consulta: str):
+        """(máscara, puntaje) de las filas que contienen todos los términos, o None si la
+        consulta no tiene términos (p. ej. solo signos)."""
+        partes = terminos(consulta)
+        if not partes:
+            return None
+        mascara = np.ones(self.n, dtype=bool)
+        puntaje = np.zeros(self.n, dtype=float)
+        for termino in dict.fromkeys(partes):
+            m, p = self._por_prefijo(termino)
+            mascara &= m
+            puntaje += p
+        return mascara, puntaje
@@ -0,0 +1,200 @@
+"""Línea de comandos: `python -m remates exportar ...`, `servir` y `alertas`.
+
+Descarga el listado del portal (o lee páginas HTML guardadas, parseadas en
+paralelo en varios procesos), lo filtra con las mismas opciones que la barra
+lateral de la app y escribe el resultado en CSV, JSON (un remate por línea) o
+Parquet, a un archivo o a la salida estándar.
+No importa Streamlit: arranca rápido y sirve para tareas programadas.
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+from remates import consultas, ingesta, parseo
+
+log = logging.getLogger(__name__)
+
+COLUMNAS_EXPORTACION = parseo.COLUMNAS_VISIBLES + parseo.COLUMNAS_LUGAR + ['FechaDate', 'Valor', 'Moneda', 'DiasRestantes']
+FORMATOS = ('csv', 'json', 'parquet')
+FILAS_POR_BLOQUE = 5_000
+
+
+def cargar(archivos=None, url=None, parser: str = parseo.PARSER_POR_DEFECTO,
+           fuente: str = parseo.FUENTE_POR_DEFECTO, procesos: int = None) -> pd.DataFrame:
+    """Inventario con urgencia calculada, desde archivos HTML guardados (o directorios
+    con ellos) o desde la fuente. El parseo se reparte en `procesos` procesos."""
+    if archivos:
+        df = ingesta.ingerir_archivos(archivos, fuente, parser, procesos)
+    else:
+        paginas = parseo.FUENTES[fuente].rastrear(url)
+        df = ingesta.ingerir_paginas(paginas.values(), fuente, parser, procesos)
+    return parseo.calcular_urgencia(df)
+
+
+def filtrar(motor: consultas.MotorConsultas, filtro: consultas.Filtro, rebaja: int = None,
+            urgentes: bool = False) -> pd.DataFrame:
+    """Los remates que ve la app con esos filtros; `rebaja` elige la pestaña (0 o 20)."""
+    resultado = motor.filtrar(filtro)
+    vista = {None: resultado.vista, 0: resultado.vista_0, 20: resultado.vista_20}[rebaja]
+    if urgentes:
+        vista = vista[parseo.es_urgente(vista['DiasRestantes'])]
+    return vista
+
+
+def escribir(df: pd.DataFrame, formato: str, destino):
+    """Escribe las columnas de exportación; CSV y JSON salen por bloques de filas."""
+    df = df[COLUMNAS_EXPORTACION]
+    if formato == 'parquet':
+        df.to_parquet(destino, index=False)
+        return
+    df = df.assign(FechaDate=df['FechaDate'].dt.strftime('%Y-%m-%d'))
+    for inicio in range(0, max(len(df), 1), FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        if formato == 'csv':
+            bloque.to_csv(destino, index=False, header=inicio == 0)
+        elif len(bloque):
+            bloque.to_json(destino, orient='records', lines=True, force_ascii=False)
+
+
+def _argumentos_filtro(parser: argparse.ArgumentParser):
+    """Las opciones de la barra lateral de la app."""
+    parser.add_argument('--departamento', help='departamento, como en la barra lateral (p. ej. Chuquisaca)')
+    parser.add_argument('--ciudad', help='ciudad (municipio) exacta, como en la barra lateral (p. ej. Sucre)')
+    parser.add_argument('--texto', help='búsqueda en descripción y número de proceso')
+    parser.add_argument('--desde', type=date.fromisoformat, help='fecha de remate mínima (AAAA-MM-DD)')
+    parser.add_argument('--hasta', type=date.fromisoformat, help='fecha de remate máxima (AAAA-MM-DD)')
+    parser.add_argument('--valor-min', type=float, help='valor original mínimo en Bs')
+    parser.add_argument('--valor-max', type=float, help='valor original máximo en Bs')
+    parser.add_argument('--rebaja', type=int, choices=(0, 20), help='solo remates con esa rebaja')
+    parser.add_argument('--urgentes', action='store_true', help='solo remates en rojo o amarillo')
+
+
+def _filtro(args) -> consultas.Filtro:
+    return consultas.Filtro(
+        departamento=args.departamento, ciudad=args.ciudad, texto=args.texto,
+        fecha_ini=args.desde, fecha_fin=args.hasta, valor_min=args.valor_min, valor_max=args.valor_max,
+    )
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(prog='remates', description='Remates judiciales del Órgano Judicial de Bolivia.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='muestra el detalle del proceso en stderr')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    exportar = comandos.add_parser('exportar', help='descarga, filtra y exporta el listado')
+    exportar.set_defaults(funcion=comando_exportar)
+    exportar.add_argument('html', nargs='*',
+                          help='páginas HTML guardadas o directorios con ellas (si no se indican, se descarga el portal)')
+    exportar.add_argument('--url', help='URL inicial del portal')
+    exportar.add_argument('--parser', choices=sorted(parseo.PARSERS), default=parseo.PARSER_POR_DEFECTO)
+    exportar.add_argument('--fuente', choices=sorted(parseo.FUENTES), default=parseo.FUENTE_POR_DEFECTO,
+                          help='adaptador con el que se descargan y se leen las páginas')
+    exportar.add_argument('--procesos', type=int, help='procesos para parsear (por defecto, uno por núcleo)')
+    _argumentos_filtro(exportar)
+    exportar.add_argument('-f', '--formato', choices=FORMATOS, default='csv')
+    exportar.add_argument('-o', '--salida', help='archivo de salida (por defecto, la salida estándar)')
+
+    memoria = comandos.add_parser('memoria', help='compara la memoria del listado compacto con la original')
+    memoria.set_defaults(funcion=comando_memoria)
+    memoria.add_argument('html', nargs='*', help='páginas HTML guardadas (si no se indican, se descarga el portal)')
+    memoria.add_argument('--url', help='URL inicial del portal')
+    memoria.add_argument('--parser', choices=sorted(parseo.PARSERS), default=parseo.PARSER_POR_DEFECTO)
+
+    servir = comandos.add_parser('servir', aliases=['serve'], help='API JSON local de solo lectura')
+    servir.set_defaults(funcion=comando_servir)
+    servir.add_argument('--host', default='127.0.0.1')
+    servir.add_argument('--puerto', type=int, default=8000)
+    servir.add_argument('--url', help='URL inicial del portal')
+    servir.add_argument('--ttl', type=float, default=600, help='segundos entre revalidaciones del portal')
+    servir.add_argument('--parser', choices=sorted(parseo.PARSERS), default=parseo.PARSER_POR_DEFECTO)
+
+    alertas = comandos.add_parser('alertas', help='búsquedas guardadas que avisan de remates nuevos')
+    alertas.set_defaults(funcion=comando_alertas)
+    alertas.add_argument('--db', default=os.environ.get('REMATES_DB') or 'remates.db',
+                         help='base SQLite de la app (por defecto REMATES_DB o remates.db)')
+    acciones = alertas.add_subparsers(dest='accion', required=True)
+    listar = acciones.add_parser('listar', help='lista las alertas guardadas')
+    listar.add_argument('--usuario', help='solo las de ese usuario (token ?u= de la app)')
+    agregar = acciones.add_parser('agregar', help='guarda una alerta con los filtros indicados')
+    agregar.add_argument('nombre')
+    agregar.add_argument('--destino', required=True, help='https://…, mailto:correo@… o file:/ruta/avisos.jsonl')
+    agregar.add_argument('--usuario', default='cli')
+    _argumentos_filtro(agregar)
+    borrar = acciones.add_parser('borrar', help='borra una alerta')
+    borrar.add_argument('id', type=int)
+    return parser.parse_args(argv)
+
+
+def comando_exportar(args) -> int:
+    try:
+        df = cargar(args.html, args.url, args.parser, args.fuente, args.procesos)
+    except OSError as e:  # incluye los errores de requests
+        print(f"remates: no se pudo obtener el listado: {e}", file=sys.stderr)
+        return 1
+    vista = filtrar(consultas.MotorConsultas(df), _filtro(args), args.rebaja, args.urgentes)
+    log.info("%d de %d remates cumplen los filtros", len(vista), len(df))
+
+    if args.salida:
+        modo = {'encoding': 'utf-8', 'newline': ''} if args.formato != 'parquet' else {}
+        with open(args.salida, 'wb' if args.formato == 'parquet' else 'w', **modo) as destino:
+            escribir(vista, args.formato, destino)
+    else:
+        try:
+            escribir(vista, args.formato, sys.stdout.buffer if args.formato == 'parquet' else sys.stdout)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Quien lee cerró la tubería (p. ej. `| head`): se descarta el resto sin traza
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+def comando_memoria(args) -> int:
+    from remates import memoria
+
+    try:
+        df = cargar(args.html, args.url, args.parser)
+    except OSError as e:
+        print(f"remates: no se pudo obtener el listado: {e}", file=sys.stderr)
+        return 1
+    print(memoria.formatear(*memoria.reporte(df), len(df)))
+    return 0
+
+
+def comando_servir(args) -> int:
+    from remates import api, crawler
+
+    api.servir(args.host, args.puerto, args.url or crawler.URL_PORTAL, args.ttl, args.parser)
+    return 0
+
+
+def comando_alertas(args) -> int:
+    from remates import alertas
+
+    guardadas = alertas.Alertas(args.db)
+    if args.accion == 'listar':
+        for alerta in guardadas.listar(args.usuario):
+            print(f"{alerta.id}\t{alerta.usuario}\t{alerta.nombre}\t{alertas.describir(alerta)}\t{alerta.destino}")
+    elif args.accion == 'agregar':
+        try:
+            # Quien usa la línea de comandos es el operador: sin las restricciones de destino de la app
+            id_alerta = guardadas.agregar(args.usuario, args.nombre, _filtro(args), args.destino,
+                                          rebaja=args.rebaja, urgentes=args.urgentes, publica=False)
+        except ValueError as e:
+            print(f"remates: {e}", file=sys.stderr)
+            return 2
+        print(id_alerta)
+    elif not guardadas.borrar(args.id):
+        print(f"remates: no existe la alerta {args.id}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    args = _argumentos(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(levelname)s %(name)s: %(message)s')
+    return args.funcion(args)
@@ -0,0 +1,177 @@
+"""Motor de consultas sobre el listado de remates.
+
+Los índices se construyen una sola vez por dataset: máscaras (bitmaps) por
+departamento, ciudad, rebaja y urgencia, e índices ordenados de fecha y valor para resolver
+rangos por búsqueda binaria. Cada combinación de filtros se resuelve en una
+pasada (posiciones de la vista filtrada y de cada pestaña, de donde salen los
+KPIs) y se memoizan solo esas posiciones: las vistas se arman en cada consulta.
+La búsqueda de texto usa un índice invertido que se arma la primera vez que se busca.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from remates import parseo
+from remates.busqueda import IndiceTexto
+
+TIPO_CAMBIO_USD = 6.96  # Bs por dólar (tipo de cambio oficial)
+
+Filtro = namedtuple(
+    'Filtro',
+    ['ciudad', 'texto', 'fecha_ini', 'fecha_fin', 'valor_min', 'valor_max', 'departamento'],
+    defaults=(None, None, None, None, None, None, None),
+)
+Resultado = namedtuple(
+    'Resultado',
+    ['vista', 'vista_0', 'vista_20', 'vista_urgentes', 'total', 'total_0', 'total_20', 'total_urgentes'],
+)
+
+
+class IndiceOrdenado:
+    """Posiciones de las filas ordenadas por valor (sin nulos): rangos por búsqueda binaria."""
+
+    def __init__(self, valores: np.ndarray):
+        validos = np.flatnonzero(~np.isnan(valores))
+        self.posiciones = validos[np.argsort(valores[validos], kind='stable')]
+        self.valores = valores[self.posiciones]
+        self.n = len(valores)
+
+    def rango(self, desde=None, hasta=None) -> np.ndarray:
+        i = 0 if desde is None else np.searchsorted(self.valores, desde, side='left')
+        j = len(self.valores) if hasta is None else np.searchsorted(self.valores, hasta, side='right')
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[self.posiciones[i:j]] = True
+        return mascara
+
+
+class IndiceCategorico:
+    """Códigos de categoría por fila; el bitmap de cada valor se arma al pedirlo y se guarda."""
+
+    def __init__(self, serie: pd.Series):
+        categorica = serie.astype('category')
+        self.codigos = categorica.cat.codes.to_numpy()
+        self.posicion = {valor: i for i, valor in enumerate(categorica.cat.categories)}
+        self._bitmaps = {}
+
+    def bitmap(self, valor) -> np.ndarray:
+        mascara = self._bitmaps.get(valor)
+        if mascara is None:
+            codigo = self.posicion.get(valor, -2)  # -2: no existe (los nulos son -1)
+            mascara = self._bitmaps[valor] = self.codigos == codigo
+        return mascara
+
+
+class MotorConsultas:
+    """Índices sobre un DataFrame de remates ya normalizado y con urgencia calculada."""
+
+    def __init__(self, df: pd.DataFrame, max_memo: int = 16):
+        self.df = df
+        self.es_inmueble = df['Tipo de Inmueble'].str.contains('INMUEBLE', case=False).to_numpy(dtype=bool)
+        self.departamento = IndiceCategorico(df['Departamento'])
+        self.departamentos = list(self.departamento.posicion)  # ordenados, sin nulos
+        self.ciudad = IndiceCategorico(df['Ciudad'])
+        self.ciudades = list(self.ciudad.posicion)  # ordenadas, sin nulos
+        # Departamento -> sus ciudades (ordenadas), para ofrecer solo las que corresponden
+        pares = df[['Departamento', 'Ciudad']].dropna().astype(str).drop_duplicates().sort_values('Ciudad')
+        self.ciudades_por_departamento = pares.groupby('Departamento', sort=False)['Ciudad'].agg(list).to_dict()
+        self.rebaja = IndiceCategorico(df['Rebaja'])
+        self.urgente = parseo.es_urgente(df['DiasRestantes'])
+        self.fecha = IndiceOrdenado(_dias(df['FechaDate'].to_numpy(dtype='datetime64[ns]')))
+        self.valor_bs = (df['Valor'] * np.where(df['Moneda'] == 'USD', TIPO_CAMBIO_USD, 1.0)).to_numpy(dtype=float)
+        self.valor = IndiceOrdenado(self.valor_bs)
+        # Número de Proceso -> posiciones (hash): para resolver favoritos sin recorrer el listado
+        self.por_proceso = df.groupby('Número de Proceso', sort=False).indices
+        self._texto = None
+        self._memo = OrderedDict()
+        self._max_memo = max_memo
+        self._lock = threading.Lock()
+
+    @property
+    def texto(self) -> IndiceTexto:
+        with self._lock:
+            if self._texto is None:
+                self._texto = IndiceTexto(self.df)
+            return self._texto
+
+    def rango_valor(self):
+        """(mínimo, máximo) del valor en Bs, o None si no hay valores."""
+        if not len(self.valor.valores):
+            return None
+        return self.valor.valores[0], self.valor.valores[-1]
+
+    def posiciones_de(self, procesos) -> np.ndarray:
+        """Posiciones (en orden del listado) de los remates con esos Números de Proceso."""
+        encontradas = [self.por_proceso[p] for p in procesos if p in self.por_proceso]
+        if not encontradas:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(encontradas))
+
+    def filtrar(self, filtro: Filtro) -> Resultado:
+        with self._lock:
+            posiciones = self._memo.get(filtro)
+            if posiciones is not None:
+                self._memo.move_to_end(filtro)
+        if posiciones is None:
+            posiciones = self._posiciones(self.orden(filtro))
+            with self._lock:
+                self._memo[filtro] = posiciones
+                while len(self._memo) > self._max_memo:
+                    self._memo.popitem(last=False)
+        return self._vistas(*posiciones)
+
+    def orden(self, f: Filtro) -> np.ndarray:
+        """Posiciones de los remates que cumplen el filtro, en el orden en que se muestran."""
+        mascara = self.es_inmueble.copy()
+        if f.departamento is not None:
+            mascara &= self.departamento.bitmap(f.departamento)
+        if f.ciudad is not None:
+            mascara &= self.ciudad.bitmap(f.ciudad)
+        if f.fecha_ini is not None or f.fecha_fin is not None:
+            mascara &= self.fecha.rango(_dia(f.fecha_ini), _dia(f.fecha_fin))
+        if f.valor_min is not None or f.valor_max is not None:
+            mascara &= self.valor.rango(f.valor_min, f.valor_max)
+        busqueda = self.texto.buscar(f.texto) if f.texto else None
+        if busqueda is not None:
+            mascara &= busqueda[0]
+
+        # Orden de las vistas: el del listado o, si se buscó texto, por relevancia
+        orden = np.flatnonzero(mascara)
+        if busqueda is not None:
+            orden = orden[np.argsort(-busqueda[1][orden], kind='stable')]
+        return orden
+
+    def _armar(self, orden: np.ndarray) -> Resultado:
+        """Vistas por pestaña y KPIs de un resultado, en una pasada sobre los bitmaps."""
+        return self._vistas(*self._posiciones(orden))
+
+    def _posiciones(self, orden: np.ndarray) -> tuple:
+        """Posiciones de la vista y de cada pestaña (0 %, 20 %, urgentes): lo que se memoiza."""
+        return (orden, orden[self.rebaja.bitmap(0)[orden]], orden[self.rebaja.bitmap(20)[orden]],
+                orden[self.urgente[orden]])
+
+    def _vistas(self, orden, orden_0, orden_20, orden_urgentes) -> Resultado:
+        return Resultado(
+            vista=self.df.iloc[orden],
+            vista_0=self.df.iloc[orden_0],
+            vista_20=self.df.iloc[orden_20],
+            vista_urgentes=self.df.iloc[orden_urgentes],
+            total=len(orden),
+            total_0=len(orden_0),
+            total_20=len(orden_20),
+            total_urgentes=len(orden_urgentes),
+        )
+
+
+def _dias(fechas: np.ndarray) -> np.ndarray:
+    """datetime64 -> días desde 1970 como float (NaT -> NaN), el eje del índice de fechas."""
+    dias = fechas.astype('datetime64[D]').astype('int64').astype(float)
+    dias[np.isnat(fechas)] = np.nan
+    return dias
+
+
+def _dia(fecha):
+    if fecha is None:
+        return None
+    return float(np.datetime64(pd.Timestamp(fecha).date(), 'D').astype('int64'))
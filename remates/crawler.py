@@ -0,0 +1,239 @@
+"""Descarga concurrente de todas las páginas del listado de remates.
+
+Parte de la página inicial, descubre los enlaces de paginación y de vistas por
+departamento y los descarga con un pool de hilos acotado que comparte una sola
+sesión keep-alive, con la misma política de reintentos que la app. Con un
+`plazo`, todo el rastreo (reintentos y esperas incluidos) termina a tiempo o
+falla con PlazoVencido.
+"""
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urljoin, urlsplit, urldefrag
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from remates import metricas
+
+log = logging.getLogger(__name__)
+
+URL_PORTAL = "https://thor.organojudicial.gob.bo/"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+    "Accept-Language": "es-BO,es;q=0.9,en;q=0.8",
+}
+TIMEOUT = (15, 60)  # (connect, read)
+
+# Enlaces que llevan a otra página del mismo listado: paginación o filtro por departamento
+PATRON_LISTADO = re.compile(r"[?&](page|pagina|departamento|dpto|distrito)=", re.IGNORECASE)
+
+
+class PlazoVencido(requests.exceptions.Timeout):
+    """Se acabó el tiempo total de la descarga (entre intentos, esperas y reintentos)."""
+
+
+class Plazo:
+    """Tiempo total disponible para una descarga, medido desde que se crea."""
+
+    def __init__(self, segundos: float):
+        self.segundos = segundos
+        self.limite = time.monotonic() + segundos
+
+    def restante(self) -> float:
+        return self.limite - time.monotonic()
+
+    def timeout(self) -> tuple:
+        """TIMEOUT recortado a lo que queda; PlazoVencido si ya no queda nada."""
+        restante = self.restante()
+        if restante <= 0:
+            raise PlazoVencido(f"se superó el plazo de {self.segundos:.0f} s")
+        return tuple(min(t, restante) for t in TIMEOUT)
+
+
+def _es_plazo_vencido(error: BaseException) -> bool:
+    """True si `error` es o envuelve un PlazoVencido: el que lanza Reintentos.sleep sale
+    de urllib3 y requests lo vuelve a envolver en un ConnectionError."""
+    vistos = set()
+    while error is not None and id(error) not in vistos:
+        if isinstance(error, PlazoVencido):
+            return True
+        vistos.add(id(error))
+        anidado = next((a for a in error.args if isinstance(a, BaseException)), None)
+        error = anidado or getattr(error, 'reason', None) or error.__cause__ or error.__context__
+    return False
+
+
+# Límite (time.monotonic) de la descarga en curso en cada hilo: lo lee Reintentos
+_plazo_hilo = threading.local()
+
+
+class Reintentos(Retry):
+    """Retry de urllib3 que no espera para reintentar si la espera pasa el plazo de la descarga."""
+
+    def sleep(self, response=None):
+        limite = getattr(_plazo_hilo, "limite", None)
+        if limite is not None:
+            espera = (self.get_retry_after(response) if response and self.respect_retry_after_header else None)
+            if time.monotonic() + (espera or self.get_backoff_time()) >= limite:
+                raise PlazoVencido("no queda plazo para otro reintento")
+        super().sleep(response)
+
+
+def crear_sesion(pool: int = 10) -> requests.Session:
+    """Sesión con conexiones keep-alive reutilizables y la política de reintentos del portal."""
+    s = requests.Session()
+    s.headers.update(HEADERS)
+    retries = Reintentos(
+        total=4,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retries)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+class LimitadorPorHost:
+    """Espacia los pedidos a un mismo host a no más de `por_segundo` por segundo."""
+
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self._siguiente = {}
+        self._lock = threading.Lock()
+
+    def esperar(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente.get(host, ahora))
+            self._siguiente[host] = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+class Listado(dict):
+    """{url: html} de un rastreo. `faltantes` son las páginas descubiertas que no se
+    bajaron (fallaron o pasaban de max_paginas): con alguna, el listado está incompleto."""
+
+    def __init__(self, paginas=(), faltantes=()):
+        super().__init__(paginas)
+        self.faltantes = list(faltantes)
+
+    @property
+    def completo(self) -> bool:
+        return not self.faltantes
+
+
+# Lo necesario para un GET condicional: validadores HTTP y el HTML que se recibió con ellos
+Validador = namedtuple("Validador", ["etag", "modificado", "html"])
+
+
+def descargar(sesion: requests.Session, url: str, limitador: LimitadorPorHost = None,
+              validadores: dict = None, plazo: Plazo = None) -> str:
+    """GET de una página. Con `validadores` ({url: Validador}) envía If-None-Match /
+    If-Modified-Since y, ante un 304, devuelve el HTML guardado sin volver a bajarlo.
+    Con `plazo`, los timeouts y los reintentos se recortan a lo que queda de él."""
+    previo = validadores.get(url) if validadores is not None else None
+    headers = {}
+    if previo is not None:
+        if previo.etag:
+            headers["If-None-Match"] = previo.etag
+        if previo.modificado:
+            headers["If-Modified-Since"] = previo.modificado
+    if limitador is not None:
+        limitador.esperar(url)
+    timeout = plazo.timeout() if plazo is not None else TIMEOUT
+    _plazo_hilo.limite = plazo.limite if plazo is not None else None
+    try:
+        r = sesion.get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        # Un timeout recortado o un reintento sin plazo son el plazo vencido, no una página caída
+        if plazo is not None and (_es_plazo_vencido(e) or plazo.restante() <= 0):
+            raise PlazoVencido(f"se superó el plazo de {plazo.segundos:.0f} s descargando {url}") from e
+        raise
+    finally:
+        _plazo_hilo.limite = None
+    metricas.REGISTRO.contar("descarga_respuestas", codigo=r.status_code)
+    metricas.REGISTRO.contar("descarga_bytes", len(r.content))
+    r.raise_for_status()
+    if r.status_code == 304 and previo is not None:
+        return previo.html
+    if validadores is not None and (r.headers.get("ETag") or r.headers.get("Last-Modified")):
+        validadores[url] = Validador(r.headers.get("ETag"), r.headers.get("Last-Modified"), r.text)
+    return r.text
+
+
+def enlaces_listado(html: str, url_base: str):
+    """URLs absolutas del mismo host que apuntan a otras páginas del listado."""
+    host = urlsplit(url_base).netloc
+    for a in BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("a", href=True)).find_all("a"):
+        destino = urldefrag(urljoin(url_base, a["href"]))[0]
+        if urlsplit(destino).netloc == host and PATRON_LISTADO.search(destino):
+            yield destino
+
+
+def rastrear(url_inicial: str = URL_PORTAL, max_workers: int = 4, por_segundo: float = 2.0,
+             max_paginas: int = 200, sesion: requests.Session = None, validadores: dict = None,
+             plazo: float = None) -> dict:
+    """Descarga la página inicial y todas las páginas del listado que se descubran.
+
+    Devuelve un Listado ({url: html}) en orden de descubrimiento. Si falla la página
+    inicial se propaga la excepción de requests; las demás páginas fallidas se omiten
+    (se loguean) y quedan en Listado.faltantes, igual que las que pasan de max_paginas.
+    `validadores` se pasa a descargar() para hacer GET condicionales entre rastreos.
+    Con `plazo` (segundos para todo el rastreo) nunca se devuelve un listado a medias:
+    si se vence, PlazoVencido.
+    """
+    sesion = sesion or crear_sesion(pool=max_workers)
+    limitador = LimitadorPorHost(por_segundo)
+    plazo = Plazo(plazo) if plazo is not None else None
+    paginas = {url_inicial: descargar(sesion, url_inicial, limitador, validadores, plazo)}
+    orden = [url_inicial]
+    vistas = {url_inicial}
+    faltantes = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pendientes = {}
+
+        def encolar(html, url_base):
+            for destino in enlaces_listado(html, url_base):
+                if destino in vistas:
+                    continue
+                vistas.add(destino)
+                if len(orden) >= max_paginas:
+                    faltantes.append(destino)
+                    continue
+                orden.append(destino)
+                pendientes[pool.submit(descargar, sesion, destino, limitador, validadores, plazo)] = destino
+
+        encolar(paginas[url_inicial], url_inicial)
+        while pendientes:
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                destino = pendientes.pop(futuro)
+                try:
+                    html = futuro.result()
+                except PlazoVencido:
+                    for pendiente in pendientes:
+                        pendiente.cancel()
+                    raise
+                except requests.exceptions.RequestException as e:
+                    log.warning("No se pudo descargar %s: %s", destino, e)
+                    faltantes.append(destino)
+                    continue
+                paginas[destino] = html
+                encolar(html, destino)
+
+    if faltantes:
+        log.warning("Listado incompleto: no se bajaron %d de %d páginas", len(faltantes), len(vistas))
+    # Orden estable: el de descubrimiento, no el de llegada
+    return Listado(((u, paginas[u]) for u in orden if u in paginas), faltantes)
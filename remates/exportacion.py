@@ -0,0 +1,141 @@
+"""Exportación por bloques del listado filtrado: CSV, Excel y Parquet.
+
+Las columnas y los valores son los de la tabla de la app (marcar_favorito): N°,
+Favorito si se pasan los favoritos, y COLUMNAS_TABLA con el ícono de urgencia
+junto a la fecha. La tabla se arma de a FILAS_POR_BLOQUE filas y ningún formato
+junta el archivo entero en memoria: el CSV sale de un generador, el Parquet se
+escribe un row group por bloque y el Excel usa xlsxwriter en modo constant_memory
+(cada fila va a un archivo temporal en cuanto se escribe).
+"""
+import io
+import tempfile
+from collections import namedtuple
+
+import pandas as pd
+
+from remates import parseo
+
+try:
+    import xlsxwriter  # Excel (opcional): si no está, no se ofrece el formato
+except ImportError:
+    xlsxwriter = None
+
+FILAS_POR_BLOQUE = 5_000
+
+Formato = namedtuple('Formato', ['escribir', 'tipo', 'extension', 'etiqueta'])
+
+
+def bloques(df: pd.DataFrame, favoritos: set = None, filas: int = FILAS_POR_BLOQUE):
+    """La tabla de la app, de a `filas` filas. N° sigue la posición en `df`."""
+    for inicio in range(0, len(df), filas):
+        parte = df.iloc[inicio:inicio + filas]
+        tabla = parseo.tabla_listado(parte)
+        tabla = tabla.astype({c: object for c in tabla.columns if isinstance(tabla[c].dtype, pd.CategoricalDtype)})
+        tabla.insert(0, 'N°', range(inicio + 1, inicio + len(parte) + 1))
+        if favoritos is not None:
+            tabla.insert(1, 'Favorito', tabla['Número de Proceso'].isin(favoritos))
+        yield tabla
+
+
+def columnas(favoritos: set = None) -> list:
+    return ['N°'] + (['Favorito'] if favoritos is not None else []) + parseo.COLUMNAS_TABLA
+
+
+def csv(df: pd.DataFrame, favoritos: set = None):
+    """Generador de bytes CSV (UTF-8 con BOM, para que Excel respete los acentos)."""
+    yield pd.DataFrame(columns=columnas(favoritos)).to_csv(index=False, lineterminator='\r\n').encode('utf-8-sig')
+    for tabla in bloques(df, favoritos):
+        yield tabla.to_csv(index=False, header=False, lineterminator='\r\n').encode('utf-8')
+
+
+def escribir_csv(df: pd.DataFrame, destino, favoritos: set = None):
+    for trozo in csv(df, favoritos):
+        destino.write(trozo)
+
+
+def esquema_parquet(favoritos: set = None):
+    import pyarrow as pa  # se importa al usarlo: no pesa en el arranque del CLI ni de la API
+
+    # Fijo: un bloque con una columna toda nula no puede cambiar el tipo de los siguientes
+    tipos = {'N°': pa.int64(), 'Favorito': pa.bool_(), 'Rebaja': pa.int8()}
+    return pa.schema([(c, tipos.get(c, pa.string())) for c in columnas(favoritos)])
+
+
+def escribir_parquet(df: pd.DataFrame, destino, favoritos: set = None):
+    """Un row group por bloque. `destino` solo necesita write() y tell()."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = esquema_parquet(favoritos)
+    with pq.ParquetWriter(destino, esquema, compression='zstd') as escritor:
+        for tabla in bloques(df, favoritos):
+            escritor.write_table(pa.Table.from_pandas(tabla, schema=esquema, preserve_index=False))
+
+
+def escribir_xlsx(df: pd.DataFrame, destino, favoritos: set = None):
+    """Excel fila a fila (constant_memory): el libro se arma en `destino` al cerrar."""
+    libro = xlsxwriter.Workbook(destino, {'constant_memory': True, 'strings_to_numbers': False})
+    hoja = libro.add_worksheet('Remates')
+    negrita = libro.add_format({'bold': True})
+    porcentaje = libro.add_format({'num_format': '0"%"'})
+    nombres = columnas(favoritos)
+    anchos = {'N°': 6, 'Favorito': 9, 'Descripción': 60, 'Ubicación': 40, 'Juzgado': 35, 'Rebaja': 8}
+    for i, nombre in enumerate(nombres):
+        hoja.set_column(i, i, anchos.get(nombre, 22), porcentaje if nombre == 'Rebaja' else None)
+    hoja.write_row(0, 0, nombres, negrita)
+    hoja.freeze_panes(1, 0)
+    fila = 1
+    for tabla in bloques(df, favoritos):
+        # None en vez de NaN: xlsxwriter deja la celda vacía
+        for registro in tabla.astype(object).where(tabla.notna(), None).itertuples(index=False, name=None):
+            hoja.write_row(fila, 0, registro)
+            fila += 1
+    libro.close()
+
+
+FORMATOS = {
+    'csv': Formato(escribir_csv, 'text/csv; charset=utf-8', 'csv', 'CSV'),
+    'parquet': Formato(escribir_parquet, 'application/vnd.apache.parquet', 'parquet', 'Parquet'),
+}
+if xlsxwriter is not None:
+    FORMATOS['xlsx'] = Formato(
+        escribir_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 'Excel',
+    )
+
+
+def escribir(df: pd.DataFrame, formato: str, destino, favoritos: set = None):
+    """Escribe la tabla en `destino` (archivo binario) en uno de los FORMATOS."""
+    FORMATOS[formato].escribir(df, destino, favoritos)
+
+
+def a_bytes(df: pd.DataFrame, formato: str, favoritos: set = None) -> bytes:
+    """La exportación entera en bytes, armada en un archivo temporal (para st.download_button)."""
+    with tempfile.TemporaryFile() as archivo:
+        escribir(df, formato, archivo, favoritos)
+        archivo.seek(0)
+        return archivo.read()
+
+
+class SalidaPorPartes(io.RawIOBase):
+    """Archivo de solo escritura que pasa cada write() a `enviar` (p. ej. un cuerpo chunked).
+
+    Lleva la cuenta de bytes para tell(): es lo único que piden ParquetWriter y zipfile
+    además de write() cuando el destino no admite seek.
+    """
+
+    def __init__(self, enviar):
+        self.enviar = enviar
+        self.posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        if datos:
+            self.enviar(datos)
+            self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self.posicion
@@ -0,0 +1,58 @@
+"""Favoritos persistentes, por usuario.
+
+Un favorito es un Número de Proceso: a diferencia de la posición en el
+DataFrame, sigue apuntando al mismo remate después de cada refresco. Se guardan
+en SQLite, en la misma base que la copia local del listado, bajo un token de
+usuario o de navegador.
+"""
+import sqlite3
+import time
+from contextlib import closing
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS favoritos (
+    usuario TEXT NOT NULL,
+    proceso TEXT NOT NULL,
+    agregado REAL NOT NULL,
+    PRIMARY KEY (usuario, proceso)
+);
+"""
+
+
+def diferencia(actuales: set, en_tabla: set, marcados: set):
+    """(a agregar, a quitar) según lo que se marcó en una tabla que muestra `en_tabla`.
+
+    Solo se quitan los favoritos que estaban a la vista y se desmarcaron; los que
+    no aparecen en la tabla no se tocan.
+    """
+    return marcados - actuales, (actuales & en_tabla) - marcados
+
+
+class Favoritos:
+    """Acceso a la tabla de favoritos. Abre una conexión por operación (seguro entre hilos)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def listar(self, usuario: str) -> set:
+        with closing(self._conectar()) as con:
+            return {p for (p,) in con.execute("SELECT proceso FROM favoritos WHERE usuario = ?", (usuario,))}
+
+    def aplicar(self, usuario: str, agregar=(), quitar=()):
+        """Agrega y quita favoritos del usuario en una sola transacción."""
+        momento = time.time()
+        with closing(self._conectar()) as con, con:
+            con.executemany(
+                "INSERT OR IGNORE INTO favoritos (usuario, proceso, agregado) VALUES (?, ?, ?)",
+                [(usuario, p, momento) for p in agregar],
+            )
+            con.executemany(
+                "DELETE FROM favoritos WHERE usuario = ? AND proceso = ?",
+                [(usuario, p) for p in quitar],
+            )
@@ -0,0 +1,55 @@
+"""Caché por fragmento del listado.
+
+El HTML se corta en un fragmento por cada <li class="clearfix">. Cada fragmento
+se identifica por el hash de su texto crudo: si ya se vio, se reutiliza el
+registro normalizado guardado y no se vuelve a extraer. Entre refrescos la
+mayoría de los remates no cambia, así que el costo queda proporcional al delta.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+INICIO_REMATE = re.compile(r"""<li\b[^>]*\bclass\s*=\s*["']?[^"'>]*\bclearfix\b""", re.IGNORECASE)
+
+
+def dividir(html: str) -> list:
+    """Fragmentos del HTML: cada uno va desde un <li class="clearfix"> hasta el siguiente."""
+    inicios = [m.start() for m in INICIO_REMATE.finditer(html)]
+    return [html[a:b] for a, b in zip(inicios, inicios[1:] + [len(html)])]
+
+
+def huella(fragmento: str) -> bytes:
+    return hashlib.blake2b(fragmento.encode(), digest_size=16).digest()
+
+
+class CacheLRU:
+    """Diccionario acotado con desalojo LRU y conteo de aciertos/fallos (seguro entre hilos)."""
+
+    def __init__(self, max_items: int = 50_000):
+        self.max_items = max_items
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+                self._datos.move_to_end(clave)
+            return valor
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'tamaño': len(self._datos)}
@@ -0,0 +1,40 @@
+"""Interfaz de los adaptadores de fuentes de remates.
+
+Una fuente declara cómo se descarga (rastrear: {url: html}) y cómo sus documentos
+se convierten al esquema común del listado: en qué fragmentos se cortan (la
+unidad de la caché), qué campos crudos se extraen de cada uno y cómo se
+normalizan a parseo.COLUMNAS_NORMALIZADAS. parseo.parsear e ingesta trabajan con
+cualquier fuente registrada en parseo.FUENTES; los archivos HTML guardados de
+una fuente se leen con su mismo adaptador.
+
+El portal del Órgano Judicial es parseo.Thor, junto a la extracción que adapta.
+Para agregar una fuente: una subclase de Fuente en un módulo que se importe al
+arrancar, registrada en parseo.FUENTES con su nombre. Los procesos de ingesta la
+buscan por nombre, así que tiene que estar registrada también en ellos.
+"""
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+
+class Fuente(ABC):
+    """Interfaz de un adaptador. Las subclases implementan rastrear, extraer y normalizar."""
+
+    nombre = None
+    columnas_crudas = None  # nombres de lo que devuelve extraer(), en orden
+
+    @abstractmethod
+    def rastrear(self, url: str = None, **opciones) -> dict:
+        """{url: html} de todas las páginas del listado, en orden."""
+
+    def dividir(self, html: str) -> list:
+        """Fragmentos del documento; cada uno se extrae y se cachea por separado."""
+        return [html]
+
+    @abstractmethod
+    def extraer(self, fragmento: str, parser: str = None):
+        """Tuplas de textos crudos (columnas_crudas), una por remate del fragmento."""
+
+    @abstractmethod
+    def normalizar(self, crudo: pd.DataFrame) -> pd.DataFrame:
+        """Campos crudos -> DataFrame con parseo.COLUMNAS_NORMALIZADAS."""
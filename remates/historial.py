@@ -0,0 +1,224 @@
+"""Historial del listado: resúmenes (rollups) diarios que se mantienen en cada refresco.
+
+Almacen.guardar llama a actualizar() dentro de la misma transacción, con lo que
+ya calculó del refresco. Nada se vuelve a leer del listado crudo:
+
+- resumen_diario (día x ciudad x rebaja x tipo de inmueble): la foto del día
+  (remates vigentes y suma de sus valores en Bs, reemplazada en cada refresco
+  del día) y los eventos, que se suman: nuevos, retirados del portal con sus
+  días publicados, y los que pasaron de 0 % a 20 % de rebaja.
+- valor_juzgado (día x juzgado x cubeta): histograma del valor en Bs de los
+  vigentes, en cubetas logarítmicas, para estimar la mediana por juzgado.
+- cambios_rebaja: cada cambio de rebaja de un remate, con el momento.
+
+Los gráficos de meses de historial se arman con Historial, que solo lee estas
+tablas chicas. El historial empieza con el primer refresco guardado.
+"""
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from remates.consultas import TIPO_CAMBIO_USD
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    dia TEXT NOT NULL,
+    ciudad TEXT NOT NULL,
+    rebaja INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    vigentes INTEGER NOT NULL DEFAULT 0,
+    valor_suma REAL NOT NULL DEFAULT 0,
+    valor_n INTEGER NOT NULL DEFAULT 0,
+    nuevos INTEGER NOT NULL DEFAULT 0,
+    retirados INTEGER NOT NULL DEFAULT 0,
+    dias_publicados REAL NOT NULL DEFAULT 0,
+    rebajados INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, ciudad, rebaja, tipo)
+);
+CREATE TABLE IF NOT EXISTS valor_juzgado (
+    dia TEXT NOT NULL,
+    juzgado TEXT NOT NULL,
+    cubeta INTEGER NOT NULL,
+    remates INTEGER NOT NULL,
+    PRIMARY KEY (dia, juzgado, cubeta)
+);
+CREATE TABLE IF NOT EXISTS cambios_rebaja (
+    proceso TEXT,
+    juzgado TEXT,
+    ocurrencia INTEGER,
+    momento REAL NOT NULL,
+    antes INTEGER,
+    despues INTEGER
+);
+CREATE INDEX IF NOT EXISTS cambios_rebaja_momento ON cambios_rebaja (momento);
+"""
+
+GRUPO = ['ciudad', 'rebaja', 'tipo']
+EVENTOS = ('nuevos', 'retirados', 'dias_publicados', 'rebajados')
+CUBETAS_POR_DECADA = 20  # ~12 % de ancho: la mediana estimada queda a ±6 % de la real
+SEGUNDOS_POR_DIA = 86_400
+
+
+def dia_de(momento: float) -> str:
+    return time.strftime('%Y-%m-%d', time.localtime(momento))
+
+
+def valor_bs(valor, moneda) -> np.ndarray:
+    """Valores en Bs (los montos en dólares se convierten), NaN si no hay valor."""
+    valor = pd.to_numeric(pd.Series(valor, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return valor * np.where(pd.Series(moneda, dtype=object).to_numpy() == 'USD', TIPO_CAMBIO_USD, 1.0)
+
+
+def _grupo(ciudad, rebaja, tipo) -> tuple:
+    # Sin ciudad o sin tipo: '' (en la clave primaria NULL nunca choca y el upsert no sumaría)
+    return ciudad or '', int(rebaja), tipo or ''
+
+
+def actualizar(con: sqlite3.Connection, momento: float, filas: pd.DataFrame, nuevos: list,
+               rebajas: list, retirados: list):
+    """Suma un refresco a los resúmenes del día de `momento`.
+
+    `filas` son las filas vigentes (almacen.a_filas), `nuevos` los registros insertados,
+    `rebajas` tuplas (registro, antes, después) y `retirados` tuplas
+    (ciudad, rebaja, tipo, visto_primero) de los que salieron del portal.
+    """
+    dia = dia_de(momento)
+
+    # Foto del día: se reemplaza entera (un grupo que se vació queda en 0)
+    con.execute("UPDATE resumen_diario SET vigentes = 0, valor_suma = 0, valor_n = 0 WHERE dia = ?", (dia,))
+    vigentes = pd.DataFrame({
+        'ciudad': filas['ciudad'].fillna(''),
+        'rebaja': filas['rebaja'].astype(int),
+        'tipo': filas['tipo'].fillna(''),
+        'valor': valor_bs(filas['valor'], filas['moneda']),
+        'juzgado': filas['juzgado'].fillna(''),
+    })
+    foto = vigentes.groupby(GRUPO, sort=False)['valor'].agg(['size', 'sum', 'count'])
+    con.executemany(
+        "INSERT INTO resumen_diario (dia, ciudad, rebaja, tipo, vigentes, valor_suma, valor_n) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (dia, ciudad, rebaja, tipo) DO UPDATE SET "
+        "vigentes = excluded.vigentes, valor_suma = excluded.valor_suma, valor_n = excluded.valor_n",
+        [(dia, c, int(r), t, int(n), float(s), int(k)) for (c, r, t), (n, s, k) in foto.iterrows()],
+    )
+    con.execute("DELETE FROM valor_juzgado WHERE dia = ?", (dia,))
+    con_valor = vigentes[vigentes['valor'] > 0]
+    cubetas = np.floor(np.log10(con_valor['valor']) * CUBETAS_POR_DECADA).astype(int)
+    histograma = con_valor.groupby([con_valor['juzgado'], cubetas.rename('cubeta')]).size()
+    con.executemany(
+        "INSERT INTO valor_juzgado (dia, juzgado, cubeta, remates) VALUES (?, ?, ?, ?)",
+        [(dia, j, int(c), int(n)) for (j, c), n in histograma.items()],
+    )
+
+    # Eventos del refresco: se suman a los del mismo día
+    eventos = {evento: Counter() for evento in EVENTOS}
+    for registro in nuevos:
+        eventos['nuevos'][_grupo(registro['ciudad'], registro['rebaja'], registro['tipo'])] += 1
+    for ciudad, rebaja, tipo, visto_primero in retirados:
+        grupo = _grupo(ciudad, rebaja, tipo)
+        eventos['retirados'][grupo] += 1
+        eventos['dias_publicados'][grupo] += (momento - visto_primero) / SEGUNDOS_POR_DIA
+    for registro, antes, despues in rebajas:
+        if despues > antes:
+            eventos['rebajados'][_grupo(registro['ciudad'], despues, registro['tipo'])] += 1
+    for evento, conteo in eventos.items():
+        con.executemany(
+            f"INSERT INTO resumen_diario (dia, ciudad, rebaja, tipo, {evento}) VALUES (?, ?, ?, ?, ?) "
+            f"ON CONFLICT (dia, ciudad, rebaja, tipo) DO UPDATE SET {evento} = {evento} + excluded.{evento}",
+            [(dia, *grupo, valor) for grupo, valor in conteo.items()],
+        )
+    con.executemany(
+        "INSERT INTO cambios_rebaja (proceso, juzgado, ocurrencia, momento, antes, despues) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(r['proceso'], r['juzgado'], r['ocurrencia'], momento, antes, despues) for r, antes, despues in rebajas],
+    )
+
+
+def mediana_histograma(cubetas: np.ndarray, remates: np.ndarray) -> float:
+    """Mediana aproximada: se interpola (en escala log) dentro de la cubeta donde cae la mitad."""
+    orden = np.argsort(cubetas)
+    cubetas, acumulado = cubetas[orden], np.cumsum(remates[orden])
+    mitad = acumulado[-1] / 2
+    i = np.searchsorted(acumulado, mitad)
+    previos = acumulado[i - 1] if i else 0
+    fraccion = (mitad - previos) / (acumulado[i] - previos)
+    return 10 ** ((cubetas[i] + fraccion) / CUBETAS_POR_DECADA)
+
+
+class Historial:
+    """Lectura de los resúmenes. Abre una conexión por operación (seguro entre hilos)."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with closing(self._conectar()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def resumen(self, desde: str = None, ciudad: str = None) -> pd.DataFrame:
+        """Filas de resumen_diario (dia como fecha), opcionalmente desde un día y de una ciudad."""
+        condiciones, parametros = [], []
+        if desde:
+            condiciones.append("dia >= ?")
+            parametros.append(desde)
+        if ciudad is not None:
+            condiciones.append("ciudad = ?")
+            parametros.append(ciudad)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with closing(self._conectar()) as con:
+            df = pd.read_sql_query(f"SELECT * FROM resumen_diario {donde} ORDER BY dia", con, params=parametros)
+        df['dia'] = pd.to_datetime(df['dia'], format='%Y-%m-%d')
+        return df
+
+    def medianas_juzgado(self, desde: str = None, frecuencia: str = 'MS') -> pd.DataFrame:
+        """Mediana estimada del valor (Bs) por juzgado y período, con los remates-día que la sostienen.
+
+        Cada día un remate vigente cuenta una vez: la mediana de un mes pondera por días publicados.
+        """
+        with closing(self._conectar()) as con:
+            df = pd.read_sql_query(
+                "SELECT dia, juzgado, cubeta, remates FROM valor_juzgado WHERE dia >= ?",
+                con, params=(desde or '',),
+            )
+        columnas = ['periodo', 'juzgado', 'mediana', 'remates']
+        if df.empty:
+            return pd.DataFrame(columns=columnas)
+        df['periodo'] = pd.to_datetime(df['dia'], format='%Y-%m-%d').dt.to_period(frecuencia[0]).dt.start_time
+        filas = [
+            (periodo, juzgado, mediana_histograma(g['cubeta'].to_numpy(), g['remates'].to_numpy()),
+             int(g['remates'].sum()))
+            for (periodo, juzgado), g in df.groupby(['periodo', 'juzgado'], sort=True)
+        ]
+        return pd.DataFrame(filas, columns=columnas)
+
+    def cambios_de_rebaja(self, desde: float = None, limite: int = 200) -> pd.DataFrame:
+        """Últimos cambios de rebaja, con los datos actuales del remate."""
+        with closing(self._conectar()) as con:
+            df = pd.read_sql_query(
+                "SELECT c.momento, c.antes, c.despues, c.proceso, c.juzgado, r.ciudad, r.tipo, "
+                "r.descripcion, r.valor_texto FROM cambios_rebaja c LEFT JOIN remates r "
+                "ON r.proceso = c.proceso AND r.juzgado = c.juzgado AND r.ocurrencia = c.ocurrencia "
+                "WHERE c.momento >= ? ORDER BY c.momento DESC LIMIT ?",
+                con, params=(desde or 0, limite),
+            )
+        df['momento'] = [datetime.fromtimestamp(m) for m in df['momento']]  # hora local, como la app
+        return df
+
+
+def permanencia(resumen: pd.DataFrame, por: str = 'ciudad') -> pd.DataFrame:
+    """Días promedio publicados de los remates que salieron del portal, por `por`."""
+    g = resumen.groupby(por, sort=True)[['retirados', 'dias_publicados']].sum()
+    g = g[g['retirados'] > 0]
+    return g.assign(dias_promedio=g['dias_publicados'] / g['retirados'])[['retirados', 'dias_promedio']]
+
+
+def valor_promedio(resumen: pd.DataFrame, por: str = 'rebaja') -> pd.DataFrame:
+    """Valor promedio (Bs) de los vigentes por día y `por` (una columna por valor)."""
+    g = resumen.groupby(['dia', por])[['valor_suma', 'valor_n']].sum()
+    return (g['valor_suma'] / g['valor_n'].where(g['valor_n'] > 0)).unstack(por)
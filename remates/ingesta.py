@@ -0,0 +1,94 @@
+"""Ingesta en paralelo de muchos documentos HTML (p. ej. un archivo de páginas guardadas).
+
+Parsear es trabajo de CPU (lxml y pandas) y con hilos el GIL lo deja en un solo
+núcleo: cada documento se parsea en un proceso de un ProcessPoolExecutor, con el
+adaptador de su fuente (parseo.FUENTES) y una caché de fragmentos propia de ese
+proceso. Los resultados se unen en el proceso que llama, en el orden de los
+documentos y sin remates repetidos (parseo.unir). Los archivos se leen en el
+proceso que los parsea: al pool solo viajan las rutas.
+
+Un documento que no se puede leer o parsear se loguea y se omite, como una página
+que falla al rastrear.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from remates import fragmentos, metricas, parseo
+
+log = logging.getLogger(__name__)
+
+EXTENSIONES = ('.html', '.htm')
+DOCUMENTOS_POR_TAREA = 4  # por proceso: cada tarea del pool lleva varios documentos
+
+# Por proceso trabajador: nombre de la fuente -> caché de fragmentos
+_caches = {}
+
+
+def expandir(rutas) -> list:
+    """Archivos a ingerir: los directorios se recorren buscando .html/.htm (ordenados).
+
+    FileNotFoundError si alguna ruta no existe.
+    """
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            encontrados = [os.path.join(raiz, nombre) for raiz, _, nombres in os.walk(ruta)
+                           for nombre in nombres if nombre.lower().endswith(EXTENSIONES)]
+            archivos.extend(sorted(encontrados))
+        elif os.path.exists(ruta):
+            archivos.append(ruta)
+        else:
+            raise FileNotFoundError(f"no existe {ruta}")
+    return archivos
+
+
+def _parsear(fuente: str, parser: str, documento: str, es_ruta: bool = False) -> tuple:
+    """(DataFrame, None) o (None, error). Corre en el proceso trabajador."""
+    try:
+        if es_ruta:
+            with open(documento, encoding='utf-8', errors='replace') as f:
+                documento = f.read()
+        cache = _caches.setdefault(fuente, fragmentos.CacheLRU())
+        return parseo.parsear(documento, parser, cache, fuente=parseo.FUENTES[fuente]), None
+    except Exception as e:  # un documento roto no frena al resto
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _ingerir(documentos: list, es_ruta: bool, fuente: str, parser: str, procesos: int) -> pd.DataFrame:
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(documentos)))
+    tarea = partial(_parsear, fuente, parser, es_ruta=es_ruta)
+    if procesos == 1:
+        # Un documento (o un núcleo): arrancar procesos cuesta más de lo que ahorra
+        resultados = list(map(tarea, documentos))
+    else:
+        por_tarea = max(1, min(DOCUMENTOS_POR_TAREA, len(documentos) // procesos))
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(tarea, documentos, chunksize=por_tarea))
+
+    partes = []
+    for i, (df, error) in enumerate(resultados):
+        if error is not None:
+            log.warning("No se pudo ingerir %s: %s", documentos[i] if es_ruta else f"el documento {i + 1}", error)
+            metricas.REGISTRO.contar("ingesta_documentos", estado='error')
+            continue
+        metricas.REGISTRO.contar("ingesta_documentos", estado='ok')
+        partes.append(df)
+    log.info("Ingesta (%s, %d procesos): %d de %d documentos", fuente, procesos, len(partes), len(documentos))
+    return parseo.unir(partes)
+
+
+def ingerir_archivos(rutas, fuente: str = parseo.FUENTE_POR_DEFECTO, parser: str = parseo.PARSER_POR_DEFECTO,
+                     procesos: int = None) -> pd.DataFrame:
+    """Inventario de los archivos HTML (o directorios) de `rutas`, parseados en `procesos`
+    procesos (por defecto, uno por núcleo)."""
+    return _ingerir(expandir(rutas), True, fuente, parser, procesos)
+
+
+def ingerir_paginas(paginas, fuente: str = parseo.FUENTE_POR_DEFECTO, parser: str = parseo.PARSER_POR_DEFECTO,
+                    procesos: int = None) -> pd.DataFrame:
+    """Inventario de documentos HTML ya en memoria (p. ej. los de Fuente.rastrear)."""
+    return _ingerir(list(paginas), False, fuente, parser, procesos)
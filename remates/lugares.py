@@ -0,0 +1,135 @@
+"""Nomenclátor de Bolivia: de la Ubicación de un remate a departamento, provincia y municipio.
+
+Los municipios, con su provincia y su departamento, vienen en lugares.csv, junto
+al módulo (no hace falta conexión). Los nombres se comparan plegados (sin acentos
+ni mayúsculas, como el buscador) y palabra por palabra contra un trie: cada
+posición del texto se recorre una vez y gana la coincidencia más larga ('Santa
+Cruz de la Sierra' antes que 'Santa Cruz').
+
+Las direcciones terminan en la ciudad, así que manda la última coincidencia. Un
+nombre justo después de 'Calle', 'Av.', 'Zona', 'esq.'... es una calle o un barrio
+y no cuenta. El departamento escrito en el texto desempata los municipios con
+nombres repetidos (San Javier, San Ramón, El Puente...). Cada texto distinto se
+resuelve una sola vez (caché LRU).
+"""
+import csv
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from remates.busqueda import terminos
+
+Lugar = namedtuple('Lugar', ['departamento', 'provincia', 'municipio'])
+SIN_LUGAR = Lugar(None, None, None)
+
+RUTA_NOMENCLATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lugares.csv')
+
+# Abreviaturas de uso común
+OTROS_NOMBRES_DEPARTAMENTO = {'Cochabamba': ['Cbba'], 'Santa Cruz': ['Scz'], 'La Paz': ['Lpz']}
+
+# Palabras (plegadas) que, justo antes de un nombre, lo vuelven calle, barrio o edificio
+VIAS = {
+    'calle', 'c', 'av', 'avenida', 'pasaje', 'pje', 'plaza', 'plazuela', 'zona', 'barrio', 'b', 'urb',
+    'urbanizacion', 'villa', 'edificio', 'edif', 'condominio', 'mercado', 'parque', 'colegio',
+    'prolongacion', 'esq', 'esquina', 'entre', 'y',
+}
+
+MAX_CACHE = 50_000
+
+
+class Nomenclator:
+    """Trie de palabras plegadas -> lugares que se llaman así (uno por nivel y homónimo)."""
+
+    def __init__(self, filas):
+        self.trie = {}
+        self.departamentos = set()
+        for departamento, provincia, municipio, otros in filas:
+            self.departamentos.add(departamento)
+            self._agregar(provincia, Lugar(departamento, provincia, None))
+            for nombre in [municipio] + [o for o in otros.split('|') if o]:
+                self._agregar(nombre, Lugar(departamento, provincia, municipio))
+        for departamento in self.departamentos:
+            for nombre in [departamento] + OTROS_NOMBRES_DEPARTAMENTO.get(departamento, []):
+                self._agregar(nombre, Lugar(departamento, None, None))
+
+    @classmethod
+    def desde_csv(cls, ruta: str = RUTA_NOMENCLATOR) -> 'Nomenclator':
+        with open(ruta, encoding='utf-8', newline='') as f:
+            lector = csv.reader(f)
+            next(lector)  # encabezado
+            return cls(lector)
+
+    def _agregar(self, nombre: str, lugar: Lugar):
+        nodo = self.trie
+        for palabra in terminos(nombre):
+            nodo = nodo.setdefault(palabra, {})
+        lugares = nodo.setdefault(None, [])  # None: acá termina un nombre
+        if lugar not in lugares:
+            lugares.append(lugar)
+
+    def coincidencias(self, palabras: list) -> list:
+        """Lugares nombrados en el texto, en orden: la coincidencia más larga en cada posición."""
+        encontradas, i = [], 0
+        while i < len(palabras):
+            nodo, fin, lugares = self.trie, i, None
+            for j in range(i, len(palabras)):
+                nodo = nodo.get(palabras[j])
+                if nodo is None:
+                    break
+                if None in nodo:
+                    fin, lugares = j + 1, nodo[None]
+            if lugares is None:
+                i += 1
+                continue
+            if not i or palabras[i - 1] not in VIAS:
+                encontradas.append(lugares)
+            i = fin
+        return encontradas
+
+    def resolver(self, texto: str) -> Lugar:
+        """El lugar más específico que nombra el texto (SIN_LUGAR si no nombra ninguno)."""
+        encontradas = self.coincidencias(terminos(texto))
+        if not encontradas:
+            return SIN_LUGAR
+        nombrados = {lugar.departamento for lugares in encontradas for lugar in lugares if lugar.provincia is None}
+        municipios = [[lugar for lugar in lugares if lugar.municipio] for lugares in encontradas]
+        con_municipio = [i for i, m in enumerate(municipios) if m]
+        if not con_municipio:
+            # Sin municipio: la última provincia nombrada o, si no hay, el último departamento
+            provincias = [p for p in ([lugar for lugar in lugares if lugar.provincia] for lugares in encontradas) if p]
+            return _unico(_del_departamento(provincias[-1] if provincias else encontradas[-1], nombrados))
+
+        ultimo = con_municipio[-1]
+        candidatos = municipios[ultimo]
+        if len(con_municipio) > 1 and any(lugar.provincia is None for lugar in encontradas[ultimo]):
+            # 'El Alto, La Paz': el último nombre es el departamento, no su capital
+            departamentos = {lugar.departamento for lugar in candidatos}
+            anteriores = [lugar for lugar in municipios[con_municipio[-2]] if lugar.departamento in departamentos]
+            candidatos = anteriores or candidatos
+        return _unico(_del_departamento(candidatos, nombrados))
+
+
+def _del_departamento(candidatos: list, departamentos: set) -> list:
+    """Entre homónimos, los de algún departamento nombrado en el texto (si hay)."""
+    return [lugar for lugar in candidatos if lugar.departamento in departamentos] or candidatos
+
+
+def _unico(candidatos: list) -> Lugar:
+    """Un lugar si no hay dudas; con homónimos, solo lo que tienen en común."""
+    if len(candidatos) == 1:
+        return candidatos[0]
+    return Lugar(*(valores.pop() if len(valores) == 1 else None for valores in map(set, zip(*candidatos))))
+
+
+@lru_cache(maxsize=1)
+def nomenclator() -> Nomenclator:
+    """El nomenclátor incluido (se lee una vez, al primer uso)."""
+    return Nomenclator.desde_csv()
+
+
+@lru_cache(maxsize=MAX_CACHE)
+def resolver(ubicacion: str) -> Lugar:
+    """Lugar de una Ubicación del listado, memoizado por texto."""
+    if not isinstance(ubicacion, str):
+        return SIN_LUGAR
+    return nomenclator().resolver(ubicacion)
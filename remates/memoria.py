@@ -0,0 +1,66 @@
+"""Reporte de memoria del listado: representación compacta contra la original.
+
+La original guardaba todo como texto: el ícono de urgencia en una columna, la
+fecha tres veces (texto, dd/mm/aaaa y datetime), juzgado, ciudad y tipo
+repetidos como str y la rebaja como '20%'; y cada sesión tenía su propia copia
+del listado, del filtrado y de cada pestaña. La compacta se arma una vez, se
+comparte entre sesiones y cada sesión solo arma la tabla de la pestaña visible.
+"""
+import pandas as pd
+
+from remates import parseo
+
+
+def como_original(df: pd.DataFrame) -> pd.DataFrame:
+    """El mismo listado (con DiasRestantes) como lo armaba la original: sus columnas y el
+    dtype que pandas infiere para listas de textos, como hacía pd.DataFrame(data)."""
+    columnas = {'': parseo.icono_urgencia(df['DiasRestantes'])}
+    columnas.update({c: df[c] for c in parseo.COLUMNAS_VISIBLES})
+    columnas['Rebaja'] = df['Rebaja'].astype(str) + '%'
+    columnas['FechaFormateada'] = df['FechaDate'].dt.strftime('%d/%m/%Y')
+    # La ciudad era lo último de la Ubicación, después de '-' o ','
+    columnas['Ciudad'] = df['Ubicación'].str.split('-').str[-1].str.split(',').str[-1].str.strip()
+    original = pd.DataFrame({c: serie.tolist() for c, serie in columnas.items()})
+    original.insert(original.columns.get_loc('Ciudad'), 'FechaDate', df['FechaDate'].to_numpy())
+    return original
+
+
+def bytes_de(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def reporte(df: pd.DataFrame):
+    """(bytes por columna, bytes compartidos y por sesión), antes y después.
+
+    Por sesión se toma el peor caso, sin filtros: antes, la copia del listado que
+    devolvía st.cache_data, df_filtered y la copia de cada una de las tres pestañas;
+    después, solo la tabla de la pestaña "Todos los remates".
+    """
+    original = como_original(df)
+    por_columna = pd.DataFrame({
+        'antes': original.memory_usage(deep=True, index=False),
+        'después': df.memory_usage(deep=True, index=False),
+    }).fillna(0).astype('int64').rename(index={'': '(ícono)'})
+    por_columna.loc['TOTAL'] = por_columna.sum()
+
+    rebaja = df['Rebaja'].to_numpy()
+    tabla = parseo.tabla_listado(df)
+    por_sesion = pd.DataFrame({
+        'antes': [0, 3 * bytes_de(original) + bytes_de(original[rebaja == 0]) + bytes_de(original[rebaja == 20])],
+        'después': [bytes_de(df), bytes_de(tabla)],
+    }, index=['compartido (una vez por proceso)', 'por sesión'])
+    return por_columna, por_sesion
+
+
+def formatear(por_columna: pd.DataFrame, por_sesion: pd.DataFrame, n: int) -> str:
+    def mb(b):
+        return f"{b / 2**20:,.2f} MB"
+
+    columnas = por_columna.map(mb)
+    columnas['ahorro'] = (1 - por_columna['después'] / por_columna['antes'].where(por_columna['antes'] > 0)) \
+        .map(lambda x: '' if pd.isna(x) else f"{x:.0%}")
+    return (
+        f"Memoria del listado ({n:,} remates)\n\n"
+        f"{columnas.to_string()}\n\n"
+        f"{por_sesion.map(mb).to_string()}\n"
+    )
@@ -0,0 +1,208 @@
+"""Tiempos por etapa del pipeline, aciertos de caché y su exportación.
+
+Cada rerun de la app (o pedido a la API) arma una Medicion con el tiempo de cada
+etapa y sus datos (filas, bytes), y los aciertos y fallos de las cachés. Las
+mediciones se acumulan en REGISTRO, que se expone como texto de Prometheus
+(`servir_en_segundo_plano` o /metrics de la API) y, si se pide, se escriben en
+el log como una línea JSON por rerun (REMATES_METRICAS=log).
+
+Sin medir se usa NULA: cada etapa es el mismo context manager vacío, así que el
+costo en la app es el de un `with`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+TIPO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+# REMATES_METRICAS=log: cada medición publicada se escribe en el log como una línea JSON
+LOG_JSON = os.environ.get('REMATES_METRICAS', '').lower() == 'log'
+
+
+class Medicion:
+    """Etapas de un rerun: (nombre, segundos, datos) en el orden en que terminaron."""
+
+    activa = True
+
+    def __init__(self, origen: str = 'app'):
+        self.origen = origen
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self.caches = {}  # nombre -> [aciertos, fallos]
+        self.datos = {}
+
+    @contextmanager
+    def etapa(self, nombre: str, cache: str = None):
+        """Mide el bloque. Lo que se anote en el dict cedido (filas, bytes) queda con la etapa.
+
+        Con `cache` (una función cacheada): si adentro no se llamó a fallo(cache), fue un acierto.
+        """
+        datos = {}
+        fallos = self.caches.get(cache, [0, 0])[1]
+        inicio = time.perf_counter()
+        try:
+            yield datos
+        finally:
+            self.etapas.append((nombre, time.perf_counter() - inicio, datos))
+            if cache is not None and self.caches.get(cache, [0, 0])[1] == fallos:
+                self.contar_cache(cache, aciertos=1)
+
+    def fallo(self, cache: str):
+        self.contar_cache(cache, fallos=1)
+
+    def contar_cache(self, cache: str, aciertos: int = 0, fallos: int = 0):
+        contador = self.caches.setdefault(cache, [0, 0])
+        contador[0] += aciertos
+        contador[1] += fallos
+
+    def anotar(self, **datos):
+        self.datos.update(datos)
+
+    def total(self) -> float:
+        return time.perf_counter() - self.inicio
+
+    def resumen(self) -> list:
+        """Una fila por etapa (las repetidas, p. ej. una por página, se suman)."""
+        filas = {}
+        for nombre, segundos, datos in self.etapas:
+            fila = filas.setdefault(nombre, {'etapa': nombre, 'veces': 0, 'ms': 0.0})
+            fila['veces'] += 1
+            fila['ms'] += segundos * 1000
+            for clave, valor in datos.items():
+                fila[clave] = fila.get(clave, 0) + valor if isinstance(valor, (int, float)) else valor
+        return list(filas.values())
+
+    def como_dict(self) -> dict:
+        return {
+            'origen': self.origen,
+            'total_ms': round(self.total() * 1000, 2),
+            'etapas': [{**f, 'ms': round(f['ms'], 2)} for f in self.resumen()],
+            'caches': {k: {'aciertos': a, 'fallos': f} for k, (a, f) in self.caches.items()},
+            **self.datos,
+        }
+
+
+class _MedicionNula:
+    """Medicion que no mide: la que se usa con el diagnóstico apagado."""
+
+    activa = False
+    _vacia = nullcontext({})
+
+    def etapa(self, nombre: str, cache: str = None):
+        return self._vacia
+
+    def fallo(self, cache: str):
+        pass
+
+    def contar_cache(self, cache: str, aciertos: int = 0, fallos: int = 0):
+        pass
+
+    def anotar(self, **datos):
+        pass
+
+
+NULA = _MedicionNula()
+
+
+def _etiquetas(pares) -> str:
+    texto = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for k, v in pares)
+    return '{' + texto + '}' if texto else ''
+
+
+class Registro:
+    """Acumulado de todas las mediciones y contadores del proceso (seguro entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etapas = {}  # (origen, etapa) -> [cuenta, segundos, máximo]
+        self._contadores = {}  # (nombre, etiquetas ordenadas) -> valor
+
+    def registrar(self, medicion: Medicion):
+        total = medicion.total()
+        with self._lock:
+            for nombre, segundos, _ in [*medicion.etapas, ('total', total, None)]:
+                acumulado = self._etapas.setdefault((medicion.origen, nombre), [0, 0.0, 0.0])
+                acumulado[0] += 1
+                acumulado[1] += segundos
+                acumulado[2] = max(acumulado[2], segundos)
+        for cache, (aciertos, fallos) in medicion.caches.items():
+            self.contar('cache', aciertos, cache=cache, resultado='acierto')
+            self.contar('cache', fallos, cache=cache, resultado='fallo')
+
+    def contar(self, nombre: str, valor: float = 1, **etiquetas):
+        if not valor:
+            return
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def contador(self, nombre: str, **etiquetas) -> float:
+        with self._lock:
+            return self._contadores.get((nombre, tuple(sorted(etiquetas.items()))), 0)
+
+    def prometheus(self) -> str:
+        """Formato de texto de Prometheus (0.0.4)."""
+        with self._lock:
+            etapas = sorted(self._etapas.items())
+            contadores = sorted(self._contadores.items())
+        lineas = [
+            '# HELP remates_etapa_segundos Tiempo por etapa del pipeline (por rerun o pedido).',
+            '# TYPE remates_etapa_segundos summary',
+        ]
+        for (origen, etapa), (cuenta, segundos, _) in etapas:
+            e = _etiquetas([('origen', origen), ('etapa', etapa)])
+            lineas += [f'remates_etapa_segundos_sum{e} {segundos:.6f}', f'remates_etapa_segundos_count{e} {cuenta}']
+        lineas += ['# HELP remates_etapa_segundos_max Máximo por etapa desde que arrancó el proceso.',
+                   '# TYPE remates_etapa_segundos_max gauge']
+        lineas += [f'remates_etapa_segundos_max{_etiquetas([("origen", o), ("etapa", e)])} {maximo:.6f}'
+                   for (o, e), (_, _, maximo) in etapas]
+        tipos = set()
+        for (nombre, pares), valor in contadores:
+            if nombre not in tipos:
+                tipos.add(nombre)
+                lineas.append(f'# TYPE remates_{nombre}_total counter')
+            lineas.append(f'remates_{nombre}_total{_etiquetas(pares)} {valor:g}')
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+
+
+def publicar(medicion):
+    """Suma la medición a REGISTRO y, con REMATES_METRICAS=log, la escribe en el log."""
+    if not medicion.activa:
+        return
+    REGISTRO.registrar(medicion)
+    if LOG_JSON:
+        log.info(json.dumps(medicion.como_dict(), ensure_ascii=False))
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        datos = REGISTRO.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_PROMETHEUS)
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def servir_en_segundo_plano(puerto: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Expone REGISTRO en http://host:puerto/metrics desde un hilo daemon."""
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='metricas-remates', daemon=True).start()
+    log.info("Métricas en http://%s:%d/metrics", host, servidor.server_port)
+    return servidor
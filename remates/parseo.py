@@ -0,0 +1,321 @@
+"""Del HTML del listado al DataFrame de remates (sin dependencia de Streamlit).
+
+Dos etapas: la extracción saca de cada <li class="clearfix"> los textos crudos
+de sus campos (con lxml si está instalado, si no con BeautifulSoup) y la
+normalización los limpia y tipa por columnas. Las dos son las del portal (thor)
+y Thor las expone como adaptador (remates.fuentes); otras fuentes traen las suyas
+en su propio adaptador y se registran en FUENTES. `parsear` une las dos etapas
+de una fuente y reutiliza, si se le pasa una caché, los remates ya normalizados
+de fragmentos conocidos.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import lxml.html  # Parser rápido (opcional): si no está, se usa BeautifulSoup
+except ImportError:
+    lxml = None
+
+from remates import fragmentos, fuentes, lugares, metricas
+
+log = logging.getLogger(__name__)
+
+# ----- EXTRACCIÓN DE CAMPOS (backends intercambiables) -----
+# Cada backend recorre los <li class="clearfix"> del listado y entrega, por remate,
+# los textos crudos de: tipo, valor, fecha, juzgado, ubicación y descripción/N° proceso.
+CAMPOS_REMATE = (
+    ('strong', 'primary-font'),
+    ('i', 'fa-money'),
+    ('small', 'pull-right'),
+    ('i', 'fa-university'),
+    ('i', 'fa-map-marker'),
+    ('i', 'fa-server'),
+)
+
+
+def campos_bs4(html: str):
+    """Backend de respaldo: BeautifulSoup con html.parser (puro Python)."""
+    from bs4 import BeautifulSoup  # se importa al usarlo: no pesa en el arranque del CLI
+    soup = BeautifulSoup(html, 'html.parser')
+    for remate in soup.find_all('li', class_='clearfix'):
+        yield tuple(remate.find(tag, class_=clase).text for tag, clase in CAMPOS_REMATE)
+
+
+_POSICION_CAMPO = {campo: pos for pos, campo in enumerate(CAMPOS_REMATE)}
+
+
+def campos_lxml(html: str):
+    """Backend rápido: árbol lxml (en C) y una sola pasada por cada <li> del listado."""
+    arbol = lxml.html.fromstring(html)
+    for remate in arbol.iter('li'):
+        if 'clearfix' not in (remate.get('class') or '').split():
+            continue
+        campos = [None] * len(CAMPOS_REMATE)
+        pendientes = len(CAMPOS_REMATE)
+        for el in remate.iter('strong', 'i', 'small'):
+            for clase in (el.get('class') or '').split():
+                pos = _POSICION_CAMPO.get((el.tag, clase))
+                # Igual que find(): gana la primera coincidencia en orden de documento
+                if pos is not None and campos[pos] is None:
+                    campos[pos] = el.text_content()
+                    pendientes -= 1
+            if not pendientes:
+                break
+        if pendientes:
+            faltantes = [CAMPOS_REMATE[i] for i, c in enumerate(campos) if c is None]
+            raise AttributeError(f"Remate sin los campos {faltantes}")
+        yield tuple(campos)
+
+
+PARSERS = {'bs4': campos_bs4}
+if lxml is not None:
+    PARSERS['lxml'] = campos_lxml
+
+# REMATES_PARSER permite forzar un backend (p. ej. 'bs4' para comparar salidas)
+PARSER_POR_DEFECTO = os.environ.get('REMATES_PARSER') or ('lxml' if 'lxml' in PARSERS else 'bs4')
+
+
+# ----- NORMALIZACIÓN (por columnas, sin bucles por fila) -----
+# Meses fijos en español: no depende de locale.setlocale ni del sistema.
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12,
+}
+
+COLUMNAS_CRUDAS = ['tipo', 'valor', 'fecha', 'juzgado', 'ubicacion', 'servidor']
+
+COLUMNAS_VISIBLES = [
+    'Tipo de Inmueble', 'Descripción', 'Valor Original del Inmueble', 'Fecha de Remate del Inmueble',
+    'Juzgado', 'Ubicación', 'Número de Proceso', 'Rebaja',
+]
+
+# Lugar de la Ubicación según el nomenclátor (remates.lugares): Ciudad es el municipio
+COLUMNAS_LUGAR = ['Departamento', 'Provincia', 'Ciudad']
+
+# Salida de normalizar_remates, en orden
+COLUMNAS_NORMALIZADAS = COLUMNAS_VISIBLES + ['FechaDate'] + COLUMNAS_LUGAR + ['Valor', 'Moneda']
+
+# Columnas de trabajo: se usan para filtrar/ordenar, no se muestran en tablas
+COLUMNAS_INTERNAS = ['FechaDate'] + COLUMNAS_LUGAR + ['Valor', 'Moneda', 'DiasRestantes']
+
+# Orden de las tablas de la app: Número de Proceso justo después de la fecha de remate
+COLUMNAS_TABLA = [
+    'Tipo de Inmueble', 'Descripción', 'Valor Original del Inmueble', 'Fecha de Remate del Inmueble',
+    'Número de Proceso', 'Juzgado', 'Ubicación', 'Rebaja',
+]
+
+# Textos que se repiten mucho entre remates: se guardan como categorías
+COLUMNAS_CATEGORICAS = ['Tipo de Inmueble', 'Fecha de Remate del Inmueble', 'Juzgado'] + COLUMNAS_LUGAR
+
+# Semáforo de urgencia: (días restantes como máximo, ícono). No se guarda en el
+# DataFrame; se arma al mostrar a partir de DiasRestantes.
+URGENCIA = ((2, '🟥'), (7, '🟨'), (14, '🟩'))
+ICONO_SIN_URGENCIA = '🟦'  # más de 2 semanas o sin fecha
+DIAS_URGENTE = 7  # rojo y amarillo
+
+
+def convertir_monto(texto: pd.Series) -> pd.Series:
+    """'1.250.000,50 Bs.' -> 1250000.5. El último '.' o ',' seguido de 1-2 dígitos es el decimal."""
+    numero = texto.str.extract(r'(\d[\d.,]*\d|\d)', expand=False)
+    partes = numero.str.extract(r'^(?P<entero>.*?)(?:[.,](?P<decimales>\d{1,2}))?$')
+    entero = partes['entero'].str.replace(r'[.,]', '', regex=True)
+    return pd.to_numeric(entero + '.' + partes['decimales'].fillna('0'), errors='coerce')
+
+
+def extraer_fecha(fecha: pd.Series) -> pd.Series:
+    """'Fecha de Remate: 5 de marzo de 2025 a horas ...' -> datetime (NaT si no se puede leer)."""
+    partes = fecha.str.extract(r'(\d{1,2}) de (\w+) de (\d{4})')
+    return pd.to_datetime(
+        pd.DataFrame({
+            'year': pd.to_numeric(partes[2]),
+            'month': partes[1].str.lower().map(MESES),
+            'day': pd.to_numeric(partes[0]),
+        }),
+        errors='coerce',
+    )
+
+
+def limpiar_valor(valor: pd.Series) -> pd.Series:
+    """'Valor Original: 150.000 Bs. Empoce: ...' -> '150.000 Bs.'"""
+    return valor.str.replace('Valor Original: ', '', regex=False).str.split('Empoce:').str[0].str.strip()
+
+
+def ubicar(ubicacion: pd.Series) -> pd.DataFrame:
+    """COLUMNAS_LUGAR de cada ubicación: 'Calle X - Zona Y, Sucre' -> Chuquisaca, Oropeza, Sucre.
+
+    Cada texto distinto se resuelve una vez (y lugares.resolver lo recuerda entre llamadas).
+    """
+    codigos, textos = pd.factorize(ubicacion)
+    # El código -1 (ubicación nula) toma el último: sin lugar
+    resueltos = np.array([lugares.resolver(t) for t in textos] + [lugares.SIN_LUGAR], dtype=object)
+    return pd.DataFrame(resueltos[codigos], columns=COLUMNAS_LUGAR, index=ubicacion.index)
+
+
+def normalizar_remates(crudo: pd.DataFrame) -> pd.DataFrame:
+    """Limpia y tipa los textos crudos del listado en bloque."""
+    servidor = crudo['servidor']
+    valor = crudo['valor'].str.strip()
+    fecha = crudo['fecha'].str.strip()
+    valor_txt = limpiar_valor(valor)
+    moneda = np.select(
+        [
+            valor_txt.str.contains(r'\$|\bsus\b|\busd\b', case=False, regex=True).to_numpy(dtype=bool),
+            valor_txt.str.contains(r'\bbs\b', case=False, regex=True).to_numpy(dtype=bool),
+        ],
+        ['USD', 'Bs'],
+        default=None,
+    )
+
+    juzgado = crudo['juzgado'].str.strip() \
+        .str.replace('Juzgado N° ', '', regex=False) \
+        .str.replace('Juzgado Público', '', regex=False).str.strip()
+    ubicacion = crudo['ubicacion'].str.strip()
+    lugar = ubicar(ubicacion)
+
+    return pd.DataFrame({
+        'Tipo de Inmueble': crudo['tipo'].str.strip().astype('category'),
+        'Descripción': servidor.str.strip().str.replace('Descripción:Tipo Inmueble ', '', regex=False),
+        'Valor Original del Inmueble': valor_txt,
+        'Fecha de Remate del Inmueble': fecha.astype('category'),
+        'Juzgado': juzgado.astype('category'),
+        'Ubicación': ubicacion,
+        'Número de Proceso': servidor.str.split('N° Proceso: ').str[-1].str.strip(),
+        'Rebaja': pd.to_numeric(valor.str.extract(r'Rebaja:\s*(\d+)', expand=False)).fillna(0).astype('int8'),
+        'FechaDate': extraer_fecha(fecha),
+        **{columna: lugar[columna].astype('category') for columna in COLUMNAS_LUGAR},
+        'Valor': convertir_monto(valor_txt),
+        'Moneda': pd.Categorical(moneda, categories=['Bs', 'USD']),
+    })
+
+
+def tipar_remates(df: pd.DataFrame) -> pd.DataFrame:
+    """Restaura los dtypes de normalizar_remates tras armar el DataFrame desde tuplas o al unir páginas."""
+    df['FechaDate'] = pd.to_datetime(df['FechaDate'])
+    df['Rebaja'] = df['Rebaja'].astype('int8')
+    df['Valor'] = df['Valor'].astype('float64')
+    for columna in COLUMNAS_CATEGORICAS:
+        df[columna] = df[columna].astype('category')
+    df['Moneda'] = pd.Categorical(df['Moneda'], categories=['Bs', 'USD'])
+    return df
+
+
+def calcular_urgencia(df: pd.DataFrame, ahora=None) -> pd.DataFrame:
+    """Agrega DiasRestantes (Int16, nulo si no hay fecha) según la fecha de remate."""
+    ahora = ahora or pd.Timestamp.now()
+    # Días completos desde ahora (como restar datetime.now()): NaN si no hay fecha
+    dias = (df['FechaDate'] - ahora).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    df['DiasRestantes'] = pd.array(np.where(np.isnan(dias), None, dias), dtype='Int16')
+    return df
+
+
+def icono_urgencia(dias: pd.Series) -> pd.Series:
+    """Ícono del semáforo para cada valor de DiasRestantes."""
+    valores = dias.to_numpy(dtype=float, na_value=np.nan)
+    return pd.Series(np.select(
+        [valores <= limite for limite, _ in URGENCIA],
+        [icono for _, icono in URGENCIA],
+        default=ICONO_SIN_URGENCIA,
+    ), index=dias.index, dtype=object)
+
+
+def es_urgente(dias: pd.Series) -> np.ndarray:
+    """Rojo o amarillo: a DIAS_URGENTE días o menos (los nulos no son urgentes)."""
+    return dias.to_numpy(dtype=float, na_value=np.nan) <= DIAS_URGENTE
+
+
+def fecha_corta(df: pd.DataFrame) -> pd.Series:
+    """dd/mm/aaaa de la fecha de remate; si no se pudo leer, el texto original."""
+    return df['FechaDate'].dt.strftime('%d/%m/%Y').astype(object).where(
+        df['FechaDate'].notna(), df['Fecha de Remate del Inmueble'].astype(object))
+
+
+def tabla_listado(df: pd.DataFrame) -> pd.DataFrame:
+    """Remates en el orden de COLUMNAS_TABLA, con el ícono de urgencia junto a la fecha."""
+    # assign devuelve un DataFrame nuevo sin tocar df (sin SettingWithCopyWarning en pandas 2);
+    # con copy-on-write las demás columnas se comparten y solo la fecha es nueva
+    return df[COLUMNAS_TABLA].assign(**{
+        'Fecha de Remate del Inmueble':
+            icono_urgencia(df['DiasRestantes']) + ' ' + df['Fecha de Remate del Inmueble'].astype(str),
+    })
+
+
+class Thor(fuentes.Fuente):
+    """El portal de remates del Órgano Judicial (thor.organojudicial.gob.bo)."""
+
+    nombre = 'thor'
+    columnas_crudas = COLUMNAS_CRUDAS
+
+    def rastrear(self, url: str = None, **opciones) -> dict:
+        from remates import crawler  # requests solo hace falta si se descarga
+
+        return crawler.rastrear(url or crawler.URL_PORTAL, **opciones)
+
+    def dividir(self, html: str) -> list:
+        return fragmentos.dividir(html)
+
+    def extraer(self, fragmento: str, parser: str = None):
+        return PARSERS[parser or PARSER_POR_DEFECTO](fragmento)
+
+    def normalizar(self, crudo: pd.DataFrame) -> pd.DataFrame:
+        return normalizar_remates(crudo)
+
+
+THOR = Thor()
+FUENTES = {THOR.nombre: THOR}
+FUENTE_POR_DEFECTO = THOR.nombre
+
+
+def parsear(html: str, parser: str = PARSER_POR_DEFECTO, cache: fragmentos.CacheLRU = None,
+            medicion=metricas.NULA, fuente: fuentes.Fuente = THOR) -> pd.DataFrame:
+    """Convierte el HTML de una página del listado en el DataFrame base de remates.
+
+    Los fragmentos, la extracción (con el backend `parser`) y la normalización son
+    los del adaptador `fuente`, por defecto el portal. Con `cache`, solo se extraen
+    y normalizan los fragmentos que no están en ella; cada fuente necesita la suya.
+    """
+    cache = cache if cache is not None else fragmentos.CacheLRU()
+    with medicion.etapa('parseo.fragmentos') as m:
+        trozos = fuente.dividir(html)
+        claves = [fragmentos.huella(t) for t in trozos]
+        registros = {clave: cache.get(clave) for clave in claves}
+        nuevos = {clave: t for clave, t in zip(claves, trozos) if registros[clave] is None}
+        m['fragmentos'] = len(trozos)
+    medicion.contar_cache('fragmentos', aciertos=len(claves) - len(nuevos), fallos=len(nuevos))
+
+    if nuevos:
+        # Un fragmento puede traer 0 o más remates: se normalizan todos juntos y se reparten
+        with medicion.etapa(f'parseo.extraccion_{parser}') as m:
+            campos = [list(fuente.extraer(t, parser)) for t in nuevos.values()]
+            m['filas'] = sum(map(len, campos))
+        with medicion.etapa('parseo.normalizacion'):
+            crudo = pd.DataFrame([c for cs in campos for c in cs], columns=fuente.columnas_crudas, dtype=object)
+            normalizados = list(fuente.normalizar(crudo)[COLUMNAS_NORMALIZADAS].itertuples(index=False, name=None))
+        inicio = 0
+        for clave, cs in zip(nuevos, campos):
+            registros[clave] = tuple(normalizados[inicio:inicio + len(cs)])
+            cache.put(clave, registros[clave])
+            inicio += len(cs)
+
+    log.info("Fragmentos: %d reutilizados, %d extraídos (%s)",
+             len(claves) - len(nuevos), len(nuevos), cache.estadisticas())
+    with medicion.etapa('parseo.armado') as m:
+        filas = [fila for clave in claves for fila in registros[clave]]
+        m['filas'] = len(filas)
+        return tipar_remates(pd.DataFrame.from_records(filas, columns=COLUMNAS_NORMALIZADAS))
+
+
+def unir(paginas: list) -> pd.DataFrame:
+    """Une los DataFrames de varias páginas en el inventario, sin remates repetidos."""
+    # Una página sin remates tiene columnas object: en el concat, el texto dejaría de ser str
+    paginas = [p for p in paginas if len(p)]
+    if not paginas:
+        return tipar_remates(pd.DataFrame(columns=COLUMNAS_NORMALIZADAS))
+    df = pd.concat(paginas, ignore_index=True)
+    # concat pierde el dtype category si las páginas tienen categorías distintas
+    df = tipar_remates(df)
+    # Las vistas por departamento repiten remates que ya salen en la paginación general
+    return df.drop_duplicates(subset=COLUMNAS_VISIBLES, ignore_index=True)
@@ -0,0 +1,204 @@
+"""Refresco del listado en segundo plano (stale-while-revalidate).
+
+Se sirve siempre la última descarga buena al instante; cuando vence, un hilo
+revalida contra el portal con GET condicionales. Si el contenido no cambió, la
+huella se mantiene y quien cachee por huella no vuelve a parsear nada. Lo que
+hay que hacer una vez por contenido nuevo (guardar la copia local, avisar de las
+alertas) va en `al_cambiar`, que no depende de ninguna caché y corre en un hilo
+propio: ni la primera carga ni una revalidación lo esperan.
+
+Cada descarga tiene un plazo total (reintentos incluidos). Si el portal falla,
+el mismo hilo vuelve a probar con espera exponencial; tras varios fallos
+seguidos el cortacircuitos se abre y ya nadie espera al portal: la primera
+carga falla al instante y solo se sondea en segundo plano cuando toca.
+"""
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from remates import crawler, metricas
+
+log = logging.getLogger(__name__)
+
+Estado = namedtuple("Estado", ["paginas", "huella", "actualizado", "refrescando", "error",
+                               "circuito", "proximo_intento"])
+
+
+def huella_paginas(paginas: dict) -> str:
+    h = hashlib.sha1()
+    for url, html in paginas.items():
+        h.update(url.encode())
+        h.update(html.encode())
+    return h.hexdigest()
+
+
+class CircuitoAbierto(requests.exceptions.ConnectionError):
+    """El portal falló demasiadas veces seguidas: no se lo espera hasta el próximo sondeo."""
+
+
+class Circuito:
+    """Cortacircuitos con espera exponencial entre intentos (seguro entre hilos).
+
+    Cada fallo seguido duplica la espera hasta el próximo intento, con ±20 % de azar
+    para que varios procesos no vuelvan todos a la vez. Con `umbral` fallos seguidos
+    queda abierto; el primer éxito lo cierra.
+    """
+
+    def __init__(self, umbral: int = 3, espera_inicial: float = 15, espera_max: float = 900):
+        self.umbral = umbral
+        self.espera_inicial = espera_inicial
+        self.espera_max = espera_max
+        self._lock = threading.Lock()
+        self.fallos = 0
+        self.proximo_intento = 0.0  # time.time() a partir del cual se puede volver a probar
+
+    @property
+    def abierto(self) -> bool:
+        return self.fallos >= self.umbral
+
+    def estado(self) -> str:
+        return 'abierto' if self.abierto else 'cerrado'
+
+    def espera(self) -> float:
+        """Segundos que faltan para el próximo intento (0 si ya se puede)."""
+        return max(0.0, self.proximo_intento - time.time())
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.proximo_intento = 0.0
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            espera = min(self.espera_max, self.espera_inicial * 2 ** (self.fallos - 1))
+            self.proximo_intento = time.time() + espera * random.uniform(0.8, 1.2)
+        metricas.REGISTRO.contar("descarga_fallos")
+
+
+class Refresco:
+    """Mantiene {url: html} del listado y lo revalida cada `ttl` segundos sin bloquear.
+
+    `descargar` tiene la firma de crawler.rastrear (por defecto, el portal completo).
+    `plazo` es el tiempo total de una descarga en segundo plano; `plazo_espera`, el de
+    la primera carga, que sí hace esperar a quien la pide. `al_cambiar(paginas, huella)`
+    se llama cada vez que cambia la huella, también cuando vuelve un contenido que ya
+    se había visto, en un único hilo aparte: de a uno y en el orden de las descargas.
+    """
+
+    def __init__(self, url: str, ttl: float = 600, sesion: requests.Session = None, descargar=None,
+                 plazo: float = 120, plazo_espera: float = 20, circuito: Circuito = None, al_cambiar=None):
+        self.url = url
+        self.ttl = ttl
+        self.sesion = sesion or crawler.crear_sesion()
+        self.descargar = descargar or crawler.rastrear
+        self.plazo = plazo
+        self.plazo_espera = plazo_espera
+        self.circuito = circuito or Circuito()
+        self.al_cambiar = al_cambiar
+        self._procesador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="al-cambiar-remates")
+        self._validadores = {}
+        self._lock = threading.Lock()
+        self._primera_carga = threading.Lock()
+        self._hilo = None
+        self._esperando = False  # el hilo está esperando el próximo intento, no descargando
+        self.paginas = None
+        self.huella = None
+        self.actualizado = None  # time.time() de la última revalidación exitosa
+        self.error = None
+        self.ultima_descarga = None  # {'cuando', 'segundos', 'paginas', 'bytes', 'cambio'}
+
+    def estado(self) -> Estado:
+        with self._lock:
+            vivo = self._hilo is not None and self._hilo.is_alive()
+            proximo = self.circuito.proximo_intento if self.error else None
+            return Estado(self.paginas, self.huella, self.actualizado, vivo and not self._esperando, self.error,
+                          self.circuito.estado(), proximo)
+
+    def obtener(self, bloquear: bool = True) -> Estado:
+        """Estado actual; si está vencido lanza la revalidación sin esperarla.
+
+        Solo la primera carga (sin datos previos) bloquea, hasta `plazo_espera`, y puede
+        propagar la excepción de requests; con el circuito abierto falla sin esperar
+        (CircuitoAbierto). Con bloquear=False también se hace en segundo plano y el
+        estado vuelve con paginas=None hasta que termine.
+        """
+        if self.paginas is None and bloquear:
+            if self.circuito.abierto:
+                self.refrescar_en_segundo_plano()
+                raise CircuitoAbierto(f"el portal falló {self.circuito.fallos} veces seguidas; "
+                                      f"próximo intento en {self.circuito.espera():.0f} s")
+            # Varias sesiones pueden llegar a la vez en frío: solo una descarga
+            with self._primera_carga:
+                if self.paginas is None:
+                    try:
+                        self.refrescar(self.plazo_espera)
+                    except requests.exceptions.RequestException:
+                        self.refrescar_en_segundo_plano()  # se sigue probando con espera exponencial
+                        raise
+        elif self.paginas is None or time.time() - self.actualizado >= self.ttl:
+            self.refrescar_en_segundo_plano()
+        return self.estado()
+
+    def refrescar(self, plazo: float = None):
+        inicio, bytes_previos = time.perf_counter(), metricas.REGISTRO.contador("descarga_bytes")
+        try:
+            paginas = self.descargar(self.url, sesion=self.sesion, validadores=self._validadores,
+                                     plazo=plazo or self.plazo)
+        except requests.exceptions.RequestException as e:
+            self.circuito.fallo()
+            with self._lock:
+                self.error = str(e)
+            raise
+        huella = huella_paginas(paginas)
+        self.circuito.exito()
+        with self._lock:
+            cambio = huella != self.huella
+            # Los bytes salen del contador del proceso: con 304 no se baja nada
+            self.ultima_descarga = {
+                'cuando': time.time(),
+                'segundos': time.perf_counter() - inicio,
+                'paginas': len(paginas),
+                'bytes': int(metricas.REGISTRO.contador("descarga_bytes") - bytes_previos),
+                'cambio': cambio,
+            }
+            if cambio:
+                self.paginas, self.huella = paginas, huella
+            self.actualizado = time.time()
+            self.error = None
+        if cambio and self.al_cambiar is not None:
+            self._procesador.submit(self._al_cambiar_seguro, paginas, huella)
+
+    def _al_cambiar_seguro(self, paginas: dict, huella: str):
+        try:
+            self.al_cambiar(paginas, huella)
+        except Exception:  # la descarga ya está servida: un fallo acá no la invalida
+            log.exception("Falló el procesamiento del contenido nuevo de %s", self.url)
+
+    def refrescar_en_segundo_plano(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._refrescar_seguro, name="refresco-remates", daemon=True)
+            self._hilo.start()
+
+    def _refrescar_seguro(self):
+        # Hasta que salga bien: cada intento fallido agranda la espera del circuito
+        while True:
+            espera = self.circuito.espera()
+            if espera:
+                self._esperando = True
+                time.sleep(espera)
+                self._esperando = False
+            try:
+                self.refrescar()
+                return
+            except requests.exceptions.RequestException as e:
+                log.warning("Falló la revalidación de %s (%d seguidas, próximo intento en %.0f s): %s",
+                            self.url, self.circuito.fallos, self.circuito.espera(), e)